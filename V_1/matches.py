@@ -1,40 +1,63 @@
+from __future__ import annotations
 import logging
 
 import os as _os
+import sys as _sys
 import json as _json
 import gzip as _gzip
-from typing import List, Tuple
-from src.user import User
+from array import array as _array
+from collections.abc import Sequence as _Sequence
+from datetime import datetime as _datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+if TYPE_CHECKING:
+    from src.user import User
+
+# Match outcomes, in the order of the capture popup's choices ("User 1 Wins", "User 2 Wins", "Draw")
+USER1_WINS = 0
+USER2_WINS = 1
+DRAW = 2
 
 class Match:
     def __init__(self, _match_JSON: dict = None, match_tuple: Tuple[User, User, int] = None):
         try:
+            # Optional ISO date of the match (the "date" field of match dicts)
+            self.date = None
             if _match_JSON:
                 self.from_dict(_match_JSON)
             elif match_tuple:
-                self.user1, self.user2, self.outcome = match_tuple
+                self.user1, self.user2, self.outcome = match_tuple[:3]
+                if len(match_tuple) > 3:
+                    self.date = match_tuple[3]
         except Exception as e:
             logging.error(f'Error in __init__(self,: {e}')
             raise
 
     def from_dict(self, _match_JSON: dict):
         try:
-            self.user1 = User(_user_id=_match_JSON["user1_id"], _user_name=_match_JSON["user1_name"])
-            self.user2 = User(_user_id=_match_JSON["user2_id"], _user_name=_match_JSON["user2_name"])
+            # Imported here so loading match files doesn't pull in the ship/room/API modules
+            from src.user import User
+            self.user1 = User()
+            self.user1.soft_init(_match_JSON["user1_id"], _match_JSON["user1_name"])
+            self.user2 = User()
+            self.user2.soft_init(_match_JSON["user2_id"], _match_JSON["user2_name"])
             self.outcome = _match_JSON["outcome"]
+            self.date = _match_JSON.get("date")
         except Exception as e:
             logging.error(f'Error in from_dict(self,: {e}')
             raise
 
     def to_dict(self) -> dict:
         try:
-            return {
+            match = {
                 "user1_id": self.user1.user_id,
                 "user1_name": self.user1.user_name,
                 "user2_id": self.user2.user_id,
                 "user2_name": self.user2.user_name,
                 "outcome": self.outcome
             }
+            if self.date:
+                match["date"] = self.date
+            return match
         except Exception as e:
             logging.error(f'Error in to_dict(self): {e}')
             raise
@@ -46,11 +69,218 @@ class Match:
             logging.error(f'Error in to_tuple(self): {e}')
             raise
 
+def _user_key(user_id):
+    """User ids as ints, so 1 and '1' are the same player (ids that aren't numbers are kept as they are)"""
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return user_id
+
+def _timestamp(date) -> float:
+    """Seconds since the epoch for an ISO date string or datetime (NaN when missing or unreadable)"""
+    if not date:
+        return float('nan')
+    try:
+        if not isinstance(date, _datetime):
+            date = _datetime.fromisoformat(str(date))
+        return date.timestamp()
+    except (TypeError, ValueError, OverflowError, OSError):
+        return float('nan')
+
+class MatchTable(_Sequence):
+    """
+    Match history held as columns instead of Match/User objects.
+    User ids and names are interned: each distinct value is stored once and matches refer to it
+    by a small integer code, kept with the outcome and timestamp in array columns (~25 bytes
+    per match). Indexing or iterating creates Match objects on demand. Win/loss/draw counts
+    per user are kept up to date as matches are added, and every user's match indices are
+    indexed for head-to-head queries.
+    """
+
+    def __init__(self, matches: Iterable[dict] = ()) -> None:
+        # Interned values; the columns hold indices into these lists
+        self.user_ids: List[Any] = []
+        self.user_names: List[str] = []
+        self._user_codes: Dict[Any, int] = {}
+        self._name_codes: Dict[str, int] = {}
+        self.user1 = _array('i')
+        self.user1_name = _array('i')
+        self.user2 = _array('i')
+        self.user2_name = _array('i')
+        self.outcome = _array('b')
+        self.timestamp = _array('d')
+        # Original date strings, only for matches whose date doesn't round-trip through the timestamp
+        self._dates: Dict[int, str] = {}
+        # Per user code: counts and the indices of the user's matches
+        self.wins = _array('i')
+        self.losses = _array('i')
+        self.draws = _array('i')
+        self._by_user: List[_array] = []
+        for match in matches:
+            self.append_dict(match)
+
+    def _user_code(self, user_id) -> int:
+        user_id = _user_key(user_id)
+        code = self._user_codes.get(user_id)
+        if code is None:
+            code = self._user_codes[user_id] = len(self.user_ids)
+            self.user_ids.append(user_id)
+            self.wins.append(0)
+            self.losses.append(0)
+            self.draws.append(0)
+            self._by_user.append(_array('i'))
+        return code
+
+    def _name_code(self, user_name) -> int:
+        user_name = user_name if user_name is not None else ""
+        code = self._name_codes.get(user_name)
+        if code is None:
+            code = self._name_codes[user_name] = len(self.user_names)
+            self.user_names.append(_sys.intern(str(user_name)))
+        return code
+
+    def append(self, user1_id, user1_name: str, user2_id, user2_name: str, outcome: int, date=None) -> int:
+        """Add one match; returns its index"""
+        index = len(self.outcome)
+        first, second = self._user_code(user1_id), self._user_code(user2_id)
+        self.user1.append(first)
+        self.user1_name.append(self._name_code(user1_name))
+        self.user2.append(second)
+        self.user2_name.append(self._name_code(user2_name))
+        self.outcome.append(int(outcome))
+        timestamp = _timestamp(date)
+        self.timestamp.append(timestamp)
+        if date and (timestamp != timestamp or self._date(timestamp) != date):
+            self._dates[index] = str(date)
+        if outcome == USER1_WINS:
+            self.wins[first] += 1
+            self.losses[second] += 1
+        elif outcome == USER2_WINS:
+            self.wins[second] += 1
+            self.losses[first] += 1
+        elif outcome == DRAW:
+            self.draws[first] += 1
+            self.draws[second] += 1
+        self._by_user[first].append(index)
+        if second != first:
+            self._by_user[second].append(index)
+        return index
+
+    def append_dict(self, match: dict) -> int:
+        return self.append(match["user1_id"], match["user1_name"], match["user2_id"], match["user2_name"],
+                           match["outcome"], match.get("date"))
+
+    @staticmethod
+    def _date(timestamp: float) -> Optional[str]:
+        if timestamp != timestamp:
+            return None
+        return _datetime.fromtimestamp(timestamp).isoformat()
+
+    def row(self, index: int) -> dict:
+        """Match dict (as in Match.to_dict()) of the match at index"""
+        if index < 0:
+            index += len(self)
+        match = {
+            "user1_id": self.user_ids[self.user1[index]],
+            "user1_name": self.user_names[self.user1_name[index]],
+            "user2_id": self.user_ids[self.user2[index]],
+            "user2_name": self.user_names[self.user2_name[index]],
+            "outcome": self.outcome[index]
+        }
+        date = self._dates.get(index) or self._date(self.timestamp[index])
+        if date:
+            match["date"] = date
+        return match
+
+    def rows(self) -> Iterable[dict]:
+        return (self.row(index) for index in range(len(self)))
+
+    def __len__(self) -> int:
+        return len(self.outcome)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Match(_match_JSON=self.row(i)) for i in range(*index.indices(len(self)))]
+        if not -len(self) <= index < len(self):
+            raise IndexError("match index out of range")
+        return Match(_match_JSON=self.row(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield Match(_match_JSON=self.row(index))
+
+    def matches_of(self, user_id) -> _array:
+        """Indices of the matches user_id played"""
+        code = self._user_codes.get(_user_key(user_id))
+        return self._by_user[code] if code is not None else _array('i')
+
+    def record(self, user_id) -> dict:
+        """Wins, losses, draws and number of matches of user_id"""
+        code = self._user_codes.get(_user_key(user_id))
+        if code is None:
+            return {"wins": 0, "losses": 0, "draws": 0, "matches": 0}
+        return {"wins": self.wins[code], "losses": self.losses[code], "draws": self.draws[code],
+                "matches": len(self._by_user[code])}
+
+    def records(self) -> Dict[Any, dict]:
+        """record() of every user"""
+        return {user_id: {"wins": self.wins[code], "losses": self.losses[code], "draws": self.draws[code],
+                          "matches": len(self._by_user[code])}
+                for code, user_id in enumerate(self.user_ids)}
+
+    def head_to_head(self, user_id, opponent_id) -> dict:
+        """Wins, losses and draws of user_id against opponent_id"""
+        result = {"wins": 0, "losses": 0, "draws": 0, "matches": 0}
+        code, other = self._user_codes.get(_user_key(user_id)), self._user_codes.get(_user_key(opponent_id))
+        if code is None or other is None:
+            return result
+        # Scan whichever of the two users played fewer matches
+        indices = min(self._by_user[code], self._by_user[other], key=len)
+        user1, user2, outcomes = self.user1, self.user2, self.outcome
+        for index in indices:
+            first, second = user1[index], user2[index]
+            if first == code and second == other:
+                winner, loser = USER1_WINS, USER2_WINS
+            elif first == other and second == code:
+                winner, loser = USER2_WINS, USER1_WINS
+            else:
+                continue
+            result["matches"] += 1
+            outcome = outcomes[index]
+            if outcome == winner:
+                result["wins"] += 1
+            elif outcome == loser:
+                result["losses"] += 1
+            elif outcome == DRAW:
+                result["draws"] += 1
+        return result
+
+    def name_of(self, user_id) -> Optional[str]:
+        """Most recent name user_id played under"""
+        for index in reversed(self.matches_of(user_id)):
+            if self.user_ids[self.user1[index]] == _user_key(user_id):
+                return self.user_names[self.user1_name[index]]
+            return self.user_names[self.user2_name[index]]
+        return None
+
+    def nbytes(self) -> int:
+        """Approximate size of the columns and per-user indices in bytes"""
+        columns = (self.user1, self.user1_name, self.user2, self.user2_name, self.outcome, self.timestamp,
+                   self.wins, self.losses, self.draws)
+        return sum(column.itemsize * len(column) for column in columns) + \
+            sum(index.itemsize * len(index) for index in self._by_user)
+
+    def __repr__(self) -> str:
+        return f"MatchTable({len(self)} matches, {len(self.user_ids)} users)"
+
 class Match_Manager:
     def __init__(self, _apiInterface=None):
         try:
             self.apiInterface = _apiInterface
-            self.matches: List[Match] = []
+            # Sequence of Match objects, created on access from the compact table
+            self.matches = MatchTable()
+            # Called with the list of new Match objects whenever matches are included
+            self.listeners: List[Callable[[List[Match]], None]] = []
 
             directory = _os.path.join(_os.path.dirname(__file__), 'match_data')
             _os.makedirs(directory, exist_ok=True)
@@ -65,26 +295,40 @@ class Match_Manager:
 
     def include_matches(self, _matches: List[Tuple[User, User, int]]) -> None:
         try:
+            new_matches = [Match(match_tuple=match) for match in _matches]
+            for match in new_matches:
+                # Timestamped when recorded unless the tuple carried a date
+                match.date = match.date or _datetime.now().isoformat(timespec='seconds')
+                self.matches.append(match.user1.user_id, match.user1.user_name, match.user2.user_id,
+                                    match.user2.user_name, match.outcome, match.date)
+            for listener in self.listeners:
+                try:
+                    listener(new_matches)
+                except Exception as e:
+                    logging.error(f'Error in match listener: {e}')
         except Exception as e:
             logging.error(f'Error in include_matches(self,: {e}')
             raise
-        self.matches.extend([Match(match_tuple=match) for match in _matches])
+
+    def subscribe(self, listener: Callable[[List[Match]], None]) -> None:
+        """Call listener with the new matches each time include_matches() adds some."""
+        self.listeners.append(listener)
 
     def to_dict(self) -> dict:
         try:
+            return {
+                "matches": list(self.matches.rows())
+            }
         except Exception as e:
             logging.error(f'Error in to_dict(self): {e}')
             raise
-        return {
-            "matches": [match.to_dict() for match in self.matches]
-        }
     
     def from_dict(self, _match_manager_JSON: dict):
         try:
+            self.matches = MatchTable(_match_manager_JSON["matches"])
         except Exception as e:
             logging.error(f'Error in from_dict(self,: {e}')
             raise
-        self.matches = [Match(_match_JSON=match) for match in _match_manager_JSON["matches"]]
 
     def get_matches_as_tuples(self) -> List[Tuple[User, User, int]]:
         try:
@@ -93,21 +337,33 @@ class Match_Manager:
             logging.error(f'Error in get_matches_as_tuples(self): {e}')
             raise
 
-    def save_to_file(self, file_path: str) -> None:
+    def record(self, user_id) -> dict:
+        """Wins, losses, draws and number of matches of user_id"""
+        return self.matches.record(user_id)
+
+    def head_to_head(self, user_id, opponent_id) -> dict:
+        """Wins, losses and draws of user_id against opponent_id"""
+        return self.matches.head_to_head(user_id, opponent_id)
+
+    def save_to_file(self, file_path: str, file_manager=None) -> None:
+        """Append the matches to a gzip JSON file, and to file_manager's storage backend when given"""
         try:
             directory = _os.path.dirname(file_path)
             if directory:
                 _os.makedirs(directory, exist_ok=True)
 
+            new_matches = self.to_dict()["matches"]
             if _os.path.exists(file_path):
                 with _gzip.open(file_path, 'rt', encoding='utf-8') as file:
                     previous_data = _json.load(file)
-                    previous_data["matches"].extend(self.to_dict()["matches"])
+                    previous_data["matches"].extend(new_matches)
             else:
                 previous_data = self.to_dict()
 
             with _gzip.open(file_path, 'wt', encoding='utf-8') as file:
                 _json.dump(previous_data, file, indent=4)
+            if file_manager:
+                file_manager.mirror_to_db(new_matches, 'matches')
         except Exception as e:
             logging.error(f'Error in save_to_file(self,: {e}')
             raise
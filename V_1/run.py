@@ -7,17 +7,23 @@ import json
 import sys as _sys
 
 from src import apiInterface as _apiInterface
+from src import apiCache as _apiCache
+from src import apiScheduler as _apiScheduler
 from src import user as _user
 from src import ruleEngine as _ruleEngine
 from src import designs as _designs
 from src import log_config as _log_config
 from src import fileManager as _fileManager
+from src import scoringClient as _scoringClient
 
-# Set up logging
-logger, log_file = _log_config.setup_logging(log_level=logging.INFO)
+# Root logger (configured by setup_logging), log file and file manager are set up in __main__(),
+# so importing this module (e.g. to profile its startup) writes nothing to disk
+logger = logging.getLogger()
+log_file = None
+file_manager = None
 
-#Set up file manager
-file_manager = _fileManager.FileManager(base_dir=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
+#Shared rate limiter for every PSS API call made by this process
+api_scheduler = _apiScheduler.RequestScheduler()
 
 #TODO: Create a UI that can can be used with the overlay and the companion app
 #TODO: Go back over the matches code (ADD rating)
@@ -32,7 +38,14 @@ file_manager = _fileManager.FileManager(base_dir=os.path.join(os.path.dirname(os
 async def async_main():
     try:
         logger.info("Starting PSS Companion App")
-        apiinterface = _apiInterface.apiInterface()
+        scoring_client = _scoringClient.ScoringClient.connect(_scoringClient.default_address(file_manager.base_dir))
+        if scoring_client:
+            # A warm daemon already holds the session, designs and rules
+            logger.info(f"Scoring through daemon at {scoring_client.address}")
+            return score_with_daemon(scoring_client, "C3R3S1")
+
+        apiinterface = _apiCache.CachedApiInterface(cache_path=os.path.join(file_manager.base_dir, 'api_cache.db'),
+                                                    client_factory=_apiScheduler.scheduled_factory(api_scheduler))
         await apiinterface.init_pss_api_client()
 
         try:
@@ -89,8 +102,27 @@ async def async_main():
     
 def __main__():
     """Main function for the PSS Companion App"""
+    global logger, log_file, file_manager
+    # Set up logging
+    logger, log_file = _log_config.setup_logging(log_level=logging.INFO)
+    #Set up file manager
+    file_manager = _fileManager.FileManager(base_dir=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data'))
     return _asyncio.run(async_main())
     
+def score_with_daemon(_client: _scoringClient.ScoringClient, _user_name: str) -> int:
+    try:
+        # First-match, like the local evaluate_all_rooms() path, so both print the same score
+        result = _client.score(user_name=_user_name, collect_all=False)
+        logger.info(f"Evaluation complete. Score: {result['score']}")
+        logger.debug(f"Evaluations: {result['evaluations']}")
+        logger.info(f"Issues: {result['issues']}")
+        return 0
+    except Exception as e:
+        logger.error(f"Error scoring through daemon: {e}")
+        return 1
+    finally:
+        _client.close()
+
 async def rule_eval_async(_api_interface: _apiInterface, _room_designs: dict, _ship_designs: dict, _rules: str) -> bool: 
     try:
         logger.info("Searching for user C3R3S1")
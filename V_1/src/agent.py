@@ -1,9 +1,7 @@
-import pandas as _pandas
 import logging
-from sklearn.model_selection import train_test_split as _train_test_split
-from sklearn.ensemble import RandomForestClassifier as _RandomForestClassifier
-from sklearn.metrics import accuracy_score as _accuracy_score
-from typing import List, Tuple
+import threading
+import time
+from typing import Callable, List, Tuple
 
 # Get logger for this module
 logger = logging.getLogger('pss_companion.agent')
@@ -15,11 +13,34 @@ class apiInterface:
     pass
 
 class Agent:
-    def __init__(self, data: List[dict] = None, model = None) -> None:
-        """Initialize the Agent."""
+    def __init__(self, data: List[dict] = None, model = None, trees_per_update: int = 10,
+                 update_window: int = 500, max_trees: int = 300, retrain_every: int = 200,
+                 min_train_rows: int = 50) -> None:
+        """
+        Initialize the Agent.
+        :param trees_per_update: Trees added to the forest by each online update
+        :param update_window: Most recent rows the added trees are trained on
+        :param max_trees: Forest size that triggers a background full retrain
+        :param retrain_every: New rows that trigger a background full retrain
+        :param min_train_rows: Rows needed before update() trains a first model in the background
+        """
         try:
             self.data = data
             self.model = model
+            self.trees_per_update = trees_per_update
+            self.update_window = update_window
+            self.max_trees = max_trees
+            self.retrain_every = retrain_every
+            self.min_train_rows = min_train_rows
+            # Unfitted estimator used by full (re)trains (a RandomForest when None) and the
+            # feature columns it expects, both set by select_model()
+            self.estimator = None
+            self.feature_columns = None
+            self._lock = threading.RLock()
+            self._since_retrain = 0
+            self._retrain_thread = None
+            self._periodic_thread = None
+            self._stop_periodic = threading.Event()
             if data:
                 logger.info(f"Agent initialized with {len(data)} data points")
             else:
@@ -28,6 +49,38 @@ class Agent:
             logging.error(f'Error in __init__(self,: {e}')
             raise
 
+    def _fit(self, data: List[dict]):
+        """Train a new model on data; returns (model, hold-out accuracy)."""
+        # pandas and scikit-learn are only loaded once the agent is actually used
+        import pandas as _pandas
+        from sklearn.model_selection import train_test_split as _train_test_split
+        from sklearn.ensemble import RandomForestClassifier as _RandomForestClassifier
+        from sklearn.metrics import accuracy_score as _accuracy_score
+
+        # Transform the data
+        df = _pandas.DataFrame(data)
+
+        # Define features and target
+        X = df.drop('target', axis=1)
+        if self.feature_columns:
+            X = X[self.feature_columns]
+        y = df['target']
+
+        # Split the data
+        X_train, X_test, y_train, y_test = _train_test_split(X, y, test_size=0.2, random_state=42)
+
+        # Train the model
+        if self.estimator is not None:
+            from sklearn.base import clone as _clone
+            model = _clone(self.estimator)
+        else:
+            model = _RandomForestClassifier(n_estimators=100, random_state=42)
+        model.fit(X_train, y_train)
+
+        # Evaluate the model
+        y_pred = model.predict(X_test)
+        return model, _accuracy_score(y_test, y_pred)
+
     def train(self, data: List[dict] = None) -> None:
         """Train the agent model."""
         try:
@@ -39,44 +92,179 @@ class Agent:
                 return
                 
             logger.info("Starting model training")
-            
-            # Transform the data
-            df = _pandas.DataFrame(self.data)
-            
-            # Define features and target
-            X = df.drop('target', axis=1)
-            y = df['target']
-            
-            # Split the data
-            X_train, X_test, y_train, y_test = _train_test_split(X, y, test_size=0.2, random_state=42)
-            
-            # Train the model
-            self.model = _RandomForestClassifier(n_estimators=100, random_state=42)
-            self.model.fit(X_train, y_train)
-            
-            # Evaluate the model
-            y_pred = self.model.predict(X_test)
-            accuracy = _accuracy_score(y_test, y_pred)
+            model, accuracy = self._fit(list(self.data))
+            with self._lock:
+                self.model = model
+                self._since_retrain = 0
             
             logger.info(f"Model trained with accuracy: {accuracy:.4f}")
         except Exception as e:
             logging.error(f'Error in train(self,: {e}')
             raise
 
+    def update(self, rows: List[dict]) -> bool:
+        """
+        Learn from new rows (e.g. matches as they are recorded) without a full retrain.
+        A copy of the forest gets trees_per_update trees trained on the latest update_window rows
+        and replaces the current model, so predictions never see a half-updated forest.
+        A full retrain is started in the background once the forest reaches max_trees or
+        retrain_every rows have arrived since the last one.
+        Returns True if the model was updated.
+        """
+        try:
+            rows = [row for row in rows if row and 'target' in row]
+            if not rows:
+                return False
+            with self._lock:
+                self.data = (self.data or []) + rows
+                self._since_retrain += len(rows)
+                model = self.model
+                window = self.data[-self.update_window:]
+                rows_total = len(self.data)
+
+            if model is None:
+                # A first model needs enough rows for a train/test split with every class
+                if rows_total >= self.min_train_rows:
+                    self.retrain_async()
+                return False
+            if not hasattr(model, 'estimators_') or 'warm_start' not in model.get_params():
+                # Only forests can grow incrementally; other selected models wait for a full retrain
+                if self._since_retrain >= self.retrain_every:
+                    self.retrain_async()
+                return False
+
+            updated = self._grow(model, window)
+            if updated:
+                logger.info(f"Model updated with {len(rows)} rows")
+
+            if (len(model.estimators_) + self.trees_per_update >= self.max_trees
+                    or self._since_retrain >= self.retrain_every):
+                self.retrain_async()
+            return updated
+        except Exception as e:
+            logger.error(f"Error updating model: {e}")
+            return False
+
+    def _grow(self, model, window: List[dict]) -> bool:
+        """
+        Swap in a copy of the forest model with trees_per_update trees trained on window added.
+        Returns False if window lacks a known class or another thread replaced model meanwhile.
+        """
+        import copy as _copy
+        import pandas as _pandas
+        df = _pandas.DataFrame(window)
+        X = df.drop('target', axis=1)
+        if self.feature_columns:
+            X = X[self.feature_columns]
+        y = df['target']
+        if set(y) != set(model.classes_):
+            # Added trees must see every known class, or their outputs won't line up with the forest's
+            logger.debug("Update window is missing target classes, deferring to the next full retrain")
+            return False
+        candidate = _copy.copy(model)
+        candidate.estimators_ = list(model.estimators_)
+        candidate.set_params(warm_start=True, n_estimators=len(model.estimators_) + self.trees_per_update)
+        candidate.fit(X, y)
+        with self._lock:
+            # A full retrain that finished meanwhile wins over this update (and re-applies its rows)
+            if self.model is not model:
+                return False
+            self.model = candidate
+        logger.debug(f"Forest grown to {len(candidate.estimators_)} trees")
+        return True
+
+    def _retrain(self) -> None:
+        try:
+            with self._lock:
+                data = list(self.data or [])
+                seen = self._since_retrain
+            if len(data) < self.min_train_rows:
+                logger.info(f"Not retraining on {len(data)} rows (need {self.min_train_rows})")
+                return
+            started = time.perf_counter()
+            model, accuracy = self._fit(data)
+            with self._lock:
+                self.model = model
+                # Rows that arrived during the retrain still count towards the next one
+                self._since_retrain = max(0, self._since_retrain - seen)
+                arrived = len(self.data or []) - len(data)
+                window = (self.data or [])[-self.update_window:]
+            logger.info(f"Background retrain on {len(data)} rows finished in {time.perf_counter() - started:.1f}s "
+                        f"with accuracy: {accuracy:.4f}")
+            if arrived > 0 and hasattr(model, 'estimators_') and 'warm_start' in model.get_params():
+                # Online updates for rows that arrived during the retrain went into the replaced
+                # model; grow the new one on the latest window so they aren't lost
+                if self._grow(model, window):
+                    logger.info(f"Re-applied {arrived} rows that arrived during the retrain")
+        except Exception as e:
+            logger.error(f"Error in background retrain: {e}")
+
+    def retrain_async(self) -> bool:
+        """Start a full retrain in a background thread unless one is running. Returns True if started."""
+        with self._lock:
+            if self._retrain_thread is not None and self._retrain_thread.is_alive():
+                return False
+            self._retrain_thread = threading.Thread(target=self._retrain, name="agent-retrain", daemon=True)
+            self._retrain_thread.start()
+            return True
+
+    def start_periodic_retrain(self, interval: float = 3600.0) -> None:
+        """Run a full background retrain every interval seconds (when new rows arrived)"""
+        def loop():
+            while not self._stop_periodic.wait(interval):
+                if self._since_retrain:
+                    self.retrain_async()
+        if self._periodic_thread is not None and self._periodic_thread.is_alive():
+            return
+        self._stop_periodic.clear()
+        self._periodic_thread = threading.Thread(target=loop, name="agent-periodic-retrain", daemon=True)
+        self._periodic_thread.start()
+
+    def stop_periodic_retrain(self) -> None:
+        self._stop_periodic.set()
+
+    def select_model(self, **kwargs):
+        """
+        Choose the model family and hyperparameters by cross-validation (see modelSelection.select_model)
+        and use the calibrated winner; later full retrains reuse the chosen configuration.
+        """
+        if not self.data:
+            logger.warning("No data available for model selection")
+            return None
+        from src import modelSelection as _modelSelection
+        result = _modelSelection.select_model(list(self.data), **kwargs)
+        with self._lock:
+            self.model = result.model
+            self.estimator = result.estimator
+            self.feature_columns = result.columns
+            self._since_retrain = 0
+        return result
+
+    def follow(self, match_manager, features: Callable) -> None:
+        """
+        Update the model whenever matches are added to match_manager.
+        :param features: Builds a training row (with 'target') from a Match, or returns None to skip it
+        """
+        match_manager.subscribe(lambda matches: self.update([features(match) for match in matches]))
+
     def predict(self, data: dict) -> Tuple[str, float]:
         """Make a prediction based on the input data."""
         try:
-            if not self.model:
+            model = self.model
+            if not model:
                 logger.warning("No model available for prediction")
                 return None, 0.0
                 
             # Transform the input data
+            import pandas as _pandas
             input_df = _pandas.DataFrame([data])
+            if self.feature_columns:
+                input_df = input_df[self.feature_columns]
             
             # Make the prediction
-            prediction = self.model.predict(input_df)[0]
+            prediction = model.predict(input_df)[0]
             # Get the probability of the prediction
-            probability = max(self.model.predict_proba(input_df)[0])
+            probability = max(model.predict_proba(input_df)[0])
             
             logger.info(f"Prediction: {prediction} with probability {probability:.4f}")
             return prediction, probability
@@ -86,7 +274,7 @@ class Agent:
             return None, 0.0
 
     def save_model(self, path: str) -> bool:
-        """Save the trained model to the given path."""
+        """Save the trained model, with the feature columns it expects and its retrain estimator, to the given path."""
         try:
             import pickle
             
@@ -95,7 +283,7 @@ class Agent:
                 return False
                 
             with open(path, 'wb') as f:
-                pickle.dump(self.model, f)
+                pickle.dump({"model": self.model, "feature_columns": self.feature_columns, "estimator": self.estimator}, f)
                 
             logger.info(f"Model successfully saved to {path}")
             return True
@@ -105,12 +293,18 @@ class Agent:
             return False
 
     def load_model(self, path: str) -> bool:
-        """Load a trained model from the given path."""
+        """Load a model saved by save_model() (or a bare pickled model from older versions)."""
         try:
             import pickle
             
             with open(path, 'rb') as f:
-                self.model = pickle.load(f)
+                saved = pickle.load(f)
+            if isinstance(saved, dict) and "model" in saved:
+                self.model = saved["model"]
+                self.feature_columns = saved.get("feature_columns")
+                self.estimator = saved.get("estimator")
+            else:
+                self.model = saved
                 
             logger.info(f"Model successfully loaded from {path}")
             return True
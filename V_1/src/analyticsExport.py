@@ -0,0 +1,314 @@
+import logging
+import os
+import sys
+import json
+import gzip
+import glob
+import shutil
+from typing import Dict, Any, Iterator, List, Optional
+
+from src.lazyImport import lazy_import
+
+np = lazy_import("numpy")
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.analyticsExport')
+
+# Column name -> dtype per table. Columns ending in _code index into a dictionary in meta.json.
+TABLES = {
+    "snapshots": {
+        "snapshot_id": "int64", "user_id": "int64", "user_name_code": "int32", "date": "datetime64[s]",
+        "trophy": "int32", "ship_design_id": "int32", "armor_value": "float32", "room_count": "int16",
+    },
+    "rooms": {
+        "snapshot_id": "int64", "room_design_id": "int32", "room_type_code": "int16", "level": "int16",
+        "x": "int16", "y": "int16", "width": "int8", "height": "int8", "armor": "float32",
+        "powered": "bool", "essential": "bool",
+    },
+    "matches": {
+        "user1_id": "int64", "user1_name_code": "int32", "user2_id": "int64", "user2_name_code": "int32",
+        "outcome": "int16",
+    },
+}
+# Dictionary used by each encoded column
+_DICTIONARIES = {"user_name_code": "user_name", "user1_name_code": "user_name", "user2_name_code": "user_name",
+                 "room_type_code": "room_type"}
+
+def _int(value, default: int = -1) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+def _float(value, default: float = 0.0) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+class AnalyticsStore:
+    """
+    Columnar copy of usr_data snapshots, their rooms and match files, for vectorized reports.
+
+    Layout: directory/meta.json plus one segment directory per export run
+    (directory/<table>/part-00000/<column>.npy). Exports only append what is new since the
+    last run (new usr_data snapshots, new match file entries), so each run writes a small
+    segment; compact() merges a table's segments. Columns are plain .npy files, so reads can
+    be memory-mapped. Room types and player names are dictionary-encoded as int codes.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.meta = {"next_snapshot_id": 0, "dictionaries": {"room_type": [], "user_name": []},
+                     "usr_data": {}, "match_files": {}}
+        self._codes: Dict[str, Dict[str, int]] = {}
+        path = os.path.join(directory, 'meta.json')
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.meta.update(json.load(f))
+            except Exception as e:
+                logger.error(f"Error loading analytics metadata from {path}: {e}")
+        for name, values in self.meta["dictionaries"].items():
+            self._codes[name] = {value: code for code, value in enumerate(values)}
+
+    def _save_meta(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, 'meta.json')
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, path)
+
+    def encode(self, dictionary: str, value) -> int:
+        """Code of value in a dictionary, adding it if new"""
+        value = str(value)
+        codes = self._codes.setdefault(dictionary, {})
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.meta["dictionaries"].setdefault(dictionary, []).append(value)
+        return code
+
+    def dictionary(self, column: str) -> List[str]:
+        """Values of an encoded column's dictionary, indexed by code"""
+        return self.meta["dictionaries"].get(_DICTIONARIES.get(column, column), [])
+
+    def decode(self, column: str, codes) -> list:
+        values = self.dictionary(column)
+        return [values[code] for code in codes]
+
+    # --- Writing ---
+
+    def _segments(self, table: str) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.directory, table, 'part-*')))
+
+    def _write_segment(self, table: str, rows: Dict[str, list]) -> Optional[str]:
+        count = len(next(iter(rows.values()))) if rows else 0
+        if not count:
+            return None
+        existing = self._segments(table)
+        index = int(os.path.basename(existing[-1])[5:]) + 1 if existing else 0
+        path = os.path.join(self.directory, table, f"part-{index:05d}")
+        tmp_path = f"{path}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        for column, dtype in TABLES[table].items():
+            np.save(os.path.join(tmp_path, f"{column}.npy"), np.asarray(rows[column], dtype=dtype))
+        os.replace(tmp_path, path)
+        logger.info(f"Wrote {count} {table} rows to {path}")
+        return path
+
+    def _snapshot_rows(self, user: Dict[str, Any], entries: List[dict], snapshots: Dict[str, list], rooms: Dict[str, list]) -> None:
+        user_id = _int(user.get("user_id"))
+        name_code = self.encode("user_name", user.get("user_name"))
+        for entry in entries:
+            ship = entry.get("user_ship") or {}
+            ship_rooms = [room for room in ship.get("ship_rooms") or [] if room]
+            snapshot_id = self.meta["next_snapshot_id"]
+            self.meta["next_snapshot_id"] += 1
+            snapshots["snapshot_id"].append(snapshot_id)
+            snapshots["user_id"].append(user_id)
+            snapshots["user_name_code"].append(name_code)
+            snapshots["date"].append((entry.get("date") or "1970-01-01T00:00:00")[:19])
+            snapshots["trophy"].append(_int(entry.get("highest_trophy")))
+            snapshots["ship_design_id"].append(_int(ship.get("ship_design_id")))
+            snapshots["armor_value"].append(_float(ship.get("ship_armor_value")))
+            snapshots["room_count"].append(len(ship_rooms))
+            for room in ship_rooms:
+                x, y = room.get("room_cords") or (0, 0)
+                width, height = room.get("room_size") or (1, 1)
+                rooms["snapshot_id"].append(snapshot_id)
+                rooms["room_design_id"].append(_int(room.get("room_design_id")))
+                rooms["room_type_code"].append(self.encode("room_type", room.get("room_type")))
+                rooms["level"].append(_int(room.get("room_lvl")))
+                rooms["x"].append(_int(x, 0))
+                rooms["y"].append(_int(y, 0))
+                rooms["width"].append(_int(width, 1))
+                rooms["height"].append(_int(height, 1))
+                rooms["armor"].append(_float(room.get("room_armor")))
+                rooms["powered"].append(bool(room.get("room_isPowered")))
+                rooms["essential"].append(bool(room.get("room_essential")))
+
+    def export_usr_data(self, directory: str) -> int:
+        """Append snapshots added to usr_data/*.gz since the last export. Returns the number of new snapshots."""
+        snapshots = {column: [] for column in TABLES["snapshots"]}
+        rooms = {column: [] for column in TABLES["rooms"]}
+        exported = self.meta["usr_data"]
+        for filepath in sorted(glob.glob(os.path.join(directory, '*.gz'))):
+            key = os.path.basename(filepath)
+            mtime = os.path.getmtime(filepath)
+            done = exported.get(key)
+            if done and done[0] == mtime:
+                continue
+            try:
+                with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+                    user = json.load(f)
+            except Exception as e:
+                logger.error(f"Error reading {filepath}: {e}")
+                continue
+            # usr_data files only ever get snapshots appended, so skip the ones already exported
+            entries = user.get("dated_data", [])
+            already = done[1] if done else 0
+            self._snapshot_rows(user, entries[already:], snapshots, rooms)
+            exported[key] = [mtime, len(entries)]
+        self._write_segment("rooms", rooms)
+        self._write_segment("snapshots", snapshots)
+        self._save_meta()
+        return len(snapshots["snapshot_id"])
+
+    def export_matches(self, file_path: str) -> int:
+        """Append matches added to a Match_Manager file since the last export. Returns the number of new matches."""
+        if not os.path.exists(file_path):
+            return 0
+        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
+            matches = json.load(f).get("matches", [])
+        key = os.path.abspath(file_path)
+        already = self.meta["match_files"].get(key, 0)
+        if already > len(matches):
+            # The file was rewritten rather than appended to; start over for it
+            already = 0
+        rows = {column: [] for column in TABLES["matches"]}
+        for match in matches[already:]:
+            rows["user1_id"].append(_int(match.get("user1_id")))
+            rows["user1_name_code"].append(self.encode("user_name", match.get("user1_name")))
+            rows["user2_id"].append(_int(match.get("user2_id")))
+            rows["user2_name_code"].append(self.encode("user_name", match.get("user2_name")))
+            rows["outcome"].append(_int(match.get("outcome")))
+        self._write_segment("matches", rows)
+        self.meta["match_files"][key] = len(matches)
+        self._save_meta()
+        return len(rows["outcome"])
+
+    def compact(self, table: str) -> None:
+        """Merge all segments of a table into one"""
+        segments = self._segments(table)
+        if len(segments) < 2:
+            return
+        merged = self.table(table, mmap=False)
+        path = os.path.join(self.directory, table, "part-00000")
+        staging = os.path.join(self.directory, table, "compact.tmp")
+        os.makedirs(staging, exist_ok=True)
+        for column, values in merged.items():
+            np.save(os.path.join(staging, f"{column}.npy"), values)
+        for segment in segments:
+            shutil.rmtree(segment)
+        os.replace(staging, path)
+        logger.info(f"Compacted {len(segments)} {table} segments")
+
+    # --- Reading ---
+
+    def segments(self, table: str, columns: List[str] = None, mmap: bool = True) -> Iterator[Dict[str, Any]]:
+        """Column arrays of each segment (memory-mapped by default)"""
+        for segment in self._segments(table):
+            yield {column: np.load(os.path.join(segment, f"{column}.npy"), mmap_mode='r' if mmap else None)
+                   for column in (columns or TABLES[table])}
+
+    def table(self, table: str, columns: List[str] = None, mmap: bool = True) -> Dict[str, Any]:
+        """Whole table as column arrays; a single segment stays memory-mapped"""
+        columns = columns or list(TABLES[table])
+        parts = list(self.segments(table, columns, mmap))
+        if len(parts) == 1:
+            return parts[0]
+        if not parts:
+            return {column: np.empty(0, dtype=TABLES[table][column]) for column in columns}
+        return {column: np.concatenate([part[column] for part in parts]) for column in columns}
+
+    # --- Reports ---
+
+    def _snapshot_lookup(self, column: str, fill) -> Any:
+        """Array indexed by snapshot_id giving a snapshots column, for joining rooms to snapshots"""
+        snapshots = self.table("snapshots", ["snapshot_id", column])
+        lookup = np.full(self.meta["next_snapshot_id"], fill, dtype=snapshots[column].dtype)
+        lookup[snapshots["snapshot_id"]] = snapshots[column]
+        return lookup
+
+    def room_type_distribution(self, bracket_size: int = 1000) -> Dict[int, Dict[str, float]]:
+        """Share of each room type among rooms, per trophy bracket (lower bound of the bracket)"""
+        rooms = self.table("rooms", ["snapshot_id", "room_type_code"])
+        if not len(rooms["snapshot_id"]):
+            return {}
+        trophies = self._snapshot_lookup("trophy", -1)[rooms["snapshot_id"]]
+        known = trophies >= 0
+        brackets = trophies[known] // bracket_size
+        types = rooms["room_type_code"][known].astype(np.int64)
+        type_count = len(self.dictionary("room_type_code"))
+        counts = np.bincount(brackets * type_count + types, minlength=(int(brackets.max(initial=0)) + 1) * type_count)
+        counts = counts.reshape(-1, type_count)
+        names = self.dictionary("room_type_code")
+        report = {}
+        for bracket, row in enumerate(counts):
+            total = row.sum()
+            if total:
+                report[bracket * bracket_size] = {names[code]: float(row[code] / total) for code in np.nonzero(row)[0]}
+        return report
+
+    def armor_coverage(self, period: str = 'M', exclude_types=("Wall", "Corridor", "Lift")) -> Dict[str, Dict[str, float]]:
+        """Per period (numpy datetime unit, e.g. 'D', 'W', 'M'): share of rooms with armor and their mean armor"""
+        rooms = self.table("rooms", ["snapshot_id", "room_type_code", "armor"])
+        if not len(rooms["snapshot_id"]):
+            return {}
+        excluded = [self.dictionary("room_type_code").index(t) for t in exclude_types if t in self.dictionary("room_type_code")]
+        keep = ~np.isin(rooms["room_type_code"], excluded)
+        dates = self._snapshot_lookup("date", np.datetime64('NaT'))[rooms["snapshot_id"][keep]]
+        periods, inverse = np.unique(dates.astype(f'datetime64[{period}]'), return_inverse=True)
+        armor = rooms["armor"][keep].astype(np.float64)
+        totals = np.bincount(inverse, minlength=len(periods))
+        armored = np.bincount(inverse, weights=armor > 0, minlength=len(periods))
+        armor_sum = np.bincount(inverse, weights=armor, minlength=len(periods))
+        return {str(p): {"rooms": int(totals[i]), "armored_share": float(armored[i] / totals[i]),
+                         "mean_armor": float(armor_sum[i] / totals[i])}
+                for i, p in enumerate(periods) if totals[i] and not np.isnat(p)}
+
+def main(argv: list = None) -> int:
+    import argparse
+    data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+    parser = argparse.ArgumentParser(description="Columnar analytics export of usr_data snapshots and matches")
+    parser.add_argument("--store", default=os.path.join(data_dir, 'analytics'))
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export", help="Append new snapshots and matches")
+    export.add_argument("--usr-data", default=os.path.join(data_dir, 'usr_data'))
+    export.add_argument("--matches", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'match_data', 'match_data.gz'))
+    export.add_argument("--compact", action="store_true")
+    report = sub.add_parser("report", help="Print a report")
+    report.add_argument("name", choices=["room-types", "armor"])
+    report.add_argument("--bracket", type=int, default=1000)
+    report.add_argument("--period", default='M')
+    args = parser.parse_args(argv)
+
+    store = AnalyticsStore(args.store)
+    if args.command == "export":
+        snapshots = store.export_usr_data(args.usr_data)
+        matches = store.export_matches(args.matches)
+        if args.compact:
+            for table in TABLES:
+                store.compact(table)
+        print(f"Exported {snapshots} snapshots and {matches} matches to {args.store}")
+    elif args.name == "room-types":
+        print(json.dumps(store.room_type_distribution(args.bracket), indent=2))
+    else:
+        print(json.dumps(store.armor_coverage(args.period), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+from __future__ import annotations
+import logging
+import asyncio as _asyncio
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Callable, Awaitable, TYPE_CHECKING
+if TYPE_CHECKING:
+    from pssapi import entities
+
+from src import apiInterface as _apiInterface
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.apiCache')
+
+# Seconds each kind of response stays fresh
+DEFAULT_TTLS = {
+    "token": 6 * 60 * 60,
+    "search_users": 60 * 60,
+    "inspect_ship": 5 * 60,
+    "negative": 10 * 60,
+}
+
+_MISSING = object()
+
+# Fragments of PSS error messages that mean the access token is no longer accepted
+_AUTH_ERROR_HINTS = ("token", "authoriz", "authent", "not logged in", "login")
+
+def is_auth_error(error: BaseException) -> bool:
+    """Whether an API error means the session must be renewed (pssapi reports these as PssApiError messages)"""
+    if not any(cls.__name__ == "PssApiError" for cls in type(error).__mro__):
+        return False
+    message = str(getattr(error, "message", error)).lower()
+    return any(hint in message for hint in _AUTH_ERROR_HINTS)
+
+def encode_value(value: Any) -> Optional[str]:
+    """
+    JSON for a cached response: plain JSON values (the access token, empty searches) and
+    lists/tuples of those. None if the value can't be stored this way.
+    pssapi entities are not persisted: pssapi pops each field out of the node's attrib dict
+    while parsing it, so neither the entity nor its node still holds the response.
+    """
+
+    def encode(item):
+        if item is None or isinstance(item, (str, int, float, bool)):
+            return {"value": item}
+        if isinstance(item, (list, tuple)):
+            return {"list" if isinstance(item, list) else "tuple": [encode(element) for element in item]}
+        raise TypeError(f"{type(item).__name__} is kept in memory only")
+
+    try:
+        return json.dumps(encode(value))
+    except (TypeError, ValueError) as e:
+        logger.debug(f"Not persisting response: {e}")
+        return None
+
+def decode_value(text: str) -> Any:
+    """Inverse of encode_value"""
+
+    def decode(item):
+        if "value" in item:
+            return item["value"]
+        if "list" in item:
+            return [decode(element) for element in item["list"]]
+        if "tuple" in item:
+            return tuple(decode(element) for element in item["tuple"])
+        # Entities persisted by earlier versions decode to empty objects
+        raise ValueError(f"{item.get('entity', 'Unknown')} entries are no longer persisted")
+
+    return decode(json.loads(text))
+
+class ResponseCache:
+    """
+    Two-level TTL cache for API responses.
+    Entries live in memory and, when a path is given, in a small SQLite table so they
+    survive restarts. Only plain JSON values are persisted; pssapi entities stay in
+    memory (see encode_value).
+    """
+
+    def __init__(self, path: str = None, max_memory_entries: int = 5000) -> None:
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self._memory: Dict[str, tuple] = {}  # {key: (expires_at, value)}
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, expires_at REAL NOT NULL, value TEXT NOT NULL)")
+            self._conn.execute("DELETE FROM responses WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    return entry[1]
+                del self._memory[key]
+            if self._conn:
+                row = self._conn.execute("SELECT expires_at, value FROM responses WHERE key = ?", (key,)).fetchone()
+                if row and row[0] >= now:
+                    try:
+                        value = decode_value(row[1])
+                    except Exception as e:
+                        logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._conn.commit()
+                        return default
+                    self._remember(key, row[0], value)
+                    return value
+        return default
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        expires_at = time.time() + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._conn:
+                encoded = encode_value(value)
+                try:
+                    if encoded is None:
+                        # Don't let an older persisted value outlive this one
+                        self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    else:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO responses (key, expires_at, value) VALUES (?, ?, ?)",
+                            (key, expires_at, encoded),
+                        )
+                    self._conn.commit()
+                except Exception as e:
+                    logger.warning(f"Could not persist cache entry {key}: {e}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._conn:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+
+    def _remember(self, key: str, expires_at: float, value: Any) -> None:
+        if len(self._memory) >= self.max_memory_entries:
+            # Drop the entry closest to expiry to make room
+            del self._memory[min(self._memory, key=lambda k: self._memory[k][0])]
+        self._memory[key] = (expires_at, value)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+
+class CachedApiInterface(_apiInterface.apiInterface):
+    """
+    apiInterface with a persisted session and response cache.
+    - Reuses the device_login access token until it expires (or a call fails with it), across restarts
+    - Caches user searches and ship inspections with per-endpoint TTLs, for the life of the process
+    - Caches empty searches (unknown names) for a shorter negative TTL
+    - Coalesces concurrent identical requests into a single in-flight call
+    """
+
+    def __init__(self, cache_path: str = None, ttls: Dict[str, float] = None, client_factory=None) -> None:
+        super().__init__(client_factory)
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.cache = ResponseCache(cache_path)
+        self._inflight: Dict[str, _asyncio.Task] = {}
+        logger.info(f"Cached API Interface created (persisted: {'Yes' if cache_path else 'No'})")
+
+    async def init_pss_api_client(self):
+        try:
+            self.client = self.client_factory()
+            token_key = f"token:{self.device_key}"
+            token = self.cache.get(token_key)
+            if token:
+                self.access_token = token
+                logger.info("API Interface initialized with cached access token")
+                return
+            await self._login()
+        except Exception as e:
+            logging.error(f'Error in init_pss_api_client(self):: {e}')
+            raise
+
+    async def _login(self) -> None:
+        user_login = await self.client.device_login(self.device_key, self.checksum_key)
+        self.access_token = user_login.access_token
+        self.cache.set(f"token:{self.device_key}", self.access_token, self.ttls["token"])
+        logger.info("API Interface initialized")
+
+    async def _coalesced(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fetch once per key; concurrent callers with the same key await the same result.
+        The fetch runs in its own task, so cancelling any one caller (including the first)
+        leaves the others waiting on it.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = _asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+
+            def done(finished: _asyncio.Task) -> None:
+                if self._inflight.get(key) is finished:
+                    del self._inflight[key]
+                # Mark the exception as retrieved in case every caller was cancelled
+                if not finished.cancelled():
+                    finished.exception()
+
+            task.add_done_callback(done)
+        else:
+            logger.debug(f"Joining in-flight request {key}")
+        return await _asyncio.shield(task)
+
+    async def search_users(self, name: str) -> List[entities.User]:
+        """Search users by name, served from cache when fresh"""
+        key = f"search_users:{name}"
+        cached = self.cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            logger.debug(f"Cache hit for {key}")
+            return cached
+
+        async def fetch():
+            result = list(await self.client.user_service.search_users(name))
+            self.cache.set(key, result, self.ttls["search_users"] if result else self.ttls["negative"])
+            return result
+
+        return await self._coalesced(key, fetch)
+
+    async def get_users_by_name(self, names: list[str]) -> List[entities.User]:
+        """Get users by name"""
+        try:
+            # Ensure client is initialized
+            if not self.client:
+                await self.init_pss_api_client()
+
+            results = await _asyncio.gather(*[self.search_users(name) for name in names])
+            return [user for result in results for user in result]
+        except Exception as e:
+            logger.error(f"Error in get_users_by_name(self, names): {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            raise
+
+    async def get_ship_by_user(self, _user: entities.User) -> entities.Ship:
+        """Get ship for a user, served from cache when fresh"""
+        try:
+            # Ensure client is initialized
+            if not self.client:
+                await self.init_pss_api_client()
+
+            key = f"inspect_ship:{_user.id}"
+            cached = self.cache.get(key)
+            if cached is not None:
+                logger.debug(f"Cache hit for {key}")
+                return cached
+
+            async def fetch():
+                logger.info(f"Getting ship for user: {_user.name} (ID: {_user.id})")
+                try:
+                    temp_ship, temp_user = await self.client.ship_service.inspect_ship(self.access_token, _user.id)
+                except Exception as e:
+                    if not is_auth_error(e):
+                        raise
+                    # The cached token expired server side: log in again and retry once
+                    logger.warning(f"inspect_ship rejected the access token ({e}), logging in again and retrying")
+                    self.cache.delete(f"token:{self.device_key}")
+                    await self._login()
+                    temp_ship, temp_user = await self.client.ship_service.inspect_ship(self.access_token, _user.id)
+                self.cache.set(key, temp_ship, self.ttls["inspect_ship"])
+                return temp_ship
+
+            return await self._coalesced(key, fetch)
+        except Exception as e:
+            logger.error(f"Error in get_ship_by_user: {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            raise
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop the cached ship inspection for a user"""
+        self.cache.delete(f"inspect_ship:{user_id}")
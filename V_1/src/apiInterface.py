@@ -1,14 +1,25 @@
+from __future__ import annotations
 import logging
 import asyncio as _asyncio
-from typing import List, Dict, Any, Optional
-from pssapi import PssApiClient, entities
+from typing import List, Dict, Any, Optional, TYPE_CHECKING
+if TYPE_CHECKING:
+    from pssapi import entities
 
 # Get logger for this module
 logger = logging.getLogger('pss_companion.apiInterface')
 
 class apiInterface:
-    def __init__(self) -> None:
+    def __init__(self, client_factory=None) -> None:
+        """
+        :param client_factory: Callable returning the API client (defaults to PssApiClient).
+                               Used to swap in apiReplay recording/replay clients.
+        """
         try:
+            if client_factory is None:
+                # Imported on first use so importing this module doesn't load pssapi
+                from pssapi import PssApiClient
+                client_factory = PssApiClient
+            self.client_factory = client_factory
             self.client = None
             self.access_token = None
             self.device_key = "bdf1c128-1e7e-4a17-8e6e-98fd89e28f68"
@@ -21,7 +32,7 @@ class apiInterface:
 
     async def init_pss_api_client(self):
         try:
-            self.client = PssApiClient()
+            self.client = self.client_factory()
             user_login = await self.client.device_login(self.device_key, self.checksum_key)
             self.access_token = user_login.access_token
             logger.info("API Interface initialized")
@@ -42,7 +53,7 @@ class apiInterface:
         try:
             # Ensure client is initialized
             if not self.client:
-                await self.initialize()
+                await self.init_pss_api_client()
 
             tasks = [self.client.user_service.search_users(name) for name in names] 
             results = await _asyncio.gather(*tasks)
@@ -59,7 +70,7 @@ class apiInterface:
         try:
             # Ensure client is initialized
             if not self.client:
-                await self.initialize()
+                await self.init_pss_api_client()
                 
             # Implement ship retrieval logic
             logger.info(f"Getting ship for user: {_user.name} (ID: {_user.id})")
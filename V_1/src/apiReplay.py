@@ -0,0 +1,266 @@
+import logging
+import asyncio as _asyncio
+import os
+import json
+import time
+import pickle
+import random
+import sqlite3
+import threading
+import zlib
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.apiReplay')
+
+# Positional arguments that carry session secrets and are left out of fixture keys
+_IGNORED_ARGS = {
+    "device_login": (0, 1),
+    "inspect_ship": (0,),
+}
+
+class ReplayError(Exception):
+    """Raised by ReplayClient for injected failures and unrecorded requests."""
+    pass
+
+def _normalise(value: Any) -> Any:
+    """JSON-friendly form of an argument that doesn't depend on object identity"""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_normalise(item) for item in value]
+        return sorted(items, key=json.dumps) if isinstance(value, (set, frozenset)) else items
+    if isinstance(value, dict):
+        return {str(key): _normalise(item) for key, item in sorted(value.items(), key=lambda pair: str(pair[0]))}
+    # Entities (e.g. a pssapi User passed to a service) are identified by type and id
+    entity_id = getattr(value, "id", None)
+    if isinstance(entity_id, (str, int)):
+        return {"type": type(value).__name__, "id": entity_id}
+    return {"type": type(value).__name__}
+
+def fixture_key(service: str, method: str, args: tuple, kwargs: dict = None) -> str:
+    """Stable key for a call to service.method, ignoring tokens and device keys."""
+    ignored = _IGNORED_ARGS.get(method, ())
+    kept = [_normalise(arg) for index, arg in enumerate(args) if index not in ignored]
+    if kwargs:
+        kept.append({key: _normalise(value) for key, value in sorted(kwargs.items())})
+    return f"{service}.{method}:{json.dumps(kept, sort_keys=True)}"
+
+class FixtureStore:
+    """SQLite store of pickled API responses keyed by fixture_key()."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fixtures (key TEXT PRIMARY KEY, method TEXT NOT NULL, value BLOB NOT NULL, recorded REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_fixtures_method ON fixtures(method)")
+        self._conn.commit()
+        self._by_method: Dict[str, List[str]] = {}
+
+    def put(self, key: str, method: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO fixtures (key, method, value, recorded) VALUES (?, ?, ?, ?)",
+                (key, method, pickle.dumps(value), time.time()),
+            )
+            self._conn.commit()
+            self._by_method.pop(method, None)
+
+    def get(self, key: str) -> Any:
+        """Recorded response for a key; raises KeyError if there is none."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM fixtures WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return pickle.loads(row[0])
+
+    def keys_for(self, method: str) -> List[str]:
+        with self._lock:
+            keys = self._by_method.get(method)
+            if keys is None:
+                keys = [row[0] for row in self._conn.execute("SELECT key FROM fixtures WHERE method = ? ORDER BY key", (method,))]
+                self._by_method[method] = keys
+        return keys
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fixtures").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+
+class _RecordingService:
+    """Proxies one PssApiClient service and records every response."""
+
+    def __init__(self, service, service_name: str, store: FixtureStore) -> None:
+        self._service = service
+        self._service_name = service_name
+        self._store = store
+
+    def __getattr__(self, name: str):
+        method = getattr(self._service, name)
+        if not callable(method):
+            return method
+
+        async def record(*args, **kwargs):
+            result = await method(*args, **kwargs)
+            try:
+                self._store.put(fixture_key(self._service_name, name, args, kwargs), f"{self._service_name}.{name}", result)
+            except Exception as e:
+                logger.warning(f"Could not record {name}: {e}")
+            return result
+
+        return record
+
+class RecordingClient:
+    """Wraps a live PssApiClient, forwarding every call and saving the responses to a FixtureStore."""
+
+    def __init__(self, client, store: FixtureStore) -> None:
+        self._client = client
+        self._store = store
+        self._services: Dict[str, _RecordingService] = {}
+
+    async def device_login(self, *args, **kwargs):
+        result = await self._client.device_login(*args, **kwargs)
+        self._store.put(fixture_key("client", "device_login", args, kwargs), "client.device_login", result)
+        return result
+
+    def __getattr__(self, name: str):
+        if name.endswith("_service"):
+            if name not in self._services:
+                self._services[name] = _RecordingService(getattr(self._client, name), name, self._store)
+            return self._services[name]
+        return getattr(self._client, name)
+
+
+class _ReplayService:
+    def __init__(self, client: 'ReplayClient', service_name: str) -> None:
+        self._client = client
+        self._service_name = service_name
+
+    def __getattr__(self, name: str):
+        async def replay(*args, **kwargs):
+            return await self._client._serve(self._service_name, name, args, kwargs)
+        return replay
+
+class ReplayClient:
+    """
+    Offline stand-in for PssApiClient serving responses from a FixtureStore.
+    - latency: (min, max) seconds of simulated network delay per call
+    - error_rate: fraction of calls that raise ReplayError
+    - fallback: what to do with unrecorded calls: 'error' raises ReplayError, 'empty' returns [],
+                'any' serves a recorded response of the same service method (useful to fan a few
+                recordings out to hundreds of synthetic users)
+    """
+
+    def __init__(self, store: FixtureStore, latency: Tuple[float, float] = (0.0, 0.0), error_rate: float = 0.0,
+                 fallback: str = 'error', seed: int = None) -> None:
+        self.store = store
+        self.latency = latency
+        self.error_rate = error_rate
+        self.fallback = fallback
+        self._random = random.Random(seed)
+        self._services: Dict[str, _ReplayService] = {}
+        self.calls = 0
+        self.errors = 0
+
+    def __getattr__(self, name: str):
+        if name.endswith("_service"):
+            if name not in self._services:
+                self._services[name] = _ReplayService(self, name)
+            return self._services[name]
+        raise AttributeError(name)
+
+    async def device_login(self, *args, **kwargs):
+        return await self._serve("client", "device_login", args, kwargs)
+
+    async def _serve(self, service: str, method: str, args: tuple, kwargs: dict) -> Any:
+        self.calls += 1
+        low, high = self.latency
+        if high > 0:
+            await _asyncio.sleep(self._random.uniform(low, high))
+        if self.error_rate and self._random.random() < self.error_rate:
+            self.errors += 1
+            raise ReplayError(f"Injected failure for {method}")
+
+        key = fixture_key(service, method, args, kwargs)
+        try:
+            return self.store.get(key)
+        except KeyError:
+            pass
+        if self.fallback == 'empty':
+            return []
+        if self.fallback == 'any':
+            keys = self.store.keys_for(f"{service}.{method}")
+            if keys:
+                return self.store.get(keys[zlib.crc32(key.encode('utf-8')) % len(keys)])
+        self.errors += 1
+        raise ReplayError(f"No recorded response for {key}")
+
+
+def recording_factory(store: FixtureStore):
+    """client_factory for apiInterface that records live responses into store."""
+    from pssapi import PssApiClient
+    return lambda: RecordingClient(PssApiClient(), store)
+
+def replay_factory(store: FixtureStore, **options):
+    """client_factory for apiInterface that serves responses from store (see ReplayClient)."""
+    return lambda: ReplayClient(store, **options)
+
+async def run_load_test(api_interface, names: List[str], concurrency: int = 100) -> Dict[str, float]:
+    """
+    Look up users by name and fetch their ships with up to `concurrency` requests in flight.
+
+    Args:
+        api_interface: An apiInterface (normally built with replay_factory)
+        names: Player names to resolve
+        concurrency: Maximum concurrent lookups
+
+    Returns:
+        Dict with total time, throughput, p50/p95/max latency and error count
+    """
+    if not api_interface.client:
+        await api_interface.init_pss_api_client()
+    semaphore = _asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(name: str) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                users = await api_interface.get_users_by_name([name])
+                for user in users[:1]:
+                    await api_interface.get_ship_by_user(user)
+            except Exception as e:
+                errors += 1
+                logger.debug(f"Load test lookup for {name} failed: {e}")
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await _asyncio.gather(*[one(name) for name in names])
+    total = time.perf_counter() - started
+    latencies.sort()
+    result = {
+        "requests": len(names),
+        "errors": errors,
+        "total_s": total,
+        "throughput_rps": len(names) / total if total else 0.0,
+        "p50_s": latencies[len(latencies) // 2] if latencies else 0.0,
+        "p95_s": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        "max_s": latencies[-1] if latencies else 0.0,
+    }
+    logger.info(f"Load test: {result}")
+    return result
@@ -0,0 +1,254 @@
+import logging
+import asyncio as _asyncio
+import time
+import heapq
+import itertools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.apiScheduler')
+
+# Priority classes, lower runs first
+INTERACTIVE = 0   # overlay / user-facing lookups
+NORMAL = 1        # CLI runs
+BACKGROUND = 2    # crawls, collectors, batch scoring
+
+_priority = contextvars.ContextVar('pss_api_priority', default=NORMAL)
+
+@contextmanager
+def priority(level: int):
+    """Run API calls made inside this block (and tasks created in it) at the given priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def interactive():
+    return priority(INTERACTIVE)
+
+def background():
+    return priority(BACKGROUND)
+
+# Exception types (matched by name so aiohttp/pssapi needn't be imported) worth retrying
+_TRANSIENT_ERRORS = ("TimeoutError", "ConnectionError", "ClientConnectionError", "ClientPayloadError",
+                     "ServerTimeoutError", "ServerMaintenanceError")
+# Fragments of PSS error messages that mean the server is overloaded or throttling us
+_THROTTLE_HINTS = ("too many", "rate limit", "try again", "server error", "busy")
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether a failed call may succeed if repeated: network errors, timeouts, maintenance,
+    HTTP 429/5xx and throttling responses. Auth failures, other 4xx responses and
+    programming errors are not.
+    """
+    names = {cls.__name__ for cls in type(error).__mro__}
+    if names.intersection(_TRANSIENT_ERRORS):
+        return True
+    status = getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    if "PssApiError" in names:
+        message = str(getattr(error, "message", error)).lower()
+        return any(hint in message for hint in _THROTTLE_HINTS)
+    return False
+
+
+class TokenBucket:
+    """Token bucket whose refill rate can be changed on the fly."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if available and return 0, otherwise return the seconds until one is."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate if self.rate > 0 else 1.0
+
+
+class RequestScheduler:
+    """
+    Shared scheduler for PssApiClient service calls.
+    - Token bucket limits the request rate
+    - A concurrency window limits requests in flight
+    - Waiting requests are released strictly by priority class, then arrival order
+    - AIMD: rate and window grow additively on fast successes and are cut
+      multiplicatively (at most once per decrease_interval) on transient errors or slow responses
+    - Transient failures (see is_retryable) are retried with exponential backoff; other
+      errors are raised at once and don't slow the scheduler down
+    """
+
+    def __init__(self, rate: float = 5.0, burst: float = 10.0, max_in_flight: int = 8,
+                 min_rate: float = 0.5, max_rate: float = 50.0, additive_increase: float = 0.2,
+                 decrease_factor: float = 0.5, slow_threshold: float = 3.0, retries: int = 3,
+                 base_backoff: float = 0.5, max_backoff: float = 30.0, decrease_interval: float = 1.0) -> None:
+        self.bucket = TokenBucket(rate, burst)
+        self.max_in_flight = max_in_flight
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.slow_threshold = slow_threshold
+        self.retries = retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        # Failures of requests that were in flight together count as one congestion signal
+        self.decrease_interval = decrease_interval
+        self._last_decrease = float('-inf')
+
+        self.window = float(max_in_flight)
+        self._in_flight = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._cond: Optional[_asyncio.Condition] = None
+        self.stats = {"requests": 0, "errors": 0, "retries": 0, "slow": 0}
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _condition(self) -> _asyncio.Condition:
+        # Created lazily so the scheduler can be built outside a running loop
+        if self._cond is None:
+            self._cond = _asyncio.Condition()
+        return self._cond
+
+    async def _acquire(self, level: int) -> None:
+        ticket = (level, next(self._sequence))
+        cond = self._condition()
+        async with cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    timeout = None
+                    if self._waiting[0] == ticket and self._in_flight < max(1, int(self.window)):
+                        delay = self.bucket.try_acquire()
+                        if delay <= 0:
+                            break
+                        timeout = delay
+                    try:
+                        await _asyncio.wait_for(cond.wait(), timeout)
+                    except _asyncio.TimeoutError:
+                        pass
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                cond.notify_all()
+                raise
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            cond.notify_all()
+
+    async def _release(self) -> None:
+        cond = self._condition()
+        async with cond:
+            self._in_flight -= 1
+            cond.notify_all()
+
+    def _on_success(self, elapsed: float) -> None:
+        if elapsed > self.slow_threshold:
+            self.stats["slow"] += 1
+            self._decrease(f"slow response ({elapsed:.2f}s)")
+            return
+        self.bucket.rate = min(self.max_rate, self.bucket.rate + self.additive_increase)
+        self.window = min(float(self.max_in_flight), self.window + 1.0 / max(1.0, self.window))
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.decrease_interval:
+            return
+        self._last_decrease = now
+        self.bucket.rate = max(self.min_rate, self.bucket.rate * self.decrease_factor)
+        self.window = max(1.0, self.window * self.decrease_factor)
+        logger.info(f"Backing off ({reason}): rate {self.bucket.rate:.2f}/s, window {int(self.window)}")
+
+    async def run(self, func: Callable, *args, priority: int = None, retries: int = None, **kwargs) -> Any:
+        """
+        Await func(*args, **kwargs) under the scheduler's limits.
+        :param priority: Priority class; defaults to the one set with priority()/interactive()/background()
+        :param retries: Retries for transient failures (default: the scheduler's)
+        """
+        level = _priority.get() if priority is None else priority
+        retries = self.retries if retries is None else retries
+        attempt = 0
+        while True:
+            await self._acquire(level)
+            started = time.monotonic()
+            try:
+                self.stats["requests"] += 1
+                result = await func(*args, **kwargs)
+            except _asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["errors"] += 1
+                if not is_retryable(e):
+                    raise
+                self._decrease(f"error: {e}")
+                if attempt >= retries:
+                    raise
+            else:
+                self._on_success(time.monotonic() - started)
+                return result
+            finally:
+                await self._release()
+
+            attempt += 1
+            self.stats["retries"] += 1
+            backoff = min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1)))
+            logger.debug(f"Retrying {getattr(func, '__name__', func)} in {backoff:.2f}s (attempt {attempt}/{retries})")
+            await _asyncio.sleep(backoff)
+
+
+class _ScheduledService:
+    def __init__(self, service, scheduler: RequestScheduler) -> None:
+        self._service = service
+        self._scheduler = scheduler
+
+    def __getattr__(self, name: str):
+        method = getattr(self._service, name)
+        if not callable(method):
+            return method
+
+        async def scheduled(*args, **kwargs):
+            return await self._scheduler.run(method, *args, **kwargs)
+
+        return scheduled
+
+class ScheduledClient:
+    """Wraps a PssApiClient (or a record/replay client) so every service call goes through a RequestScheduler."""
+
+    def __init__(self, client, scheduler: RequestScheduler) -> None:
+        self._client = client
+        self._scheduler = scheduler
+        self._services: Dict[str, _ScheduledService] = {}
+
+    async def device_login(self, *args, **kwargs):
+        # Not retried: callers decide whether a failed login is worth repeating
+        return await self._scheduler.run(self._client.device_login, *args, priority=INTERACTIVE, retries=0, **kwargs)
+
+    def __getattr__(self, name: str):
+        if name.endswith("_service"):
+            if name not in self._services:
+                self._services[name] = _ScheduledService(getattr(self._client, name), self._scheduler)
+            return self._services[name]
+        return getattr(self._client, name)
+
+def scheduled_factory(scheduler: RequestScheduler, client_factory: Callable = None):
+    """client_factory for apiInterface routing all calls through scheduler (wrapping client_factory, default PssApiClient)."""
+    if client_factory is None:
+        from pssapi import PssApiClient
+        client_factory = PssApiClient
+    return lambda: ScheduledClient(client_factory(), scheduler)
@@ -0,0 +1,254 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from src.lazyImport import lazy_import
+from src import ship as _ship
+
+np = lazy_import("numpy")
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.battleSim')
+
+# Design times (reload_time, cooldown_time, activation_delay) are in game ticks
+TICKS_PER_SECOND = 40
+
+WEAPON_TYPES = ("Laser", "Missile", "Cannon")
+# Missiles can be shot down by anti-craft rooms
+INTERCEPTABLE_TYPES = ("Missile",)
+
+class ShipProfile:
+    """
+    Combat stats of one layout, extracted from its room and ship designs.
+    Per weapon: fire period, activation delay, damage per shot and whether anti-craft can intercept it.
+    Per ship: hull points, shield pool and regeneration, dodge and intercept chance, and the armor
+    damage factor of each room a shot can land on (weighted by the room's tile count).
+    """
+    __slots__ = ('hp', 'weapon_period', 'weapon_delay', 'weapon_damage', 'weapon_interceptable',
+                 'shield', 'shield_regen', 'dodge', 'intercept', 'target_factor', 'target_cumulative')
+
+    def __init__(self, hp: float, weapons: list, shield: float, shield_regen: float, dodge: float,
+                 intercept: float, targets: list) -> None:
+        """
+        :param weapons: [(period ticks, activation delay ticks, damage, interceptable), ...]
+        :param targets: [(armor damage factor, weight), ...]
+        """
+        self.hp = float(hp)
+        self.weapon_period = np.array([w[0] for w in weapons], dtype=float)
+        self.weapon_delay = np.array([w[1] for w in weapons], dtype=float)
+        self.weapon_damage = np.array([w[2] for w in weapons], dtype=float)
+        self.weapon_interceptable = np.array([w[3] for w in weapons], dtype=bool)
+        self.shield = float(shield)
+        self.shield_regen = float(shield_regen)
+        self.dodge = float(dodge)
+        self.intercept = float(intercept)
+        targets = targets or [(1.0, 1.0)]
+        weights = np.array([t[1] for t in targets], dtype=float)
+        self.target_factor = np.array([t[0] for t in targets], dtype=float)
+        self.target_cumulative = np.cumsum(weights / weights.sum())
+
+    def __repr__(self) -> str:
+        return (f"ShipProfile(hp={self.hp}, weapons={len(self.weapon_period)}, shield={self.shield}, "
+                f"dodge={self.dodge:.2f}, intercept={self.intercept:.2f})")
+
+class BattleEstimate:
+    """Aggregated outcome of a batch of simulated duels, from the first ship's point of view."""
+    __slots__ = ('win_probability', 'loss_probability', 'draw_probability', 'time_to_kill', 'time_to_die', 'simulations')
+
+    def __init__(self, win_probability: float, loss_probability: float, draw_probability: float,
+                 time_to_kill: Optional[float], time_to_die: Optional[float], simulations: int) -> None:
+        self.win_probability = win_probability
+        self.loss_probability = loss_probability
+        self.draw_probability = draw_probability
+        # Median seconds until the opponent's / own hull is destroyed, over the duels where it was
+        self.time_to_kill = time_to_kill
+        self.time_to_die = time_to_die
+        self.simulations = simulations
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def as_features(self, prefix: str = "sim_") -> dict:
+        """
+        Flat numeric features for Agent training/prediction (unreached times become -1).
+        The simulator uses a weapon's max_system_power as its damage per shot, so win_prob is a
+        relative strength signal, not a calibrated probability; let the model learn how to weight it.
+        """
+        return {
+            f"{prefix}win_prob": self.win_probability,
+            f"{prefix}draw_prob": self.draw_probability,
+            f"{prefix}ttk": self.time_to_kill if self.time_to_kill is not None else -1.0,
+            f"{prefix}ttd": self.time_to_die if self.time_to_die is not None else -1.0,
+        }
+
+    def __repr__(self) -> str:
+        return (f"BattleEstimate(win={self.win_probability:.2f}, loss={self.loss_probability:.2f}, "
+                f"draw={self.draw_probability:.2f}, ttk={self.time_to_kill}, ttd={self.time_to_die})")
+
+class BattleSimulator:
+    """
+    Monte Carlo estimate of a duel between two layouts.
+    Thousands of duels run at once as NumPy arrays (duels x weapons), stepping time in fixed
+    increments. Each duel draws its own weapon charge offsets, hits, interceptions and the rooms
+    shots land on. The model is deliberately simple: it ignores crew, power, system damage and
+    boarding, and uses a weapon's max_system_power as its damage per shot.
+    """
+
+    def __init__(self, room_designs: dict, ship_designs: dict, damage_per_power: float = 1.0,
+                 armor_half_value: float = 24.0, max_dodge: float = 0.5, max_intercept: float = 0.5,
+                 intercept_per_room: float = 0.1, time_step: int = 20, max_time: float = 300.0,
+                 profile_cache_size: int = 256) -> None:
+        """
+        :param room_designs: Room designs keyed by str(room_design_id)
+        :param ship_designs: Ship designs keyed by str(ship_design_id)
+        :param damage_per_power: Damage per shot for each point of a weapon's max_system_power
+        :param armor_half_value: Room armor at which hull damage from hits on that room is halved
+        :param time_step: Ticks simulated per step
+        :param max_time: Seconds after which a duel still running counts as a draw
+        """
+        self.room_designs = room_designs or {}
+        self.ship_designs = ship_designs or {}
+        self.damage_per_power = damage_per_power
+        self.armor_half_value = armor_half_value
+        self.max_dodge = max_dodge
+        self.max_intercept = max_intercept
+        self.intercept_per_room = intercept_per_room
+        self.time_step = max(1, int(time_step))
+        self.max_time = max_time
+        self.profile_cache_size = profile_cache_size
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _room_design(self, design_id) -> dict:
+        return self.room_designs.get(str(design_id)) or {}
+
+    def profile(self, ship) -> ShipProfile:
+        """
+        Combat profile of a Ship, or of a ship dict as stored in usr_data
+        ({"ship_design_id": ..., "ship_rooms": [room dicts]}); cached per design and layout.
+        """
+        if isinstance(ship, dict):
+            ship_design_id = ship.get("ship_design_id")
+            room_dicts = ship.get("ship_rooms") or []
+        else:
+            ship_design_id = (ship.ship or {}).get("ship_design_id")
+            room_dicts = [room.to_dict() for room in ship.shipRooms]
+        key = (str(ship_design_id), _ship.Ship.layout_fingerprint(room_dicts))
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is not None:
+                self._profiles.move_to_end(key)
+                return profile
+        profile = self._build_profile(ship_design_id, room_dicts)
+        with self._lock:
+            self._profiles[key] = profile
+            while len(self._profiles) > self.profile_cache_size:
+                self._profiles.popitem(last=False)
+        return profile
+
+    def _build_profile(self, ship_design_id, room_dicts: list) -> ShipProfile:
+        ship_design = self.ship_designs.get(str(ship_design_id)) or {}
+        hp = float(ship_design.get("hp") or 0) or 1.0
+        weapons = []
+        targets = []
+        shield = shield_regen = engine_capacity = 0.0
+        anti_craft = 0
+        for room in room_dicts:
+            if not room:
+                continue
+            design = self._room_design(room.get("room_design_id"))
+            room_type = room.get("room_type") or design.get("room_type")
+            if room_type == "Wall":
+                continue
+            reload_time = float(design.get("reload_time") or 0)
+            capacity = float(design.get("capacity") or 0)
+            if room_type in WEAPON_TYPES and reload_time > 0:
+                period = reload_time + float(design.get("cooldown_time") or 0)
+                damage = float(design.get("max_system_power") or 0) * self.damage_per_power
+                weapons.append((period, float(design.get("activation_delay") or 0), damage,
+                                room_type in INTERCEPTABLE_TYPES))
+            elif room_type == "Shield":
+                shield += capacity
+                if reload_time > 0:
+                    shield_regen += 1.0 / reload_time
+            elif room_type == "Engine":
+                engine_capacity += capacity
+            elif room_type == "AntiCraft":
+                anti_craft += 1
+            columns, rows = room.get("room_size") or (1, 1)
+            armor = float(room.get("room_armor") or 0)
+            targets.append((1.0 - armor / (armor + self.armor_half_value), (columns or 1) * (rows or 1)))
+        # Engine capacity is read as a dodge percentage
+        dodge = min(self.max_dodge, engine_capacity / 100.0)
+        intercept = min(self.max_intercept, anti_craft * self.intercept_per_room)
+        return ShipProfile(hp, weapons, shield, shield_regen, dodge, intercept, targets)
+
+    def _damage(self, rng, attacker: ShipProfile, defender: ShipProfile, charge, active):
+        """Advance attacker's weapons one step; returns (raw damage, armor-adjusted damage) per duel"""
+        charge += self.time_step * active[:, None]
+        fired = charge >= attacker.weapon_period
+        charge[fired] -= np.broadcast_to(attacker.weapon_period, charge.shape)[fired]
+        lands = fired & (rng.random(charge.shape) >= defender.dodge)
+        if defender.intercept > 0 and attacker.weapon_interceptable.any():
+            intercepted = attacker.weapon_interceptable & (rng.random(charge.shape) < defender.intercept)
+            lands &= ~intercepted
+        damage = lands * attacker.weapon_damage
+        adjusted = damage.copy()
+        landed = np.nonzero(lands)
+        if landed[0].size:
+            # Room each landed shot hits, drawn by tile count
+            rooms = np.searchsorted(defender.target_cumulative, rng.random(landed[0].size), side='right')
+            adjusted[landed] *= defender.target_factor[np.minimum(rooms, len(defender.target_factor) - 1)]
+        return damage.sum(axis=1), adjusted.sum(axis=1)
+
+    def simulate(self, first: ShipProfile, second: ShipProfile, simulations: int = 2000, seed: int = None) -> BattleEstimate:
+        """Run simulations duels between two profiles"""
+        rng = np.random.default_rng(seed)
+        n = max(1, int(simulations))
+        profiles = (first, second)
+        # Random charge offsets so weapons don't all fire in lockstep; activation delay holds them back
+        charges = [rng.random((n, len(p.weapon_period))) * p.weapon_period - p.weapon_delay for p in profiles]
+        hp = [np.full(n, p.hp) for p in profiles]
+        shields = [np.full(n, p.shield) for p in profiles]
+        death = [np.full(n, np.inf) for _ in profiles]
+        alive = np.ones(n, dtype=bool)
+        steps = int(self.max_time * TICKS_PER_SECOND // self.time_step)
+        for step in range(1, steps + 1):
+            if not alive.any():
+                break
+            hits = [self._damage(rng, profiles[i], profiles[1 - i], charges[i], alive) for i in (0, 1)]
+            for i in (0, 1):
+                raw, adjusted = hits[1 - i]
+                absorbed = np.minimum(shields[i], raw)
+                shields[i] -= absorbed
+                # The part of the damage that got through the shield, reduced by the armor of the rooms hit
+                through = np.where(raw > 0, adjusted * (1.0 - absorbed / np.maximum(raw, 1e-9)), 0.0)
+                hp[i] -= through * alive
+                shields[i] = np.minimum(profiles[i].shield, shields[i] + profiles[i].shield_regen * self.time_step)
+            time = step * self.time_step / TICKS_PER_SECOND
+            for i in (0, 1):
+                died = alive & (hp[i] <= 0)
+                death[i][died] = time
+            alive &= (hp[0] > 0) & (hp[1] > 0)
+
+        wins = death[1] < death[0]
+        losses = death[0] < death[1]
+        draws = ~(wins | losses)
+        median = lambda values: float(np.median(values)) if values.size else None
+        return BattleEstimate(
+            win_probability=float(wins.mean()),
+            loss_probability=float(losses.mean()),
+            draw_probability=float(draws.mean()),
+            time_to_kill=median(death[1][np.isfinite(death[1])]),
+            time_to_die=median(death[0][np.isfinite(death[0])]),
+            simulations=n,
+        )
+
+    def estimate(self, first, second, simulations: int = 2000, seed: int = None) -> BattleEstimate:
+        """Estimate a duel between two Ships (or usr_data ship dicts), from the first ship's point of view"""
+        try:
+            return self.simulate(self.profile(first), self.profile(second), simulations, seed)
+        except Exception as e:
+            logger.error(f"Error simulating battle: {e}")
+            raise
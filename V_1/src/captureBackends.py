@@ -0,0 +1,178 @@
+import logging
+import os
+import glob
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence, Tuple
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.captureBackends')
+
+Region = Tuple[int, int, int, int]
+
+def _normalize_region(region) -> Region:
+    x1, y1, x2, y2 = (int(round(value)) for value in region)
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+def union_region(regions: Sequence) -> Region:
+    """Smallest box (x1, y1, x2, y2) containing every region."""
+    boxes = [_normalize_region(region) for region in regions]
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+class CaptureBackend(ABC):
+    """Interface for screen capture sources used by OCRProcessor."""
+    name = "base"
+
+    @abstractmethod
+    def grab_frame(self, bbox: Region):
+        """Capture one PIL image of the box (x1, y1, x2, y2)."""
+
+    def grab(self, region) -> object:
+        """Capture a single region."""
+        return self.grab_regions([region])[0]
+
+    def grab_regions(self, regions: Sequence) -> List[object]:
+        """Capture several regions from one frame (one grab of their union, then crops)."""
+        boxes = [_normalize_region(region) for region in regions]
+        bounds = union_region(boxes)
+        frame = self.grab_frame(bounds)
+        left, top = bounds[0], bounds[1]
+        return [frame.crop((x1 - left, y1 - top, x2 - left, y2 - top)) for x1, y1, x2, y2 in boxes]
+
+    def close(self) -> None:
+        pass
+
+
+class PILCaptureBackend(CaptureBackend):
+    """PIL.ImageGrab capture (Windows/macOS, X11 with xdisplay)."""
+    name = "pil"
+
+    def __init__(self) -> None:
+        from PIL import ImageGrab
+        self._grab = ImageGrab.grab
+
+    def grab_frame(self, bbox: Region):
+        return self._grab(bbox=bbox)
+
+
+class MSSCaptureBackend(CaptureBackend):
+    """
+    Native capture via mss (XShm on Linux, BitBlt on Windows, CoreGraphics on macOS).
+    The mss handle is kept open and decoded frames are written into a reused PIL image
+    of the same size, so steady-state polling allocates no new frame buffers.
+    Region crops are copies, so they stay valid after the next grab.
+    """
+    name = "mss"
+
+    def __init__(self) -> None:
+        import mss
+        from PIL import Image
+        self._Image = Image
+        self._sct = mss.mss()
+        self._lock = threading.Lock()
+        self._frame = None
+        logger.info("Initialized mss capture backend")
+
+    def grab_frame(self, bbox: Region):
+        x1, y1, x2, y2 = bbox
+        size = (x2 - x1, y2 - y1)
+        with self._lock:
+            shot = self._sct.grab({"left": x1, "top": y1, "width": size[0], "height": size[1]})
+            if self._frame is None or self._frame.size != size:
+                self._frame = self._Image.new("RGB", size)
+            self._frame.frombytes(shot.bgra, "raw", "BGRX")
+            return self._frame
+
+    def close(self) -> None:
+        with self._lock:
+            if self._sct:
+                self._sct.close()
+                self._sct = None
+
+
+class FileCaptureBackend(CaptureBackend):
+    """
+    Serves stored screenshots instead of the live screen (headless testing and benchmarks).
+    Each grab advances to the next file when a directory is given.
+    """
+    name = "file"
+
+    def __init__(self, path: str, loop: bool = True) -> None:
+        from PIL import Image
+        if os.path.isdir(path):
+            self.paths = sorted(glob.glob(os.path.join(path, "*.png")) + glob.glob(os.path.join(path, "*.jpg")))
+        else:
+            self.paths = [path]
+        if not self.paths:
+            raise FileNotFoundError(f"No screenshots found at {path}")
+        self.loop = loop
+        self._index = 0
+        self._images = {}
+        self._Image = Image
+
+    def _next_image(self):
+        path = self.paths[self._index]
+        if self._index + 1 < len(self.paths):
+            self._index += 1
+        elif self.loop:
+            self._index = 0
+        image = self._images.get(path)
+        if image is None:
+            with self._Image.open(path) as loaded:
+                image = self._images[path] = loaded.convert("RGB")
+        return image
+
+    def grab_frame(self, bbox: Region):
+        return self._next_image().crop(bbox)
+
+
+class SyntheticCaptureBackend(CaptureBackend):
+    """
+    Renders known text into regions, for exercising the OCR pipeline without a screen.
+    texts maps a region tuple to the text drawn in it; other pixels are white.
+    """
+    name = "synthetic"
+
+    def __init__(self, texts: dict = None, size: Tuple[int, int] = (1920, 1080)) -> None:
+        from PIL import Image, ImageDraw
+        self._Image = Image
+        self._ImageDraw = ImageDraw
+        self.size = size
+        self.texts = {}
+        for region, text in (texts or {}).items():
+            self.set_text(region, text)
+
+    def set_text(self, region, text: str) -> None:
+        self.texts[_normalize_region(region)] = text
+
+    def grab_frame(self, bbox: Region):
+        frame = self._Image.new("RGB", (bbox[2] - bbox[0], bbox[3] - bbox[1]), "white")
+        draw = self._ImageDraw.Draw(frame)
+        for (x1, y1, x2, y2), text in self.texts.items():
+            draw.text((x1 - bbox[0] + 2, y1 - bbox[1] + 2), text, fill="black")
+        return frame
+
+
+def create_capture_backend(preferred: str = "auto", **kwargs) -> Optional[CaptureBackend]:
+    """
+    Create a capture backend.
+    :param preferred: 'mss', 'pil', 'file' (requires path=...), 'synthetic' or 'auto' (mss, then PIL)
+    :return: The backend, or None if nothing is available
+    """
+    order = ["mss", "pil"] if preferred == "auto" else [preferred]
+    for name in order:
+        try:
+            if name == "mss":
+                return MSSCaptureBackend()
+            if name == "pil":
+                return PILCaptureBackend()
+            if name == "file":
+                return FileCaptureBackend(**kwargs)
+            if name == "synthetic":
+                return SyntheticCaptureBackend(**kwargs)
+        except ImportError:
+            logger.info(f"Capture backend {name} not available")
+        except Exception as e:
+            logger.error(f"Error initializing capture backend {name}: {e}")
+    logger.error("No capture backend available")
+    return None
@@ -0,0 +1,208 @@
+import logging
+import asyncio as _asyncio
+import os
+import json
+import time
+import random
+import heapq
+from typing import Dict, Any, List, Optional
+
+from src import user as _user
+from src import ship as _ship
+from src import apiScheduler as _apiScheduler
+from src import fileManager as _fileManager
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.collector')
+
+class WatchEntry:
+    """Polling state for one tracked player."""
+    __slots__ = ('user_id', 'user_name', 'interval', 'next_due', 'fingerprint', 'polls', 'changes', 'failures')
+
+    def __init__(self, user_id: int, user_name: str, interval: float, next_due: float = 0.0,
+                 fingerprint: str = None, polls: int = 0, changes: int = 0, failures: int = 0) -> None:
+        self.user_id = user_id
+        self.user_name = user_name
+        self.interval = interval
+        self.next_due = next_due
+        self.fingerprint = fingerprint
+        self.polls = polls
+        self.changes = changes
+        self.failures = failures
+
+    def to_dict(self) -> dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'WatchEntry':
+        return cls(**{slot: data[slot] for slot in cls.__slots__ if slot in data})
+
+class SnapshotCollector:
+    """
+    Long-running asyncio service that snapshots the ships of a watch list of players.
+    - Each player is polled on its own schedule with random jitter
+    - The interval halves when the layout changed and grows when it didn't,
+      bounded by min_interval and max_interval
+    - A snapshot is only written to usr_data when the layout fingerprint differs
+    - The watch list and schedule are persisted so a restart resumes where it left off
+    """
+
+    def __init__(self, api_interface, room_designs: dict, ship_designs: dict, file_manager: _fileManager.FileManager,
+                 state_file: str = 'collector_state.json', base_interval: float = 6 * 3600,
+                 min_interval: float = 30 * 60, max_interval: float = 7 * 24 * 3600, jitter: float = 0.2,
+                 concurrency: int = 8, growth: float = 1.5, layout_index=None) -> None:
+        self.api_interface = api_interface
+        self.room_designs = room_designs
+        self.ship_designs = ship_designs
+        self.file_manager = file_manager
+        self.state_file = state_file
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.growth = growth
+        # Optional LayoutIndex kept up to date with every new layout
+        self.layout_index = layout_index
+        self.watch: Dict[int, WatchEntry] = {}
+        self._queue = []  # heap of (next_due, user_id)
+        self._stop = _asyncio.Event()
+        self._wakeup = _asyncio.Event()
+        self.load_state()
+
+    def _schedule(self, entry: WatchEntry, delay: float) -> None:
+        spread = 1.0 + random.uniform(-self.jitter, self.jitter)
+        entry.next_due = time.time() + max(0.0, delay * spread)
+        heapq.heappush(self._queue, (entry.next_due, entry.user_id))
+
+    def add_user(self, user_id: int, user_name: str, poll_now: bool = True) -> WatchEntry:
+        """Add a player to the watch list (no-op if already watched)."""
+        entry = self.watch.get(user_id)
+        if entry:
+            return entry
+        entry = WatchEntry(user_id, user_name, self.base_interval, fingerprint=self._stored_fingerprint(user_id, user_name))
+        self.watch[user_id] = entry
+        self._schedule(entry, 0.0 if poll_now else self.base_interval)
+        self._wakeup.set()
+        logger.info(f"Watching {user_name} ({user_id})")
+        return entry
+
+    def remove_user(self, user_id: int) -> None:
+        """Stop watching a player; their queue entry is dropped when it comes due."""
+        if self.watch.pop(user_id, None):
+            logger.info(f"Stopped watching user {user_id}")
+
+    def _stored_fingerprint(self, user_id: int, user_name: str) -> Optional[str]:
+        """Fingerprint of the latest snapshot already on disk, so restarts don't write duplicates."""
+        file_path = f"usr_data/{user_name}_{user_id}.gz"
+        if not os.path.exists(os.path.join(self.file_manager.base_dir, file_path)):
+            return None
+        data = self.file_manager.load_gzip_json(filepath=file_path, default=None)
+        if not data or not data.get("dated_data"):
+            return None
+        latest = max(data["dated_data"], key=lambda entry: entry["date"])
+        try:
+            return _ship.Ship.layout_fingerprint(latest["user_ship"]["ship_rooms"])
+        except Exception as e:
+            logger.warning(f"Could not fingerprint stored snapshot for {user_name}: {e}")
+            return None
+
+    def load_state(self) -> None:
+        """Restore the watch list and schedule from the state file."""
+        if not os.path.exists(os.path.join(self.file_manager.base_dir, self.state_file)):
+            return
+        state = self.file_manager.load_json(self.state_file, default=None)
+        if not state:
+            return
+        for data in state.get("watch", []):
+            entry = WatchEntry.from_dict(data)
+            self.watch[entry.user_id] = entry
+            heapq.heappush(self._queue, (entry.next_due, entry.user_id))
+        logger.info(f"Restored {len(self.watch)} watched users from {self.state_file}")
+
+    def save_state(self) -> None:
+        """Persist the watch list atomically."""
+        path = os.path.join(self.file_manager.base_dir, self.state_file)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({"saved": time.time(), "watch": [entry.to_dict() for entry in self.watch.values()]}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error saving collector state: {e}")
+
+    async def poll(self, entry: WatchEntry) -> bool:
+        """Snapshot one player. Returns True if a new layout was written."""
+        entry.polls += 1
+        with _apiScheduler.background():
+            found = await self.api_interface.get_users_by_name([entry.user_name])
+            api_user = next((u for u in found if u.id == entry.user_id), None)
+            if api_user is None:
+                raise LookupError(f"User {entry.user_name} ({entry.user_id}) not found")
+            user = await _user.User.create(self.api_interface, api_user, self.room_designs, self.ship_designs)
+
+        entry.user_name = user.user_name
+        fingerprint = user.ship.fingerprint
+        if fingerprint == entry.fingerprint:
+            entry.interval = min(self.max_interval, entry.interval * self.growth)
+            logger.debug(f"No layout change for {entry.user_name}, next poll in ~{entry.interval:.0f}s")
+            return False
+
+        user.to_file(_fileManager=self.file_manager, check_time=False)
+        if self.layout_index is not None:
+            snapshot = user.to_dict_dated_data()
+            self.layout_index.add(user.user_id, user.user_name, snapshot["date"], snapshot["user_ship"], snapshot.get("highest_trophy"),
+                                  source=os.path.join(self.file_manager.base_dir, f"usr_data/{user.user_name}_{user.user_id}.gz"))
+        entry.fingerprint = fingerprint
+        entry.changes += 1
+        entry.interval = max(self.min_interval, entry.interval / 2)
+        logger.info(f"New layout for {entry.user_name} saved, next poll in ~{entry.interval:.0f}s")
+        return True
+
+    async def _poll_entry(self, entry: WatchEntry, semaphore: _asyncio.Semaphore) -> None:
+        async with semaphore:
+            try:
+                await self.poll(entry)
+                entry.failures = 0
+                self._schedule(entry, entry.interval)
+            except Exception as e:
+                entry.failures += 1
+                retry = min(entry.interval, self.min_interval * (2 ** min(entry.failures, 6)))
+                logger.error(f"Error polling {entry.user_name}: {e}; retrying in ~{retry:.0f}s")
+                self._schedule(entry, retry)
+
+    def _pop_due(self) -> List[WatchEntry]:
+        now = time.time()
+        due = []
+        while self._queue and self._queue[0][0] <= now:
+            next_due, user_id = heapq.heappop(self._queue)
+            entry = self.watch.get(user_id)
+            # Skip removed users and stale heap entries superseded by a reschedule
+            if entry and entry.next_due == next_due:
+                due.append(entry)
+        return due
+
+    async def run(self) -> None:
+        """Poll until stop() is called."""
+        logger.info(f"Snapshot collector started with {len(self.watch)} users")
+        semaphore = _asyncio.Semaphore(self.concurrency)
+        try:
+            while not self._stop.is_set():
+                due = self._pop_due()
+                if due:
+                    await _asyncio.gather(*[self._poll_entry(entry, semaphore) for entry in due])
+                    self.save_state()
+                    continue
+                delay = self._queue[0][0] - time.time() if self._queue else 60.0
+                self._wakeup.clear()
+                try:
+                    await _asyncio.wait_for(self._wakeup.wait(), timeout=max(0.1, min(delay, 60.0)))
+                except _asyncio.TimeoutError:
+                    pass
+        finally:
+            self.save_state()
+            logger.info("Snapshot collector stopped")
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
@@ -1,6 +1,8 @@
 import json
 import os
+import hashlib
 import logging
+import threading
 from typing import Dict, Any, Optional
 
 # Get logger for this module
@@ -22,29 +24,107 @@ _DEFAULT_CONFIG = {
     }
 }
 
-# Global variables to store loaded configuration
-_config_data = {}
-_config_loaded = False
+# Candidate locations for custom_data.json, in the order they are tried (the working
+# directory first, as before; the repository's data/ folder last)
+_CONFIG_PATHS = [
+    'data/custom_data.json',
+    'custom_data.json',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'custom_data.json'),
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data', 'custom_data.json'),
+]
+
+class ConfigSnapshot:
+    """
+    Immutable, precomputed view of the configuration.
+    A new snapshot is built on every (re)load and swapped in with a single assignment,
+    so readers always see a consistent set of values without locking.
+    """
+    __slots__ = ('data', 'path', 'essential_rooms', 'armor_values', 'stamp', 'digest')
+
+    def __init__(self, data: Dict[str, Any], path: Optional[str] = None, stamp: Optional[tuple] = None) -> None:
+        self.data = data
+        self.path = path
+        self.stamp = stamp
+        self.essential_rooms = frozenset(data.get("essensal_rooms", _DEFAULT_CONFIG["essensal_rooms"]))
+        self.armor_values = self._build_armor_table(data.get("armor_value_per_lvl", _DEFAULT_CONFIG["armor_value_per_lvl"]))
+        # Content hash of the settings; results computed from one snapshot are keyed by it
+        self.digest = hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+
+    @staticmethod
+    def _build_armor_table(armor_per_lvl: Dict[str, Any]) -> tuple:
+        """Convert {"1": 2, ...} into a tuple indexed by ship level (index 0 unused)."""
+        levels = {}
+        for level, value in armor_per_lvl.items():
+            try:
+                levels[int(level)] = int(value)
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring invalid armor entry: {level}={value}")
+        table = [0] * (max(levels, default=0) + 1)
+        for level, value in levels.items():
+            if level >= 0:
+                table[level] = value
+        return tuple(table)
+
+    def armor_value(self, level: int) -> int:
+        """Armor value for a ship level, or 0 if the level is unknown."""
+        table = self.armor_values
+        if type(level) is not int:
+            try:
+                level = int(level)
+            except (TypeError, ValueError):
+                return 0
+        if not 0 <= level < len(table):
+            return 0
+        return table[level]
+
+# Global snapshot of the loaded configuration (None until first use)
+_snapshot: Optional[ConfigSnapshot] = None
+_snapshot_lock = threading.Lock()
+_watcher = None
+
+def get_snapshot() -> ConfigSnapshot:
+    """Get the current configuration snapshot, loading it if necessary."""
+    snapshot = _snapshot
+    if snapshot is None:
+        with _snapshot_lock:
+            if _snapshot is None:
+                _swap(_load_snapshot())
+            snapshot = _snapshot
+    return snapshot
 
 def get_config(reload: bool = False) -> Dict[str, Any]:
     """Get the configuration data, loading it if necessary."""
-    global _config_data, _config_loaded
-    
-    if not _config_loaded or reload:
-        _config_data = _load_config()
-        _config_loaded = True
-    
-    return _config_data
+    if reload:
+        _swap(_load_snapshot())
+    return get_snapshot().data
+
+def _swap(snapshot: ConfigSnapshot) -> None:
+    global _snapshot
+    _snapshot = snapshot
 
-def _load_config() -> Dict[str, Any]:
+def _resolve_config_path() -> Optional[str]:
+    for path in _CONFIG_PATHS:
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+    return None
+
+def _file_stamp(path: str) -> Optional[tuple]:
+    try:
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        return None
+
+def _load_snapshot() -> ConfigSnapshot:
+    path = _resolve_config_path()
+    data = _load_config(path)
+    if data is _DEFAULT_CONFIG:
+        path = None
+    return ConfigSnapshot(data, path, _file_stamp(path) if path else None)
+
+def _load_config(path: Optional[str] = None) -> Dict[str, Any]:
     """Load configuration from the custom_data.json file."""
-    config_paths = [
-        'data/custom_data.json',
-        'custom_data.json',
-        os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data/custom_data.json')
-    ]
-    
-    for path in config_paths:
+    if path:
         try:
             logger.debug(f"Attempting to load config from: {path}")
             with open(path, 'r') as f:
@@ -53,42 +133,103 @@ def _load_config() -> Dict[str, Any]:
                 return data
         except FileNotFoundError:
             logger.debug(f"Config file not found at: {path}")
-            continue
         except json.JSONDecodeError:
             logger.error(f"Invalid JSON in config file: {path}")
-            continue
         except Exception as e:
             logger.error(f"Error loading config from {path}: {e}")
-            continue
     
     # If we get here, we couldn't load the config file
     logger.warning("Failed to load config file, using default configuration")
     return _DEFAULT_CONFIG
 
-def get_essential_rooms() -> list:
-    """Get the list of essential rooms."""
-    return get_config().get("essensal_rooms", _DEFAULT_CONFIG["essensal_rooms"])
+def get_essential_rooms() -> frozenset:
+    """Get the set of essential rooms."""
+    return get_snapshot().essential_rooms
 
 def get_armor_value(level: int) -> int:
     """Get the armor value for a given ship level."""
-    armor_values = get_config().get("armor_value_per_lvl", _DEFAULT_CONFIG["armor_value_per_lvl"])
-    # Convert level to string for dictionary lookup
-    level_str = str(level)
-    # Return the armor value for the level, or 0 if not found
-    return int(armor_values.get(level_str, 0))
+    return get_snapshot().armor_value(level)
 
 def get_setting(key: str, default: Any = None) -> Any:
     """Get a specific setting from the config."""
-    return get_config().get(key, default)
+    return get_snapshot().data.get(key, default)
 
 def reload_config() -> bool:
     """Force reload of configuration data."""
     try:
-        global _config_loaded
-        _config_loaded = False
-        get_config(reload=True)
+        _swap(_load_snapshot())
         logger.info("Configuration reloaded successfully")
         return True
     except Exception as e:
         logger.error(f"Error reloading configuration: {e}")
-        return False
\ No newline at end of file
+        return False
+
+class ConfigWatcher:
+    """
+    Polls custom_data.json in a daemon thread and swaps in a new snapshot when it changes.
+    A file that fails to parse keeps the previous snapshot in place.
+    """
+
+    def __init__(self, interval: float = 2.0) -> None:
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        # Stamp of the last version of the file that failed to load, so it's reported once
+        self._failed_stamp = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ConfigWatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching configuration for changes every {self.interval}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def check(self) -> bool:
+        """Reload if the config file changed. Returns True if a new snapshot was installed."""
+        current = get_snapshot()
+        path = current.path or _resolve_config_path()
+        if not path:
+            return False
+        stamp = _file_stamp(path)
+        if stamp is None or stamp == current.stamp or stamp == self._failed_stamp:
+            return False
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            self._failed_stamp = stamp
+            logger.error(f"Config change detected but could not be loaded, keeping previous values: {e}")
+            return False
+        self._failed_stamp = None
+        _swap(ConfigSnapshot(data, path, stamp))
+        logger.info(f"Configuration hot-reloaded from {path}")
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"Error in config watcher: {e}")
+
+def start_watching(interval: float = 2.0) -> ConfigWatcher:
+    """Start (or return the running) background watcher for custom_data.json."""
+    global _watcher
+    if _watcher is None:
+        _watcher = ConfigWatcher(interval)
+    _watcher.start()
+    return _watcher
+
+def stop_watching() -> None:
+    """Stop the background config watcher if it is running."""
+    global _watcher
+    if _watcher:
+        _watcher.stop()
+        _watcher = None
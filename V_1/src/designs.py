@@ -1,6 +1,5 @@
 import json
 import logging
-from pssapi import PssApiClient
 
 from src import fileManager as _fileManager
 
@@ -64,6 +63,8 @@ async def save_designs_to_files(api_interface, file_manager: _fileManager.FileMa
                 logger.info(f"Created item designs files at: {file_manager.save_json(filepath='designs/item_designs.json', data=room_designs['item_designs'])}")
                 logger.info(f"Created ship designs files at: {file_manager.save_json(filepath='designs/ship_designs.json', data=room_designs['ship_designs'])}")
                 logger.info(f"Created crew designs files at: {file_manager.save_json(filepath='designs/crew_designs.json', data=room_designs['crew_designs'])}")
+                for kind in ('room', 'item', 'ship', 'crew'):
+                    file_manager.mirror_to_db({"kind": kind, "designs": room_designs[f'{kind}_designs']}, 'designs')
             else:
                 logger.error("Failed to create designs directory")
                 return
@@ -5,10 +5,12 @@ import re
 logger = logging.getLogger('pss_companion.dslParser')
 
 class Rule:
-    def __init__(self, name, condition, actions):
+    def __init__(self, name, condition, actions, group=None):
         self.name = name
         self.condition = condition
         self.actions = actions
+        # Rules sharing a group keep first-match semantics even when all triggered rules are collected
+        self.group = group
         logger.debug(f"Rule created: {name} with {len(actions)} actions")
 
 def parse_dsl_file(file_path):
@@ -22,11 +24,11 @@ def parse_dsl_file(file_path):
         
         logger.debug(f"DSL file read successfully, content length: {len(content)}")
         
-        # Extract rule blocks
-        rule_pattern = r'RULE\s+"([^"]+)"\s+WHEN\s+(.*?)\s+THEN\s+(.*?)(?=RULE|$)'
+        # Extract rule blocks: RULE "name" [GROUP "group"] WHEN ... THEN ...
+        rule_pattern = r'RULE\s+"([^"]+)"\s+(?:GROUP\s+"([^"]+)"\s+)?WHEN\s+(.*?)\s+THEN\s+(.*?)(?=RULE|$)'
         rule_blocks = re.findall(rule_pattern, content, re.DOTALL)
         
-        for name, condition, actions_block in rule_blocks:
+        for name, group, condition, actions_block in rule_blocks:
             # Clean up condition - REMOVE COMMENTS HERE TOO
             condition = re.sub(r'//.*$', '', condition, flags=re.MULTILINE)
             condition = condition.strip()
@@ -57,7 +59,7 @@ def parse_dsl_file(file_path):
                 logger.warning(f"No actions found for rule '{name}'")
                 actions = [('penalty', 0), ('message', 'No actions defined')]
             
-            rule = Rule(name, condition, actions)
+            rule = Rule(name, condition, actions, group or None)
             rules.append(rule)
             logger.info(f"Added rule: {name} with {len(actions)} actions")
         
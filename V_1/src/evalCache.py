@@ -0,0 +1,124 @@
+import logging
+import os
+import json
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.evalCache')
+
+def hash_rules_file(rules_file: str) -> str:
+    """SHA-256 of a rules file's contents, used to invalidate cached results when rules change."""
+    try:
+        with open(rules_file, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except Exception as e:
+        logger.error(f"Error hashing rules file {rules_file}: {e}")
+        raise
+
+class EvaluationCache:
+    """
+    LRU cache of RuleEngine.evaluate results.
+    Keyed by (ship layout fingerprint, rules hash, ship armor value), held in memory and
+    optionally persisted to a gzip JSON file so results survive restarts. RuleEngine folds
+    the config digest and evaluation mode into the rules hash.
+    """
+
+    def __init__(self, max_entries: int = 10000, path: str = None, autosave_every: int = 0) -> None:
+        """
+        :param max_entries: Maximum number of results kept before the least recently used is dropped
+        :param path: File to persist the cache to (None keeps it in memory only)
+        :param autosave_every: Save to disk after this many new entries (0 disables autosave)
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.autosave_every = autosave_every
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self.load()
+
+    @staticmethod
+    def make_key(fingerprint: str, rules_hash: str, ship_armor_value: Any) -> str:
+        return f"{fingerprint}:{rules_hash}:{ship_armor_value}"
+
+    def get(self, fingerprint: str, rules_hash: str, ship_armor_value: Any) -> Optional[Any]:
+        """Cached result for the key, or None. Returns a copy so callers may mutate it."""
+        key = self.make_key(fingerprint, rules_hash, ship_armor_value)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, fingerprint: str, rules_hash: str, ship_armor_value: Any, result: Any) -> None:
+        """Store a JSON-serialisable result."""
+        key = self.make_key(fingerprint, rules_hash, ship_armor_value)
+        value = json.dumps(result)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._unsaved += 1
+            autosave = self.path and self.autosave_every and self._unsaved >= self.autosave_every
+        if autosave:
+            self.save()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        # A cache is usable while empty; without this, `if cache:` would skip filling it
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._unsaved = 0
+
+    def load(self) -> int:
+        """Load persisted entries (oldest first, so LRU order is kept). Returns the number loaded."""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                for key, value in data.get("entries", []):
+                    self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            logger.info(f"Loaded {len(self._entries)} cached evaluations from {self.path}")
+            return len(self._entries)
+        except Exception as e:
+            logger.error(f"Error loading evaluation cache from {self.path}: {e}")
+            return 0
+
+    def save(self) -> bool:
+        """Write the cache to disk atomically."""
+        if not self.path:
+            return False
+        try:
+            with self._lock:
+                entries = list(self._entries.items())
+                self._unsaved = 0
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump({"entries": entries}, f)
+            os.replace(tmp_path, self.path)
+            logger.debug(f"Saved {len(entries)} cached evaluations to {self.path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error saving evaluation cache to {self.path}: {e}")
+            return False
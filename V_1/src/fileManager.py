@@ -7,7 +7,9 @@ from typing import Dict, Any, List, Optional, Union
 from datetime import datetime
 import atexit
 
-#TODO: Add database integration
+from src import fileRegistry as _fileRegistry
+from src import storage as _storage
+
 #TODO: Add to matches
 
 # Get logger for this module
@@ -20,16 +22,24 @@ class FileManager:
     - Saves and loads GZIP compressed JSON files
     - Tracks files and can mark them as temporary
     - Cleans up temporary files on application exit
-    - Provides foundation for future database integration
+    - Records every tracked file in a persistent registry for listing and LRU eviction
+    - Forwards database operations to a pluggable StorageBackend (see storage.py); the app still reads
+      the files, and a non-file backend gets every new snapshot, match and design through mirror_to_db
     """
 
-    def __init__(self, base_dir: str = None, auto_cleanup: bool = True):
+    def __init__(self, base_dir: str = None, auto_cleanup: bool = True, use_registry: bool = True, registry_path: str = None,
+                 storage_backend=None):
         """
         Initialize the FileManager.
         
         Args:
             base_dir: Base directory for all file operations. If None, uses current directory.
             auto_cleanup: Whether to automatically clean up temporary files on exit.
+            use_registry: Whether to record tracked files in the persistent registry.
+            registry_path: Path to the registry database. Defaults to file_registry.db in base_dir.
+            storage_backend: StorageBackend used by upload_to_db/download_from_db.
+                             Defaults to the backend chosen in custom_data.json (see storage.create_backend),
+                             normally the JSON/gzip file layout under base_dir.
         """
         self.base_dir = base_dir or os.getcwd()
         self.auto_cleanup = auto_cleanup
@@ -39,6 +49,18 @@ class FileManager:
         
         # Create necessary directories
         os.makedirs(self.base_dir, exist_ok=True)
+
+        # Persistent registry shared by every process using this base directory
+        self.registry = None
+        if use_registry:
+            try:
+                self.registry = _fileRegistry.FileRegistry(registry_path or os.path.join(self.base_dir, 'file_registry.db'))
+                # Access times are written in batches; write the last ones on exit
+                atexit.register(self.registry.flush)
+            except Exception as e:
+                logger.error(f"Error opening file registry, continuing without it: {e}")
+
+        self.storage = storage_backend or _storage.create_backend(self)
         
         logger.info(f"FileManager initialized with base directory: {self.base_dir}")
         
@@ -112,8 +134,7 @@ class FileManager:
                 data = json.load(f)
             
             # Update access time for this file if tracked
-            if filepath in self.tracked_files:
-                self.tracked_files[filepath]['last_accessed'] = datetime.now()
+            self._touch_file(filepath)
             
             logger.debug(f"JSON data loaded from {filepath}")
             return data
@@ -188,8 +209,7 @@ class FileManager:
                 data = json.loads(json_data)
             
             # Update access time for this file if tracked
-            if filepath in self.tracked_files:
-                self.tracked_files[filepath]['last_accessed'] = datetime.now()
+            self._touch_file(filepath)
             
             logger.debug(f"Compressed JSON data loaded from {filepath}")
             return data
@@ -226,6 +246,8 @@ class FileManager:
             # Remove from tracking
             if filepath in self.tracked_files:
                 del self.tracked_files[filepath]
+            if self.registry:
+                self.registry.remove(filepath)
             
             logger.debug(f"File deleted: {filepath}")
             return True
@@ -255,6 +277,8 @@ class FileManager:
                 
                 # Remove from tracking regardless
                 del self.tracked_files[filepath]
+                if self.registry:
+                    self.registry.remove(filepath)
             
             logger.info(f"Cleaned up {count} temporary files")
             return count
@@ -265,16 +289,47 @@ class FileManager:
             logger.debug(traceback.format_exc())
             return 0
     
-    def get_tracked_files(self, temp_only: bool = False) -> List[str]:
+    def cleanup_stale_temp_files(self) -> int:
+        """
+        Delete temporary files recorded in the registry by earlier processes
+        (e.g. ones that crashed before their exit cleanup ran).
+        
+        Returns:
+            Number of files deleted
+        """
+        if not self.registry:
+            return 0
+        try:
+            count = 0
+            for entry in self.registry.list_files(self.base_dir, temp_only=True, recursive=True):
+                filepath = entry['path']
+                if filepath in self.tracked_files:
+                    continue
+                if os.path.exists(filepath):
+                    os.remove(filepath)
+                    count += 1
+                self.registry.remove(filepath)
+            logger.info(f"Cleaned up {count} stale temporary files")
+            return count
+        except Exception as e:
+            logger.error(f"Error during stale temporary file cleanup: {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            return 0
+    
+    def get_tracked_files(self, temp_only: bool = False, persistent: bool = False) -> List[str]:
         """
         Get a list of all tracked files.
         
         Args:
             temp_only: If True, only return temporary files
+            persistent: If True, include files tracked by any process (from the registry)
             
         Returns:
             List of file paths
         """
+        if persistent and self.registry:
+            return [entry['path'] for entry in self.registry.list_files(self.base_dir, temp_only=temp_only, recursive=True)]
         if temp_only:
             return [filepath for filepath, info in self.tracked_files.items() if info['is_temp']]
         else:
@@ -296,6 +351,8 @@ class FileManager:
             
         if filepath in self.tracked_files:
             self.tracked_files[filepath]['is_temp'] = True
+            if self.registry:
+                self.registry.mark_temp(filepath)
             logger.debug(f"File marked as temporary: {filepath}")
             return True
         elif os.path.exists(filepath):
@@ -316,6 +373,64 @@ class FileManager:
             'created': now,
             'last_accessed': now
         }
+        if self.registry:
+            try:
+                self.registry.register(filepath, file_type, is_temp)
+            except Exception as e:
+                logger.error(f"Error registering {filepath}: {e}")
+
+    def _touch_file(self, filepath: str) -> None:
+        """Internal method to update the access time of a tracked file"""
+        if filepath in self.tracked_files:
+            self.tracked_files[filepath]['last_accessed'] = datetime.now()
+        if self.registry:
+            try:
+                self.registry.touch(filepath)
+            except Exception as e:
+                logger.error(f"Error updating access time for {filepath}: {e}")
+
+    def list_files(self, dirpath: str = None, file_type: str = None, recursive: bool = False) -> List[Dict[str, Any]]:
+        """
+        List files recorded in the registry, most recently accessed first.
+        
+        Args:
+            dirpath: Directory to list (relative to base_dir unless absolute). Defaults to base_dir.
+            file_type: Only return files of this type (e.g. 'gzip_json')
+            recursive: Include files in subdirectories
+            
+        Returns:
+            List of metadata dicts (path, type, is_temp, size, content_hash, created, last_accessed)
+        """
+        if not self.registry:
+            logger.warning("File registry not available")
+            return []
+        dirpath = dirpath or self.base_dir
+        if not os.path.isabs(dirpath):
+            dirpath = os.path.join(self.base_dir, dirpath)
+        return self.registry.list_files(dirpath, file_type=file_type, recursive=recursive)
+
+    def evict_cache(self, dirpath: str, max_bytes: int = None, max_files: int = None) -> List[str]:
+        """
+        Delete least recently used files in a cache directory (e.g. 'designs' or 'usr_data')
+        until it fits within the given size and/or file count.
+        
+        Args:
+            dirpath: Directory to evict from (relative to base_dir unless absolute)
+            max_bytes: Maximum total size to keep
+            max_files: Maximum number of files to keep
+            
+        Returns:
+            List of deleted file paths
+        """
+        if not self.registry:
+            logger.warning("File registry not available, nothing evicted")
+            return []
+        if not os.path.isabs(dirpath):
+            dirpath = os.path.join(self.base_dir, dirpath)
+        evicted = self.registry.evict(dirpath, max_bytes=max_bytes, max_files=max_files)
+        for filepath in evicted:
+            self.tracked_files.pop(filepath, None)
+        return evicted
     
     def create_dir(self, dirpath: str) -> str:
         """
@@ -351,32 +466,66 @@ class FileManager:
             except:
                 # Don't let exceptions in __del__ propagate
                 pass
-    #TODO: Implement the following methods
-    # Future database integration methods
+    def set_storage_backend(self, storage_backend) -> None:
+        """
+        Replace the storage backend used for database operations.
+        
+        Args:
+            storage_backend: A StorageBackend, e.g. storage.SQLiteStorageBackend('data/pss.db')
+        """
+        self.storage = storage_backend
+        logger.info(f"Storage backend set to {type(storage_backend).__name__}")
+
     def upload_to_db(self, data: Any, collection: str) -> bool:
         """
-        Placeholder for future database integration - upload data.
+        Upload data to the storage backend.
         
         Args:
-            data: The data to upload
-            collection: The database collection to upload to
+            data: The data to upload (see StorageBackend.upload for the expected shapes)
+            collection: The collection to upload to ('users', 'snapshots', 'matches' or 'designs')
             
         Returns:
             Success status
         """
-        logger.warning("Database integration not implemented yet")
-        return False
+        try:
+            return self.storage.upload(data, collection)
+        except Exception as e:
+            logger.error(f"Error uploading to {collection}: {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            return False
         
     def download_from_db(self, query: Dict, collection: str) -> Any:
         """
-        Placeholder for future database integration - download data.
+        Download data from the storage backend.
         
         Args:
-            query: The database query
-            collection: The database collection to query
+            query: The query (see StorageBackend.download for the supported keys)
+            collection: The collection to query ('users', 'snapshots', 'matches' or 'designs')
             
         Returns:
             The retrieved data or None
         """
-        logger.warning("Database integration not implemented yet")
-        return None
\ No newline at end of file
+        try:
+            return self.storage.download(query, collection)
+        except Exception as e:
+            logger.error(f"Error downloading from {collection}: {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            return None
+
+    def mirror_to_db(self, data: Any, collection: str) -> bool:
+        """
+        Write data that was just saved to files to the storage backend as well.
+        Does nothing with the file backend, which would write the same files again.
+        
+        Args:
+            data: The data to upload (see StorageBackend.upload for the expected shapes)
+            collection: The collection to upload to
+            
+        Returns:
+            Whether the backend was written
+        """
+        if isinstance(self.storage, _storage.FileStorageBackend):
+            return False
+        return self.upload_to_db(data, collection)
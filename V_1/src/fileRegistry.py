@@ -0,0 +1,287 @@
+import logging
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.fileRegistry')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path          TEXT PRIMARY KEY,
+    directory     TEXT NOT NULL,
+    type          TEXT NOT NULL,
+    is_temp       INTEGER NOT NULL DEFAULT 0,
+    size          INTEGER NOT NULL DEFAULT 0,
+    content_hash  TEXT,
+    created       TEXT NOT NULL,
+    last_accessed TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_directory ON files(directory);
+CREATE INDEX IF NOT EXISTS idx_files_accessed ON files(last_accessed);
+CREATE INDEX IF NOT EXISTS idx_files_temp ON files(is_temp) WHERE is_temp = 1;
+"""
+
+class FileRegistry:
+    """
+    A persistent index of the files written through FileManager.
+    - Stores size, type, temp flag, created/accessed times and a content hash per file
+      (computed on first request, not on every save)
+    - Survives restarts, so temporary files from a crashed process can still be cleaned up
+    - Supports LRU eviction of a directory by total size and/or file count
+    - Answers directory listings from an index instead of walking the file system
+    """
+
+    def __init__(self, db_path: str, touch_interval: float = 5.0, max_pending_touches: int = 256) -> None:
+        """
+        Open (or create) the registry database.
+
+        Args:
+            db_path: Path to the SQLite database file
+            touch_interval: Seconds access times may be held in memory before they are written
+            max_pending_touches: Number of held access times that forces a write
+        """
+        self.db_path = db_path
+        self.touch_interval = touch_interval
+        self.max_pending_touches = max_pending_touches
+        # Access times not yet written: {path: iso time}
+        self._pending_touches = {}
+        self._last_flush = time.monotonic()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        logger.info(f"File registry opened at {db_path}")
+
+    @staticmethod
+    def hash_file(filepath: str, chunk_size: int = 1 << 16) -> Optional[str]:
+        """Return the SHA-256 hex digest of a file, or None if it can't be read."""
+        try:
+            digest = hashlib.sha256()
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except OSError as e:
+            logger.warning(f"Could not hash {filepath}: {e}")
+            return None
+
+    @staticmethod
+    def _key(filepath: str) -> str:
+        """Normalised path, as stored in the path and directory columns"""
+        return os.path.normpath(filepath)
+
+    def register(self, filepath: str, file_type: str, is_temp: bool = False, content_hash: str = None) -> None:
+        """
+        Add or update a file entry. The size is taken from the file on disk.
+
+        Args:
+            filepath: Absolute path of the file
+            file_type: Type label (e.g. 'json', 'gzip_json')
+            is_temp: Whether the file should be removed by temp cleanup
+            content_hash: Precomputed hash; if None any stored hash is cleared and
+                          computed again by content_hash() when asked for
+        """
+        filepath = self._key(filepath)
+        now = datetime.now().isoformat()
+        try:
+            size = os.path.getsize(filepath)
+        except OSError:
+            size = 0
+        with self._lock:
+            self._pending_touches.pop(filepath, None)
+            self._conn.execute(
+                """
+                INSERT INTO files (path, directory, type, is_temp, size, content_hash, created, last_accessed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(path) DO UPDATE SET
+                    type = excluded.type,
+                    is_temp = excluded.is_temp,
+                    size = excluded.size,
+                    content_hash = excluded.content_hash,
+                    last_accessed = excluded.last_accessed
+                """,
+                (filepath, os.path.dirname(filepath), file_type, int(is_temp), size, content_hash, now, now),
+            )
+            self._conn.commit()
+
+    def content_hash(self, filepath: str) -> Optional[str]:
+        """SHA-256 of a registered file, hashed on first request and stored until the file is registered again."""
+        filepath = self._key(filepath)
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM files WHERE path = ?", (filepath,)).fetchone()
+        if row and row['content_hash']:
+            return row['content_hash']
+        content_hash = self.hash_file(filepath)
+        if row and content_hash:
+            with self._lock:
+                self._conn.execute("UPDATE files SET content_hash = ? WHERE path = ?", (content_hash, filepath))
+                self._conn.commit()
+        return content_hash
+
+    def touch(self, filepath: str) -> None:
+        """
+        Update the last accessed time of a file. The time is held in memory and written
+        together with others, at most every touch_interval seconds.
+        """
+        with self._lock:
+            self._pending_touches[self._key(filepath)] = datetime.now().isoformat()
+            if (len(self._pending_touches) >= self.max_pending_touches
+                    or time.monotonic() - self._last_flush >= self.touch_interval):
+                self._flush_touches()
+
+    def flush(self) -> None:
+        """Write held access times now."""
+        with self._lock:
+            self._flush_touches()
+
+    def _flush_touches(self) -> None:
+        # Caller holds self._lock
+        self._last_flush = time.monotonic()
+        if not self._pending_touches or not self._conn:
+            return
+        pending = [(accessed, path) for path, accessed in self._pending_touches.items()]
+        self._pending_touches.clear()
+        self._conn.executemany("UPDATE files SET last_accessed = ? WHERE path = ?", pending)
+        self._conn.commit()
+
+    def mark_temp(self, filepath: str, is_temp: bool = True) -> bool:
+        """Set the temp flag of a registered file. Returns False if the file isn't registered."""
+        filepath = self._key(filepath)
+        with self._lock:
+            cursor = self._conn.execute("UPDATE files SET is_temp = ? WHERE path = ?", (int(is_temp), filepath))
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def remove(self, filepath: str) -> None:
+        """Remove a file entry (the file itself is left alone)."""
+        filepath = self._key(filepath)
+        with self._lock:
+            self._pending_touches.pop(filepath, None)
+            self._conn.execute("DELETE FROM files WHERE path = ?", (filepath,))
+            self._conn.commit()
+
+    def get(self, filepath: str) -> Optional[Dict[str, Any]]:
+        """Get the metadata for a file, or None if it isn't registered."""
+        filepath = self._key(filepath)
+        with self._lock:
+            self._flush_touches()
+            row = self._conn.execute("SELECT * FROM files WHERE path = ?", (filepath,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def contains(self, filepath: str) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM files WHERE path = ?", (self._key(filepath),)).fetchone() is not None
+
+    def list_files(self, directory: str = None, file_type: str = None, temp_only: bool = False,
+                   recursive: bool = False) -> List[Dict[str, Any]]:
+        """
+        List registered files, newest access first.
+
+        Args:
+            directory: Only return files in this directory (absolute)
+            file_type: Only return files of this type
+            temp_only: Only return temporary files
+            recursive: Include files in subdirectories of directory
+
+        Returns:
+            List of metadata dicts
+        """
+        query = "SELECT * FROM files WHERE 1 = 1"
+        params = []
+        if directory:
+            directory = os.path.normpath(directory)
+            if recursive:
+                query += " AND (directory = ? OR directory LIKE ? ESCAPE '\\')"
+                escaped = directory.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params += [directory, escaped + os.sep.replace('\\', '\\\\') + '%']
+            else:
+                query += " AND directory = ?"
+                params.append(directory)
+        if file_type:
+            query += " AND type = ?"
+            params.append(file_type)
+        if temp_only:
+            query += " AND is_temp = 1"
+        query += " ORDER BY last_accessed DESC"
+        with self._lock:
+            # Listings (and LRU eviction built on them) need the latest access times
+            self._flush_touches()
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def total_size(self, directory: str = None) -> int:
+        """Total size in bytes of registered files, optionally within one directory tree."""
+        return sum(entry['size'] for entry in self.list_files(directory, recursive=True))
+
+    def evict(self, directory: str, max_bytes: int = None, max_files: int = None, dry_run: bool = False) -> List[str]:
+        """
+        Delete least recently used files under a directory until it fits the given budget.
+
+        Args:
+            directory: Directory tree to evict from (e.g. the designs or usr_data cache)
+            max_bytes: Maximum total size to keep
+            max_files: Maximum number of files to keep
+            dry_run: Only report which files would be deleted
+
+        Returns:
+            List of evicted file paths
+        """
+        entries = self.list_files(directory, recursive=True)  # most recently used first
+        keep_bytes = 0
+        evicted = []
+        for index, entry in enumerate(entries):
+            over_count = max_files is not None and index >= max_files
+            over_size = max_bytes is not None and keep_bytes + entry['size'] > max_bytes
+            if over_count or over_size:
+                evicted.append(entry['path'])
+            else:
+                keep_bytes += entry['size']
+
+        if not dry_run:
+            for filepath in evicted:
+                try:
+                    if os.path.exists(filepath):
+                        os.remove(filepath)
+                except OSError as e:
+                    logger.error(f"Error evicting {filepath}: {e}")
+                    continue
+                self.remove(filepath)
+            if evicted:
+                logger.info(f"Evicted {len(evicted)} files from {directory}")
+        return evicted
+
+    def prune_missing(self) -> int:
+        """Drop entries whose files no longer exist. Returns the number removed."""
+        with self._lock:
+            paths = [row['path'] for row in self._conn.execute("SELECT path FROM files").fetchall()]
+        missing = [path for path in paths if not os.path.exists(path)]
+        if missing:
+            with self._lock:
+                self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in missing])
+                self._conn.commit()
+            logger.info(f"Pruned {len(missing)} missing files from registry")
+        return len(missing)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn:
+                self._flush_touches()
+                self._conn.close()
+                self._conn = None
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry['is_temp'] = bool(entry['is_temp'])
+        entry['created'] = datetime.fromisoformat(entry['created'])
+        entry['last_accessed'] = datetime.fromisoformat(entry['last_accessed'])
+        return entry
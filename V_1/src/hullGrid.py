@@ -0,0 +1,188 @@
+import logging
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from src.lazyImport import lazy_import
+
+np = lazy_import("numpy")
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.hullGrid')
+
+class HullGrid:
+    """
+    Hull of a ship design decoded from its mask into bitsets.
+    Cell (x, y) is bit y * columns + x, x being the column and y the row (as in room_cords),
+    so a whole row, a room footprint or the full grid is tested with a few shifts and ANDs.
+    Mask digits: 0 = outside the hull, 1 = hull, 2 = extended hull; both 1 and 2 are buildable.
+    Immutable once built, so one instance per design is shared (see get_hull).
+    """
+
+    def __init__(self, mask: str, rows: int, columns: int) -> None:
+        self.rows = int(rows)
+        self.columns = int(columns)
+        mask = str(mask or "")
+        if len(mask) != self.rows * self.columns:
+            logger.warning(f"Hull mask has {len(mask)} cells, expected {self.rows}x{self.columns}")
+        size = self.rows * self.columns
+        # Reverse so that character i becomes bit i
+        self.cells = int(''.join('0' if c == '0' else '1' for c in mask[:size][::-1]) or '0', 2)
+        self.extended = int(''.join('1' if c == '2' else '0' for c in mask[:size][::-1]) or '0', 2)
+        self.full = (1 << size) - 1
+        # Columns that may be the left edge of something `width` wide, per width
+        self._column_masks = {}
+        self._anchors = {}
+        self._lock = threading.Lock()
+        self.edges = self._edges()
+
+    @classmethod
+    def from_design(cls, design: dict) -> 'HullGrid':
+        """Build from a ship design dict (mask, rows and columns as in ship_designs.json)"""
+        return cls(design.get('mask'), design.get('rows'), design.get('columns'))
+
+    def bit(self, x: int, y: int) -> int:
+        return 1 << (y * self.columns + x)
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return 0 <= x < self.columns and 0 <= y < self.rows
+
+    def is_hull(self, x: int, y: int) -> bool:
+        return self.in_bounds(x, y) and bool(self.cells & self.bit(x, y))
+
+    def _column_mask(self, width: int) -> int:
+        """Bits of every cell whose column leaves room for `width` columns to its right"""
+        mask = self._column_masks.get(width)
+        if mask is None:
+            row = (1 << max(0, self.columns - width + 1)) - 1
+            mask = 0
+            for y in range(self.rows):
+                mask |= row << (y * self.columns)
+            self._column_masks[width] = mask
+        return mask
+
+    def _edges(self) -> int:
+        """Hull cells with a 4-neighbour outside the hull (or outside the grid)"""
+        cells, columns = self.cells, self.columns
+        not_left = self._column_mask(2) << 1      # cells with a column to their left
+        not_right = self._column_mask(2)          # cells with a column to their right
+        inner = cells
+        inner &= (cells << 1) & not_left          # left neighbour is hull
+        inner &= (cells >> 1) & not_right         # right neighbour is hull
+        inner &= cells << columns                 # neighbour above is hull
+        inner &= cells >> columns                 # neighbour below is hull
+        return cells & ~inner & self.full
+
+    def footprint(self, width: int, height: int) -> int:
+        """Bitset of a width x height footprint anchored at (0, 0)"""
+        row = (1 << width) - 1
+        bits = 0
+        for dy in range(height):
+            bits |= row << (dy * self.columns)
+        return bits
+
+    def _fits_all(self, free: int, width: int, height: int) -> int:
+        """Anchors (top-left cells) where a width x height footprint lies entirely in free"""
+        anchors = free & self._column_mask(width)
+        for dx in range(width):
+            for dy in range(height):
+                if dx or dy:
+                    anchors &= free >> (dy * self.columns + dx)
+        # Rows at the bottom can't hold the footprint's lower rows
+        return anchors & ((1 << max(0, (self.rows - height + 1) * self.columns)) - 1)
+
+    def anchors(self, width: int, height: int, occupied: int = 0) -> int:
+        """Bitset of every top-left cell where a width x height room fits on the hull, avoiding occupied"""
+        width, height = max(1, int(width)), max(1, int(height))
+        if occupied:
+            return self._fits_all(self.cells & ~occupied, width, height)
+        key = (width, height)
+        anchors = self._anchors.get(key)
+        if anchors is None:
+            anchors = self._fits_all(self.cells, width, height)
+            with self._lock:
+                self._anchors[key] = anchors
+        return anchors
+
+    def fits(self, x: int, y: int, width: int, height: int, occupied: int = 0) -> bool:
+        """Whether a width x height room can be placed with its top-left cell at (x, y)"""
+        if not (0 <= x and 0 <= y and x + width <= self.columns and y + height <= self.rows):
+            return False
+        if not occupied:
+            return bool(self.anchors(width, height) & self.bit(x, y))
+        shape = self.footprint(width, height) << (y * self.columns + x)
+        return (self.cells & ~occupied & shape) == shape
+
+    def occupied(self, rooms: Iterable) -> int:
+        """Bitset of the cells covered by rooms (Room objects or room dicts)"""
+        bits = 0
+        for room in rooms:
+            data = room if isinstance(room, dict) else room.to_dict()
+            if not data:
+                continue
+            x, y = (int(v) for v in data["room_cords"])
+            width, height = (int(v) or 1 for v in data["room_size"])
+            if x < 0 or y < 0 or x + width > self.columns or y + height > self.rows:
+                logger.warning(f"Room {data.get('room_id')} at {x},{y} lies outside the {self.columns}x{self.rows} hull grid")
+                width, height = min(width, self.columns - x), min(height, self.rows - y)
+                if x < 0 or y < 0 or width <= 0 or height <= 0:
+                    continue
+            bits |= self.footprint(width, height) << (y * self.columns + x)
+        return bits
+
+    def free(self, rooms: Iterable = ()) -> int:
+        """Bitset of hull cells not covered by rooms"""
+        return self.cells & ~self.occupied(rooms)
+
+    def free_edges(self, rooms: Iterable = ()) -> int:
+        """Bitset of edge cells not covered by rooms"""
+        return self.edges & ~self.occupied(rooms)
+
+    def coordinates(self, bits: int) -> List[Tuple[int, int]]:
+        """(x, y) of every set bit, in row-major order"""
+        cells = []
+        while bits:
+            low = bits & -bits
+            index = low.bit_length() - 1
+            cells.append((index % self.columns, index // self.columns))
+            bits ^= low
+        return cells
+
+    def as_array(self, bits: int = None):
+        """numpy bool array (rows x columns) of bits (default: the hull cells); needs numpy"""
+        bits = self.cells if bits is None else bits
+        raw = bits.to_bytes((self.rows * self.columns + 7) // 8 or 1, 'little')
+        flat = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder='little')[:self.rows * self.columns]
+        return flat.astype(bool).reshape(self.rows, self.columns)
+
+    def __len__(self) -> int:
+        return bin(self.cells).count('1')
+
+    def __repr__(self) -> str:
+        return f"HullGrid({self.columns}x{self.rows}, {len(self)} cells)"
+
+    def __str__(self) -> str:
+        lines = []
+        for y in range(self.rows):
+            lines.append(''.join('#' if self.edges & self.bit(x, y) else ('.' if self.cells & self.bit(x, y) else ' ')
+                                 for x in range(self.columns)))
+        return '\n'.join(lines)
+
+
+_hulls = {}
+_hulls_lock = threading.Lock()
+
+def get_hull(design: dict) -> Optional[HullGrid]:
+    """Shared HullGrid for a ship design, decoded on first use (None if the design has no mask)"""
+    if not design or not design.get('mask'):
+        return None
+    key = (str(design.get('ship_design_id')), design.get('mask'), str(design.get('rows')), str(design.get('columns')))
+    hull = _hulls.get(key)
+    if hull is None:
+        try:
+            hull = HullGrid.from_design(design)
+        except (TypeError, ValueError) as e:
+            logger.error(f"Error decoding hull of ship design {key[0]}: {e}")
+            return None
+        with _hulls_lock:
+            hull = _hulls.setdefault(key, hull)
+    return hull
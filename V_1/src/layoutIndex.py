@@ -0,0 +1,322 @@
+import logging
+import os
+import json
+import gzip
+import glob
+import hashlib
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Set
+
+from src import ship as _ship
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.layoutIndex')
+
+# Rooms that don't describe a layout
+_IGNORED_TYPES = frozenset({"Wall", "Corridor"})
+
+# Part of every stored score key; bumped when layouts are scored differently (2: lifts are scored)
+SCORE_VERSION = 2
+
+def _hash64(shingle: str, key: bytes = b'') -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8, key=key).digest(), 'little')
+
+def layout_shingles(room_dicts: List[dict], armor_value: float = None) -> Set[str]:
+    """
+    Features of a layout as a set of strings:
+    room types at exact and coarse (4x4) positions relative to the top-left room, room type
+    counts, armor blocks per room type and the types of horizontally/vertically adjacent rooms.
+    """
+    rooms = [room for room in room_dicts if room and room.get("room_type") not in _IGNORED_TYPES]
+    if not rooms:
+        return set()
+    min_x = min(room["room_cords"][0] for room in rooms)
+    min_y = min(room["room_cords"][1] for room in rooms)
+    shingles = set()
+    counts = defaultdict(int)
+    for room in rooms:
+        room_type = room.get("room_type")
+        dx, dy = room["room_cords"][0] - min_x, room["room_cords"][1] - min_y
+        shingles.add(f"p:{room_type}:{dx},{dy}")
+        shingles.add(f"c:{room_type}:{dx // 4},{dy // 4}")
+        counts[room_type] += 1
+        shingles.add(f"n:{room_type}:{counts[room_type]}")
+        armor = room.get("room_armor") or 0
+        blocks = round(armor / armor_value) if armor_value else armor
+        shingles.add(f"a:{room_type}:{blocks}")
+    for i, a in enumerate(rooms):
+        x1, y1 = a["room_cords"]
+        w1, h1 = a["room_size"]
+        for b in rooms[i + 1:]:
+            x2, y2 = b["room_cords"]
+            w2, h2 = b["room_size"]
+            if ((x1 == x2 + w2 or x1 + w1 == x2) and y1 < y2 + h2 and y1 + h1 > y2) or \
+                    ((y1 == y2 + h2 or y1 + h1 == y2) and x1 < x2 + w2 and x1 + w1 > x2):
+                shingles.add("j:" + "|".join(sorted((str(a.get("room_type")), str(b.get("room_type"))))))
+    return shingles
+
+class LayoutEntry:
+    """
+    One indexed layout: the latest snapshot of a player with that layout.
+    score is its rule score, valid only while the engine's result_key() equals score_key.
+    """
+    __slots__ = ('user_id', 'user_name', 'date', 'trophy', 'fingerprint', 'signature', 'source', 'score', 'score_key')
+
+    def __init__(self, user_id: int, user_name: str, date: str, trophy, fingerprint: str, signature: tuple,
+                 source: str = None, score: float = None, score_key: str = None) -> None:
+        self.user_id = user_id
+        self.user_name = user_name
+        self.date = date
+        self.trophy = trophy
+        self.fingerprint = fingerprint
+        self.signature = signature
+        self.source = source
+        self.score = score
+        self.score_key = score_key
+
+    @property
+    def key(self) -> str:
+        return f"{self.user_id}:{self.fingerprint}"
+
+    def to_list(self) -> list:
+        return [self.user_id, self.user_name, self.date, self.trophy, self.fingerprint, list(self.signature), self.source,
+                self.score, self.score_key]
+
+    @classmethod
+    def from_list(cls, data: list) -> 'LayoutEntry':
+        if len(data) == 8:
+            # Saved before scores carried the rules they came from: drop the score
+            data = list(data[:7]) + [None, None]
+        user_id, user_name, date, trophy, fingerprint, signature, source, score, score_key = data
+        return cls(user_id, user_name, date, trophy, fingerprint, tuple(signature), source, score, score_key)
+
+class LayoutMatch:
+    """A layout similar to the query."""
+    __slots__ = ('key', 'user_id', 'user_name', 'date', 'trophy', 'similarity', 'score')
+
+    def __init__(self, entry: LayoutEntry, similarity: float) -> None:
+        self.key = entry.key
+        self.user_id = entry.user_id
+        self.user_name = entry.user_name
+        self.date = entry.date
+        self.trophy = entry.trophy
+        self.similarity = similarity
+        self.score = entry.score
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self) -> str:
+        return f"LayoutMatch({self.user_name!r}, {self.date}, similarity={self.similarity:.2f}, score={self.score})"
+
+class LayoutIndex:
+    """
+    Similarity index over ship layouts.
+    Each layout is reduced to a one-permutation MinHash signature of its shingles (see
+    layout_shingles: one hash per shingle, split into num_perm bins, empty bins densified) and
+    bucketed by locality-sensitive hashing over bands of the signature, so a query only compares
+    against layouts sharing at least one band (estimated Jaccard similarity above ~0.5 with the
+    defaults). Only the latest snapshot of each distinct layout per player is kept. Entries can
+    be added one at a time (e.g. by the collector) and the index persists to a gzip JSON file.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, seed: int = 1) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.seed = seed
+        self._key = str(seed).encode('ascii')
+        self._entries: Dict[str, LayoutEntry] = {}
+        self._buckets: Dict[tuple, Set[str]] = defaultdict(set)
+        self._files: Dict[str, float] = {}  # usr_data file -> mtime when indexed
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def signature(self, shingles: Set[str]) -> tuple:
+        """MinHash signature of a shingle set"""
+        bins = [None] * self.num_perm
+        for shingle in shingles:
+            h = _hash64(shingle, self._key)
+            index, value = h % self.num_perm, h // self.num_perm
+            if bins[index] is None or value < bins[index]:
+                bins[index] = value
+        if not shingles:
+            return tuple([-1] * self.num_perm)
+        # An empty bin borrows the next non-empty bin's value, tagged with the distance borrowed over
+        signature = list(bins)
+        for index, value in enumerate(bins):
+            if value is None:
+                step = 1
+                while bins[(index + step) % self.num_perm] is None:
+                    step += 1
+                signature[index] = bins[(index + step) % self.num_perm] | (step << 64)
+        return tuple(signature)
+
+    def _bands(self, signature: tuple):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    @staticmethod
+    def _layout(ship) -> tuple:
+        """(room dicts, armor value per block) of a Ship or user_ship dict"""
+        if isinstance(ship, dict):
+            room_dicts, armor_value = ship.get("ship_rooms") or [], ship.get("ship_armor_value")
+        else:
+            room_dicts, armor_value = [room.to_dict() for room in ship.shipRooms], getattr(ship, 'shipArmorValue', None)
+        return room_dicts, float(armor_value) if armor_value else None
+
+    def add(self, user_id: int, user_name: str, date: str, ship, trophy=None, source: str = None) -> bool:
+        """
+        Index one snapshot (a Ship or a user_ship dict).
+        Returns False if the player's layout was already indexed (its date/trophy are refreshed if newer).
+        """
+        room_dicts, armor_value = self._layout(ship)
+        fingerprint = _ship.Ship.layout_fingerprint(room_dicts)
+        key = f"{int(user_id)}:{fingerprint}"
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                if date and (existing.date is None or date > existing.date):
+                    existing.user_name, existing.date, existing.trophy = user_name, date, trophy
+                    existing.source = source or existing.source
+                return False
+        signature = self.signature(layout_shingles(room_dicts, armor_value))
+        if isinstance(trophy, str):
+            trophy = int(trophy) if trophy.isdigit() else None
+        entry = LayoutEntry(int(user_id), user_name, date, trophy, fingerprint, signature, source)
+        with self._lock:
+            self._entries[key] = entry
+            for band in self._bands(signature):
+                self._buckets[band].add(key)
+        return True
+
+    def add_user(self, user: Dict[str, Any], source: str = None) -> int:
+        """Index every snapshot of a user dict (User.to_dict layout). Returns the number of new layouts."""
+        added = 0
+        for entry in user.get("dated_data", []):
+            if entry.get("user_ship") and self.add(user["user_id"], user.get("user_name"), entry.get("date"),
+                                                   entry["user_ship"], entry.get("highest_trophy"), source):
+                added += 1
+        return added
+
+    def add_from_usr_data(self, directory: str) -> int:
+        """Index usr_data/*.gz files that are new or changed since they were last indexed. Returns new layouts."""
+        added = 0
+        files = 0
+        for filepath in glob.glob(os.path.join(directory, '*.gz')):
+            try:
+                mtime = os.path.getmtime(filepath)
+                if self._files.get(filepath) == mtime:
+                    continue
+                with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+                    user = json.load(f)
+                added += self.add_user(user, source=filepath)
+                self._files[filepath] = mtime
+                files += 1
+            except Exception as e:
+                logger.error(f"Error indexing layouts from {filepath}: {e}")
+        logger.info(f"Indexed {added} new layouts from {files} files in {directory}")
+        return added
+
+    def query(self, ship, k: int = 10, exclude_user: int = None, min_similarity: float = 0.0) -> List[LayoutMatch]:
+        """
+        Top-k indexed layouts most similar to ship (a Ship or a user_ship dict).
+        Similarity is the estimated Jaccard similarity of the layouts' shingle sets.
+        """
+        signature = self.signature(layout_shingles(*self._layout(ship)))
+        with self._lock:
+            candidates = set()
+            for band in self._bands(signature):
+                candidates |= self._buckets.get(band, set())
+            entries = [self._entries[key] for key in candidates]
+        results = []
+        for entry in entries:
+            if exclude_user is not None and entry.user_id == exclude_user:
+                continue
+            similarity = sum(1 for a, b in zip(signature, entry.signature) if a == b) / self.num_perm
+            if similarity >= min_similarity:
+                results.append(LayoutMatch(entry, similarity))
+        results.sort(key=lambda match: (-match.similarity, -(match.trophy or 0)))
+        return results[:k]
+
+    def score(self, matches: List[LayoutMatch], engine, collect_all: bool = False) -> List[LayoutMatch]:
+        """
+        Fill in rule scores of matches with a RuleEngine, loading each layout (rooms and lifts) from
+        its usr_data file (read once per file). Scores are stored on the entries with the engine's
+        result_key(), so each layout is scored once per rule set, config and mode; a DSL or config
+        edit rescores it.
+        """
+        result_key = engine.result_key(collect_all)
+        score_key = f"{SCORE_VERSION}:{result_key}" if result_key is not None else None
+        pending: Dict[str, list] = defaultdict(list)  # usr_data file -> [(match, entry)]
+        for match in matches:
+            with self._lock:
+                entry = self._entries.get(match.key)
+            if entry is None:
+                continue
+            if score_key is not None and entry.score is not None and entry.score_key == score_key:
+                match.score = entry.score
+                continue
+            match.score = None
+            if entry.source and os.path.exists(entry.source):
+                pending[entry.source].append((match, entry))
+
+        for source, items in pending.items():
+            try:
+                with gzip.open(source, 'rt', encoding='utf-8') as f:
+                    snapshots = {s.get("date"): s for s in json.load(f).get("dated_data", [])}
+            except Exception as e:
+                logger.error(f"Error reading layouts from {source}: {e}")
+                continue
+            for match, entry in items:
+                snapshot = snapshots.get(entry.date)
+                if snapshot is None:
+                    continue
+                try:
+                    ship = _ship.Ship()
+                    ship.from_dict(snapshot["user_ship"])
+                    result = engine.evaluate(ship=ship, collect_all=collect_all)
+                    entry.score, entry.score_key = result.score, score_key
+                    match.score = result.score
+                except Exception as e:
+                    logger.error(f"Error scoring layout of {match.user_name} ({match.date}): {e}")
+        return matches
+
+    def save(self, path: str) -> None:
+        """Write the index to a gzip JSON file."""
+        with self._lock:
+            data = {"num_perm": self.num_perm, "bands": self.bands, "seed": self.seed,
+                    "files": self._files, "entries": [entry.to_list() for entry in self._entries.values()]}
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved {len(data['entries'])} layouts to {path}")
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'LayoutIndex':
+        """Load an index written by save() (an empty index if the file is missing or was built with other parameters)."""
+        index = cls(**kwargs)
+        if not os.path.exists(path):
+            return index
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            if (data.get("num_perm"), data.get("bands"), data.get("seed")) != (index.num_perm, index.bands, index.seed):
+                logger.warning(f"Layout index {path} was built with other parameters, rebuilding")
+                return index
+            for values in data.get("entries", []):
+                entry = LayoutEntry.from_list(values)
+                index._entries[entry.key] = entry
+                for band in index._bands(entry.signature):
+                    index._buckets[band].add(entry.key)
+            index._files = data.get("files", {})
+            logger.info(f"Loaded {len(index)} layouts from {path}")
+        except Exception as e:
+            logger.error(f"Error loading layout index from {path}: {e}")
+        return index
@@ -0,0 +1,39 @@
+import importlib.util
+import logging
+import sys
+import types
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.lazyImport')
+
+class _MissingModule(types.ModuleType):
+    """Stand-in for an optional dependency that isn't installed; fails when first used."""
+
+    def __getattr__(self, name: str):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        raise ImportError(f"No module named '{self.__name__}' (needed for {self.__name__}.{name})")
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Return module name without executing it until an attribute is first accessed.
+    Keeps heavy or optional dependencies (tkinter, PIL, ...) off the import path of entry
+    points that don't use them. A missing module only raises ImportError when it is used.
+    Note that the parent package of a submodule (e.g. PIL for PIL.Image) is imported eagerly.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    try:
+        spec = importlib.util.find_spec(name)
+    except ImportError:
+        spec = None
+    if spec is None or spec.loader is None:
+        logger.debug(f"Optional module {name} not available")
+        return _MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -1,21 +1,46 @@
 import logging
+import logging.handlers
 import traceback
 import os
 import sys
+import time
+import threading
+import queue
+import json
+import gzip
+import shutil
+import atexit
 from datetime import datetime
 
 # Expose traceback module
-__all__ = ['traceback']
+__all__ = ['traceback', 'LazyMessage', 'lazy', 'debug_enabled', 'RateLimitedLogger', 'JsonFormatter', 'shutdown_logging']
 sys.modules[__name__].traceback = traceback
 
-def setup_logging(log_level=logging.INFO, numbackups:int = 5) -> tuple[logging.Logger, str]:
+# Background listener that drains the logging queue (see setup_logging)
+_listener = None
+_shutdown_registered = False
+
+def setup_logging(log_level=logging.INFO, numbackups:int = 5, max_bytes:int = 10 * 1024 * 1024,
+                  when:str = None, compress:bool = True, json_format:bool = False,
+                  use_queue:bool = True) -> tuple[logging.Logger, str]:
     """
     Set up logging confisguration for the application
+    Records are put on an in-memory queue by the calling thread and written to disk/console
+    by a background QueueListener, so log calls never block the asyncio or Tk loops on I/O.
     :param log_level: The minimum logging level to record
+    :param numbackups: The number of log sessions (and rotated files per session) to keep
+    :param max_bytes: Rotate the log file once it reaches this size (0 disables size rotation)
+    :param when: Rotate on a time interval instead (e.g. 'midnight', 'H'); overrides max_bytes
+    :param compress: Gzip rotated log files
+    :param json_format: Write one JSON object per line to the log file instead of plain text
+    :param use_queue: Write through a background listener thread (False for synchronous handlers)
     :return: The configured logger
     """
+    # Stop a previous listener so its queue is drained before handlers are replaced
+    shutdown_logging()
+
     # Create logs directory if it doesn't exist
-    logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+    logs_dir = _logs_dir()
     os.makedirs(logs_dir, exist_ok=True)
     
     # Create a log file with timestamp
@@ -28,19 +53,39 @@ def setup_logging(log_level=logging.INFO, numbackups:int = 5) -> tuple[logging.L
     # Clear any existing handlers
     logger.handlers = []
     
-    # Create file handler for logging to a file
-    file_handler = logging.FileHandler(log_file)
-    file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # Create rotating file handler for logging to a file
+    if when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(log_file, when=when, backupCount=numbackups, encoding='utf-8')
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=numbackups, encoding='utf-8')
+    if compress:
+        file_handler.namer = _gzip_namer
+        file_handler.rotator = _gzip_rotator
+    if json_format:
+        file_format = JsonFormatter()
+    else:
+        file_format = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     file_handler.setFormatter(file_format)
     file_handler.setLevel(log_level)
-    logger.addHandler(file_handler)
     
     # Create console handler for logging to console
     console_handler = logging.StreamHandler(sys.stdout)
     console_format = logging.Formatter('%(levelname)s: %(message)s')
     console_handler.setFormatter(console_format)
     console_handler.setLevel(log_level)
-    logger.addHandler(console_handler)
+
+    if use_queue:
+        global _listener, _shutdown_registered
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+        if not _shutdown_registered:
+            atexit.register(shutdown_logging)
+            _shutdown_registered = True
+    else:
+        logger.addHandler(file_handler)
+        logger.addHandler(console_handler)
     
     # Create a specific logger for the application
     app_logger = logging.getLogger('pss_companion.main')
@@ -54,21 +99,153 @@ def setup_logging(log_level=logging.INFO, numbackups:int = 5) -> tuple[logging.L
     
     return app_logger, log_file
 
+def shutdown_logging() -> None:
+    """
+    Stop the background listener, flushing any queued records to their handlers
+    Safe to call more than once; registered with atexit by the first setup_logging call that starts a listener.
+    """
+    global _listener
+    listener, _listener = _listener, None
+    if listener:
+        try:
+            listener.stop()
+        except Exception as e:
+            print(f"Failed to stop log listener: {e}", file=sys.stderr)
+        for handler in listener.handlers:
+            try:
+                handler.close()
+            except Exception:
+                pass
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects for structured log output"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+def _logs_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
 def cleanup_logs(numbackups:int = 5):
     """
     Remove old log files from the logs directory
     :param numbackups: The number of log files to keep
     :return: The number of log files remaining
     """
-    logs_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'logs')
-    log_files = [f for f in os.listdir(logs_dir) if f.endswith('.log')]
+    logs_dir = _logs_dir()
+    all_files = os.listdir(logs_dir)
+    log_files = [f for f in all_files if f.endswith('.log')]
     log_files.sort()
     
-    # Keep the last numbackups log files
+    # Keep the last numbackups log files, along with their rotated backups
     for f in log_files[:-numbackups]:
+        for name in [n for n in all_files if n == f or n.startswith(f + '.')]:
+            try:
+                os.remove(os.path.join(logs_dir, name))
+            except Exception as e:
+                logging.getLogger('pss_companion.main').error(f"Failed to remove log file {name}: {e}")
+    
+    return len(log_files) - numbackups
+
+class LazyMessage:
+    """
+    Defers building a log message until a handler actually formats the record.
+    Pass it as a logging argument: logger.debug("Design: %s", lazy(_json.dumps, design))
+    """
+    __slots__ = ('_func', '_args', '_kwargs')
+
+    def __init__(self, func, *args, **kwargs):
+        self._func = func
+        self._args = args
+        self._kwargs = kwargs
+
+    def __str__(self) -> str:
         try:
-            os.remove(os.path.join(logs_dir, f))
+            return str(self._func(*self._args, **self._kwargs))
         except Exception as e:
-            logging.getLogger('pss_companion.main').error(f"Failed to remove log file {f}: {e}")
-    
-    return len(log_files) - numbackups
\ No newline at end of file
+            return f"<lazy message failed: {e}>"
+
+    __repr__ = __str__
+
+def lazy(func, *args, **kwargs) -> LazyMessage:
+    """
+    Wrap a callable so it is only evaluated if the log record is emitted
+    :param func: Callable returning the message (or a value to be formatted)
+    :return: A LazyMessage to pass as a logging argument
+    """
+    return LazyMessage(func, *args, **kwargs)
+
+def debug_enabled(logger: logging.Logger) -> bool:
+    """
+    Guard for hot loops: check once before building expensive debug output
+    :param logger: The logger to check
+    :return: True if DEBUG records from this logger would be handled
+    """
+    return logger.isEnabledFor(logging.DEBUG)
+
+class RateLimitedLogger:
+    """
+    Wraps a logger so that per-item messages (e.g. one per room) are sampled.
+    A message for a given key is emitted on the first call and then once every
+    `every` calls, and no more often than once per `interval` seconds.
+    The level check happens before any counting or formatting.
+    """
+
+    def __init__(self, logger: logging.Logger, every: int = 100, interval: float = 0.0):
+        self.logger = logger
+        self.every = max(1, int(every))
+        self.interval = interval
+        self._counts = {}
+        self._last_emit = {}
+        self._lock = threading.Lock()
+
+    def _should_emit(self, key) -> tuple[bool, int]:
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+            if count % self.every:
+                return False, count
+            if self.interval:
+                now = time.monotonic()
+                if now - self._last_emit.get(key, float('-inf')) < self.interval:
+                    return False, count
+                self._last_emit[key] = now
+            return True, count
+
+    def log(self, level: int, key, msg: str, *args) -> None:
+        if not self.logger.isEnabledFor(level):
+            return
+        emit, count = self._should_emit(key)
+        if emit:
+            if count:
+                msg = f"{msg} [sampled 1/{self.every}, seen {count + 1}]"
+            self.logger.log(level, msg, *args)
+
+    def debug(self, key, msg: str, *args) -> None:
+        self.log(logging.DEBUG, key, msg, *args)
+
+    def info(self, key, msg: str, *args) -> None:
+        self.log(logging.INFO, key, msg, *args)
+
+    def reset(self) -> None:
+        """Forget all per-key counters"""
+        with self._lock:
+            self._counts.clear()
+            self._last_emit.clear()
@@ -0,0 +1,207 @@
+import logging
+import os
+import sys
+import json
+import gzip
+import time
+import hashlib
+from typing import Dict, Any, List, Optional
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.modelSelection')
+
+# Hyperparameter grids per model family; the estimators are built in _families() so that
+# scikit-learn is only imported when a selection actually runs
+GRIDS = {
+    "random_forest": {"n_estimators": [100, 300], "max_depth": [None, 12], "min_samples_leaf": [1, 3],
+                      "max_features": ["sqrt", 0.5]},
+    "extra_trees": {"n_estimators": [100, 300], "max_depth": [None, 12], "min_samples_leaf": [1, 3]},
+    "gradient_boosting": {"learning_rate": [0.03, 0.1], "max_leaf_nodes": [15, 31], "l2_regularization": [0.0, 1.0]},
+    "logistic_regression": {"model__C": [0.1, 1.0, 10.0]},
+}
+
+def _families() -> Dict[str, Any]:
+    from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, HistGradientBoostingClassifier
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    # Tree ensembles stay single-threaded: the search already runs one fit per core
+    return {
+        "random_forest": RandomForestClassifier(random_state=42, n_jobs=1),
+        "extra_trees": ExtraTreesClassifier(random_state=42, n_jobs=1),
+        "gradient_boosting": HistGradientBoostingClassifier(random_state=42, early_stopping=True),
+        "logistic_regression": Pipeline([("scale", StandardScaler()), ("model", LogisticRegression(max_iter=1000))]),
+    }
+
+class FeatureCache:
+    """
+    Feature matrices (X, y, column names) keyed by a hash of the training rows, saved as .npz
+    so nightly runs on unchanged data skip rebuilding the DataFrame.
+    """
+
+    def __init__(self, directory: str = None) -> None:
+        self.directory = directory
+
+    @staticmethod
+    def key(rows: List[dict]) -> str:
+        digest = hashlib.sha1()
+        for row in rows:
+            digest.update(json.dumps(row, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def matrices(self, rows: List[dict]) -> tuple:
+        """(X, y, feature names) for rows, from the cache when possible"""
+        import numpy as _numpy
+        path = os.path.join(self.directory, f"features_{self.key(rows)}.npz") if self.directory else None
+        if path and os.path.exists(path):
+            try:
+                with _numpy.load(path, allow_pickle=False) as cached:
+                    logger.info(f"Using cached feature matrix {path}")
+                    return cached["X"], cached["y"], list(cached["columns"])
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable feature cache {path}: {e}")
+        import pandas as _pandas
+        df = _pandas.DataFrame(rows)
+        X_frame = df.drop('target', axis=1)
+        X = X_frame.to_numpy(dtype=float)
+        y = df['target'].to_numpy()
+        columns = [str(column) for column in X_frame.columns]
+        if path:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            _numpy.savez(tmp_path, X=X, y=y.astype(str) if y.dtype == object else y, columns=_numpy.array(columns))
+            os.replace(tmp_path, path)
+        return X, y, columns
+
+class SelectionResult:
+    """Outcome of select_model()."""
+    __slots__ = ('family', 'params', 'cv_score', 'scores', 'model', 'estimator', 'columns', 'seconds')
+
+    def __init__(self, family: str, params: dict, cv_score: float, scores: Dict[str, dict], model, estimator,
+                 columns: List[str], seconds: float) -> None:
+        self.family = family
+        self.params = params
+        # Mean cross-validated negative log loss of the winning configuration (higher is better)
+        self.cv_score = cv_score
+        self.scores = scores
+        # Calibrated model fitted on all rows, and the same configuration unfitted for later retrains
+        self.model = model
+        self.estimator = estimator
+        self.columns = columns
+        self.seconds = seconds
+
+    def report(self) -> dict:
+        return {"family": self.family, "params": self.params, "cv_score": self.cv_score,
+                "families": self.scores, "seconds": self.seconds}
+
+    def __repr__(self) -> str:
+        return f"SelectionResult({self.family}, cv_score={self.cv_score:.4f}, params={self.params})"
+
+def select_model(rows: List[dict], families: List[str] = None, folds: int = 5, n_jobs: int = -1,
+                 cache_dir: str = None, calibration: str = None, time_budget: float = None) -> SelectionResult:
+    """
+    Pick a model for Agent rows (feature dicts with a 'target') by k-fold cross-validation.
+    Each family's grid is searched with successive halving: every configuration starts on a
+    small share of the rows and only the best third advances to more rows, so bad
+    configurations are dropped early. The first rounds use at least 2 x folds x classes rows,
+    since the subsamples aren't stratified; a fit that still misses a class scores NaN and only
+    drops that candidate. Fits run on all cores (n_jobs=-1). The winner (by log loss) is
+    refitted on all rows inside CalibratedClassifierCV for calibrated probabilities.
+    :param families: Keys of GRIDS to try (default: all)
+    :param cache_dir: Directory for cached feature matrices (None disables caching)
+    :param calibration: 'sigmoid' or 'isotonic' (default: isotonic from 1000 rows up)
+    :param time_budget: Seconds after which no further families are started
+    """
+    from sklearn.base import clone
+    from sklearn.calibration import CalibratedClassifierCV
+    from sklearn.experimental import enable_halving_search_cv  # noqa: F401 (enables HalvingGridSearchCV)
+    from sklearn.model_selection import HalvingGridSearchCV, StratifiedKFold
+    from sklearn.metrics import log_loss, make_scorer
+    import numpy as _numpy
+
+    started = time.perf_counter()
+    X, y, columns = FeatureCache(cache_dir).matrices(rows)
+    cv = StratifiedKFold(n_splits=folds, shuffle=True, random_state=42)
+    classes = _numpy.unique(y)
+    # Passing every label keeps the score defined when a small fold holds a single class
+    scoring = make_scorer(log_loss, greater_is_better=False, response_method='predict_proba', labels=classes)
+    min_resources = min(len(y), 2 * folds * len(classes))
+    estimators = _families()
+    scores = {}
+    best = None
+    for family in families or list(GRIDS):
+        if time_budget is not None and time.perf_counter() - started > time_budget:
+            logger.warning(f"Time budget reached, skipping {family}")
+            continue
+        family_started = time.perf_counter()
+        try:
+            search = HalvingGridSearchCV(estimators[family], GRIDS[family], cv=cv, factor=3, scoring=scoring,
+                                         min_resources=min_resources, n_jobs=n_jobs, random_state=42, refit=False,
+                                         error_score=_numpy.nan)
+            search.fit(X, y)
+        except Exception as e:
+            logger.error(f"Model selection for {family} failed: {e}")
+            continue
+        if not _numpy.isfinite(search.best_score_):
+            logger.error(f"Model selection for {family} failed: no configuration could be scored")
+            continue
+        scores[family] = {"cv_score": float(search.best_score_), "params": search.best_params_,
+                          "candidates": len(search.cv_results_["params"]),
+                          "seconds": time.perf_counter() - family_started}
+        logger.info(f"{family}: best log loss {-search.best_score_:.4f} with {search.best_params_} "
+                    f"({scores[family]['seconds']:.1f}s)")
+        if best is None or search.best_score_ > best[1]:
+            best = (family, search.best_score_, search.best_params_)
+    if best is None:
+        raise RuntimeError("No model family could be evaluated")
+
+    family, cv_score, params = best
+    base = clone(estimators[family]).set_params(**params)
+    method = calibration or ('isotonic' if len(y) >= 1000 else 'sigmoid')
+    estimator = CalibratedClassifierCV(base, method=method, cv=folds, n_jobs=n_jobs)
+    import pandas as _pandas
+    # Refit with column names so Agent.predict can pass its usual one-row DataFrame
+    model = clone(estimator).fit(_pandas.DataFrame(X, columns=columns), y)
+    seconds = time.perf_counter() - started
+    logger.info(f"Selected {family} {params} (log loss {-cv_score:.4f}, {method} calibration) in {seconds:.1f}s")
+    return SelectionResult(family, params, float(cv_score), scores, model, estimator, columns, seconds)
+
+def _load_rows(path: str) -> List[dict]:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    return data.get("rows", data) if isinstance(data, dict) else data
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Cross-validated model selection for the Agent")
+    parser.add_argument("data", help="JSON (or .json.gz) list of training rows with a 'target' field")
+    parser.add_argument("--model-out", help="Save the calibrated model and its feature columns here (see Agent.load_model)")
+    parser.add_argument("--report", help="Write the selection report as JSON here")
+    parser.add_argument("--cache-dir", help="Cache feature matrices here")
+    parser.add_argument("--families", nargs="*", choices=list(GRIDS))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--time-budget", type=float, help="Seconds after which no further families are started")
+    args = parser.parse_args(argv)
+
+    from src import log_config as _log_config
+    _log_config.setup_logging(log_level=logging.INFO)
+    result = select_model(_load_rows(args.data), families=args.families, folds=args.folds, n_jobs=args.jobs,
+                          cache_dir=args.cache_dir, time_budget=args.time_budget)
+    if args.model_out:
+        from src import agent as _agent
+        agent = _agent.Agent()
+        agent.model, agent.estimator, agent.feature_columns = result.model, result.estimator, result.columns
+        if not agent.save_model(args.model_out):
+            return 1
+    report = json.dumps(result.report(), indent=2, default=str)
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            f.write(report)
+    print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,256 @@
+import logging
+import os
+import json
+import gzip
+import glob
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Set
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.nameIndex')
+
+# Characters tesseract commonly confuses, folded to one form before matching
+_OCR_FOLD = str.maketrans({
+    '0': 'o', '1': 'l', 'i': 'l', '|': 'l', '!': 'l', '5': 's', '8': 'b', '2': 'z', '$': 's', '@': 'a',
+})
+
+def default_match_files(data_dir: str) -> List[str]:
+    """Match files worth indexing: the storage backend's copy in data_dir and Match_Manager's file."""
+    return [os.path.join(data_dir, 'match_data', 'match_data.gz'),
+            os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'match_data', 'match_data.gz')]
+
+def normalize(name: str) -> str:
+    """Case-fold, strip accents/whitespace and fold OCR look-alike characters."""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(ch for ch in name if not unicodedata.combining(ch) and not ch.isspace())
+    return name.casefold().translate(_OCR_FOLD)
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """Edit distance between a and b, or max_distance + 1 as soon as it is known to exceed max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        lo = max(1, i - max_distance)
+        hi = min(len(b), i + max_distance)
+        if lo > 1:
+            current[lo - 1] = max_distance + 1
+        for j in range(lo, hi + 1):
+            cost = 0 if ca == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            row_min = min(row_min, current[j])
+        for j in range(hi + 1, len(b) + 1):
+            current[j] = max_distance + 1
+        if row_min > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[len(b)]
+
+class NameMatch:
+    """A candidate player for an OCR'd name."""
+    __slots__ = ('user_id', 'user_name', 'distance', 'confidence')
+
+    def __init__(self, user_id: int, user_name: str, distance: int, confidence: float) -> None:
+        self.user_id = user_id
+        self.user_name = user_name
+        self.distance = distance
+        self.confidence = confidence
+
+    def __repr__(self) -> str:
+        return f"NameMatch({self.user_name!r}, id={self.user_id}, distance={self.distance}, confidence={self.confidence:.2f})"
+
+class NameIndex:
+    """
+    Offline index of every player name we've seen, for resolving noisy OCR text.
+    Candidates come from a trigram inverted index over normalized names and are
+    ranked by bounded edit distance, so lookups touch only a handful of names.
+    """
+
+    def __init__(self) -> None:
+        self._names: Dict[str, Dict[int, str]] = {}       # normalized -> {user_id: display name}
+        self._trigrams: Dict[tuple, List[str]] = defaultdict(list)  # (name length, trigram) -> normalized names
+        self._lengths: Dict[int, List[str]] = defaultdict(list)     # name length -> normalized names
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def add(self, user_id: int, user_name: str) -> None:
+        """Add (or refresh) a player name."""
+        if not user_name or user_id is None:
+            return
+        key = normalize(user_name)
+        if not key:
+            return
+        with self._lock:
+            entries = self._names.get(key)
+            if entries is None:
+                entries = self._names[key] = {}
+                self._lengths[len(key)].append(key)
+                for gram in _trigrams(key):
+                    self._trigrams[(len(key), gram)].append(key)
+            entries[int(user_id)] = user_name
+
+    def add_users(self, users) -> int:
+        """Add pssapi User entities (e.g. search results). Returns the number added."""
+        count = 0
+        for user in users:
+            try:
+                self.add(user.id, user.name)
+                count += 1
+            except Exception as e:
+                logger.debug(f"Skipping user without id/name: {e}")
+        return count
+
+    def add_from_usr_data(self, directory: str) -> int:
+        """Index every usr_data/{name}_{id}.gz file name. Returns the number added."""
+        count = 0
+        for filepath in glob.glob(os.path.join(directory, '*.gz')):
+            stem = os.path.basename(filepath)[:-3]
+            name, _, user_id = stem.rpartition('_')
+            if name and user_id.isdigit():
+                self.add(int(user_id), name)
+                count += 1
+        logger.info(f"Indexed {count} names from {directory}")
+        return count
+
+    def add_from_matches(self, matches: List[Dict[str, Any]]) -> int:
+        """Index both players of match dicts (Match.to_dict layout). Returns the number added."""
+        count = 0
+        for match in matches:
+            for side in ("user1", "user2"):
+                if match.get(f"{side}_id") is not None and match.get(f"{side}_name"):
+                    self.add(match[f"{side}_id"], match[f"{side}_name"])
+                    count += 1
+        return count
+
+    def add_from_match_file(self, filepath: str) -> int:
+        """Index the players of a match_data.gz file ({"matches": [...]}). Returns the number added."""
+        if not os.path.exists(filepath):
+            return 0
+        try:
+            with gzip.open(filepath, 'rt', encoding='utf-8') as f:
+                count = self.add_from_matches(json.load(f).get("matches", []))
+            logger.info(f"Indexed {count} names from {filepath}")
+            return count
+        except Exception as e:
+            logger.error(f"Error indexing matches from {filepath}: {e}")
+            return 0
+
+    def lookup(self, query: str, max_distance: int = None, limit: int = 5) -> List[NameMatch]:
+        """
+        Find the players whose names best match query.
+
+        Args:
+            query: Raw OCR text
+            max_distance: Maximum edit distance (after normalization) to accept.
+                          Defaults to one edit per 5 characters (at least 1), which keeps the
+                          trigram filter selective for short names
+            limit: Maximum number of matches returned
+
+        Returns:
+            Matches ordered by confidence (1.0 is an exact normalized match)
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        if max_distance is None:
+            max_distance = max(1, len(key) // 5)
+        with self._lock:
+            exact = self._names.get(key)
+            if exact and max_distance == 0:
+                return [NameMatch(uid, name, 0, 1.0) for uid, name in exact.items()][:limit]
+
+            # Names of a compatible length sharing enough trigrams with the query;
+            # each edit destroys at most 3 of the query's trigrams
+            grams = _trigrams(key)
+            required = len(grams) - 3 * max_distance
+            candidates = []
+            lengths = range(max(1, len(key) - max_distance), len(key) + max_distance + 1)
+            if required < 1:
+                # Too short for the trigram filter (a match may share no trigram at all):
+                # compare against every name of a compatible length instead
+                for length in lengths:
+                    candidates.extend(self._lengths.get(length, ()))
+                lengths = ()
+            for length in lengths:
+                postings = [self._trigrams[(length, gram)] for gram in grams if (length, gram) in self._trigrams]
+                if len(postings) < required:
+                    continue
+                counts: Dict[str, int] = defaultdict(int)
+                for posting in postings:
+                    for candidate in posting:
+                        counts[candidate] += 1
+                candidates.extend(candidate for candidate, shared in counts.items() if shared >= required)
+            if exact:
+                candidates.append(key)
+
+            results = []
+            for candidate in set(candidates):
+                distance = bounded_levenshtein(key, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                confidence = 1.0 - distance / max(len(key), len(candidate))
+                for uid, name in self._names[candidate].items():
+                    results.append(NameMatch(uid, name, distance, confidence))
+        results.sort(key=lambda match: (-match.confidence, match.user_name))
+        return results[:limit]
+
+    def best(self, query: str, min_confidence: float = 0.75, max_distance: int = None) -> Optional[NameMatch]:
+        """The single best match if it is confident enough and not tied with a different player."""
+        matches = self.lookup(query, max_distance=max_distance, limit=2)
+        if not matches or matches[0].confidence < min_confidence:
+            return None
+        if len(matches) > 1 and matches[1].confidence == matches[0].confidence and matches[1].user_id != matches[0].user_id:
+            return None
+        return matches[0]
+
+    async def resolve(self, query: str, api_interface=None, min_confidence: float = 0.75) -> Optional[NameMatch]:
+        """
+        Resolve an OCR'd name locally, falling back to an API search (whose results are indexed) if needed.
+        """
+        match = self.best(query, min_confidence)
+        if match or api_interface is None:
+            return match
+        try:
+            users = await api_interface.get_users_by_name([query.strip()])
+        except Exception as e:
+            logger.error(f"API fallback for '{query}' failed: {e}")
+            return None
+        self.add_users(users)
+        return self.best(query, min_confidence)
+
+    def save(self, path: str) -> None:
+        """Write the index to a gzip JSON file."""
+        with self._lock:
+            entries = [[uid, name] for names in self._names.values() for uid, name in names.items()]
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({"names": entries}, f)
+        os.replace(tmp_path, path)
+        logger.info(f"Saved {len(entries)} names to {path}")
+
+    @classmethod
+    def load(cls, path: str) -> 'NameIndex':
+        """Load an index written by save() (an empty index if the file is missing)."""
+        index = cls()
+        if not os.path.exists(path):
+            return index
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                for user_id, name in json.load(f).get("names", []):
+                    index.add(user_id, name)
+            logger.info(f"Loaded {len(index)} names from {path}")
+        except Exception as e:
+            logger.error(f"Error loading name index from {path}: {e}")
+        return index
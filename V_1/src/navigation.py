@@ -0,0 +1,179 @@
+import logging
+import hashlib
+import threading
+from collections import OrderedDict, deque
+from typing import Dict, Iterable, List, Optional
+
+from src import config as _config
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.navigation')
+
+# Returned for rooms that can't be reached, so DSL comparisons like "> 10" still work
+UNREACHABLE = float('inf')
+
+# Rooms crew can't walk through
+_BLOCKING_TYPES = frozenset({"Wall"})
+_LIFT_TYPE = "Lift"
+
+def _room_dict(room) -> dict:
+    return room if isinstance(room, dict) else room.to_dict()
+
+def navigation_key(room_dicts: Iterable[dict]) -> str:
+    """
+    Hash of the room ids and geometry (design, position, size, type); armor and levels don't affect paths.
+    Graphs are keyed by room id, so ships with the same geometry but different ids get their own graph.
+    """
+    parts = sorted(
+        (room["room_id"], room["room_design_id"], room["room_cords"][0], room["room_cords"][1],
+         room["room_size"][0], room["room_size"][1], room.get("room_type"))
+        for room in room_dicts if room
+    )
+    return hashlib.sha1(";".join("%s,%s,%s,%s,%s,%s,%s" % part for part in parts).encode("utf-8")).hexdigest()
+
+class NavigationGraph:
+    """
+    Crew movement model of one ship layout.
+    The ship is a tile grid: crew move one tile at a time horizontally through any
+    non-wall room, and vertically only inside a room or between stacked lift tiles.
+    Shortest travel distances (in tiles) between every pair of rooms are computed once
+    with a multi-source BFS from each room, so queries are dictionary lookups.
+    """
+
+    def __init__(self, rooms: Iterable) -> None:
+        """
+        :param rooms: Room objects or room dicts (Room.to_dict() layout)
+        """
+        self.rooms: Dict[int, dict] = {}
+        tiles: Dict[tuple, int] = {}
+        for room in rooms:
+            data = _room_dict(room)
+            if not data or data.get("room_type") in _BLOCKING_TYPES:
+                continue
+            room_id = data["room_id"]
+            self.rooms[room_id] = data
+            x, y = data["room_cords"]
+            width, height = data["room_size"]
+            for dx in range(width or 1):
+                for dy in range(height or 1):
+                    tiles[(x + dx, y + dy)] = room_id
+        self._tiles = tiles
+        self._room_tiles: Dict[int, List[tuple]] = {}
+        for tile, room_id in tiles.items():
+            self._room_tiles.setdefault(room_id, []).append(tile)
+        self.distances: Dict[int, Dict[int, int]] = {room_id: self._bfs(room_id) for room_id in self.rooms}
+        logger.debug(f"Navigation graph built: {len(self.rooms)} rooms, {len(tiles)} tiles")
+
+    def _neighbours(self, tile: tuple, room_id: int):
+        x, y = tile
+        tiles = self._tiles
+        for step in ((x - 1, y), (x + 1, y)):
+            if step in tiles:
+                yield step
+        is_lift = self.rooms[room_id].get("room_type") == _LIFT_TYPE
+        for step in ((x, y - 1), (x, y + 1)):
+            other = tiles.get(step)
+            if other is None:
+                continue
+            if other == room_id or (is_lift and self.rooms[other].get("room_type") == _LIFT_TYPE):
+                yield step
+
+    def _bfs(self, source_id: int) -> Dict[int, int]:
+        """Tiles walked from the nearest tile of source to the nearest tile of every reachable room."""
+        seen = {tile: 0 for tile in self._room_tiles.get(source_id, [])}
+        queue = deque(seen)
+        result = {source_id: 0}
+        tiles = self._tiles
+        while queue:
+            tile = queue.popleft()
+            distance = seen[tile]
+            for step in self._neighbours(tile, tiles[tile]):
+                if step in seen:
+                    continue
+                seen[step] = distance + 1
+                queue.append(step)
+                room_id = tiles[step]
+                if room_id not in result:
+                    result[room_id] = distance + 1
+        return result
+
+    @staticmethod
+    def _id(room) -> int:
+        if isinstance(room, int):
+            return room
+        return _room_dict(room)["room_id"]
+
+    def distance(self, source, target) -> float:
+        """Tiles between two rooms (ids, dicts or Room objects), UNREACHABLE if there is no path."""
+        return self.distances.get(self._id(source), {}).get(self._id(target), UNREACHABLE)
+
+    def rooms_of_type(self, room_types: Iterable[str]) -> List[int]:
+        room_types = {room_types} if isinstance(room_types, str) else set(room_types)
+        return [room_id for room_id, data in self.rooms.items() if data.get("room_type") in room_types]
+
+    def from_types(self, room, room_types: Iterable[str]) -> float:
+        """Distance to room from the nearest room of any of room_types (distances are symmetric)."""
+        row = self.distances.get(self._id(room), {})
+        return min((row.get(source, UNREACHABLE) for source in self.rooms_of_type(room_types)), default=UNREACHABLE)
+
+    def from_bedroom(self, room) -> float:
+        return self.from_types(room, ("Bedroom",))
+
+    def from_android(self, room) -> float:
+        return self.from_types(room, ("Android",))
+
+    def reachable(self, source, target) -> bool:
+        return self.distance(source, target) != UNREACHABLE
+
+    def essential_times(self, source_types: Iterable[str] = ("Bedroom", "Android")) -> Dict[int, float]:
+        """Distance from the nearest source room to every essential room, keyed by room id."""
+        essential = _config.get_essential_rooms()
+        return {room_id: self.from_types(room_id, source_types)
+                for room_id, data in self.rooms.items() if data.get("room_type") in essential}
+
+    def max_essential_time(self, source_types: Iterable[str] = ("Bedroom", "Android")) -> float:
+        return max(self.essential_times(source_types).values(), default=0)
+
+    def __len__(self) -> int:
+        return len(self.rooms)
+
+
+class NavigationCache:
+    """LRU of NavigationGraphs keyed by navigation_key, shared by all evaluations."""
+
+    def __init__(self, max_entries: int = 256) -> None:
+        self.max_entries = max_entries
+        self._graphs: "OrderedDict[str, NavigationGraph]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, rooms: Iterable) -> NavigationGraph:
+        """Graph for the layout of rooms, built on first use."""
+        room_dicts = [_room_dict(room) for room in rooms]
+        key = navigation_key(room_dicts)
+        with self._lock:
+            graph = self._graphs.get(key)
+            if graph is not None:
+                self._graphs.move_to_end(key)
+                self.hits += 1
+                return graph
+            self.misses += 1
+        # Built outside the lock; two threads racing on one layout just build it twice
+        graph = NavigationGraph(room_dicts)
+        with self._lock:
+            self._graphs[key] = graph
+            while len(self._graphs) > self.max_entries:
+                self._graphs.popitem(last=False)
+        return graph
+
+    def clear(self) -> None:
+        with self._lock:
+            self._graphs.clear()
+
+
+_default_cache = NavigationCache()
+
+def get_graph(rooms: Iterable, cache: Optional[NavigationCache] = None) -> NavigationGraph:
+    """Cached navigation graph for a layout (Room objects or room dicts)."""
+    return (_default_cache if cache is None else cache).get(rooms)
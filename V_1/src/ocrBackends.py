@@ -0,0 +1,222 @@
+import logging
+import os
+import glob
+import time
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.ocrBackends')
+
+# Character whitelists per overlay region type (None = any character).
+# Player names can contain almost anything, so only the numeric/status regions are restricted.
+REGION_WHITELISTS = {
+    "name": None,
+    "status": "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789:/- ",
+    "number": "0123456789,.",
+}
+
+# Page segmentation mode per region type (7 = single text line, 6 = uniform block)
+REGION_PSM = {
+    "name": 7,
+    "status": 7,
+    "number": 7,
+}
+
+class OCRBackend(ABC):
+    """Interface for OCR engines used by OCRProcessor."""
+    name = "base"
+
+    def recognize(self, image, region_type: str = "name") -> str:
+        """Recognize the text in one PIL image."""
+        return self.recognize_batch([image], [region_type])[0]
+
+    @abstractmethod
+    def recognize_batch(self, images: Sequence, region_types: Sequence[str] = None) -> List[str]:
+        """Recognize several images (all regions of one capture) in one request."""
+
+    def close(self) -> None:
+        pass
+
+
+class TesserocrBackend(OCRBackend):
+    """
+    Persistent in-process tesseract via tesserocr.
+    The engine is initialized once and reused; no process is spawned per region.
+    """
+    name = "tesserocr"
+
+    def __init__(self, lang: str = "eng", tessdata_path: str = None) -> None:
+        import tesserocr
+        self._tesserocr = tesserocr
+        kwargs = {"lang": lang}
+        if tessdata_path:
+            kwargs["path"] = tessdata_path
+        self._api = tesserocr.PyTessBaseAPI(**kwargs)
+        self._lock = threading.Lock()
+        self._current = None
+        logger.info("Initialized persistent tesserocr engine")
+
+    def _configure(self, region_type: str) -> None:
+        if self._current == region_type:
+            return
+        whitelist = REGION_WHITELISTS.get(region_type)
+        self._api.SetVariable("tessedit_char_whitelist", whitelist or "")
+        self._api.SetPageSegMode(REGION_PSM.get(region_type, 7))
+        self._current = region_type
+
+    def recognize_batch(self, images: Sequence, region_types: Sequence[str] = None) -> List[str]:
+        region_types = region_types or ["name"] * len(images)
+        results = []
+        with self._lock:
+            for image, region_type in zip(images, region_types):
+                self._configure(region_type)
+                self._api.SetImage(image)
+                results.append(self._api.GetUTF8Text().strip())
+        return results
+
+    def close(self) -> None:
+        with self._lock:
+            if self._api:
+                self._api.End()
+                self._api = None
+
+
+class PytesseractBackend(OCRBackend):
+    """
+    Tesseract CLI via pytesseract.
+    A batch is stitched into one tall image and recognized with a single tesseract process;
+    words are mapped back to their region by vertical position.
+    """
+    name = "pytesseract"
+    _GAP = 20  # blank pixels between stitched regions
+
+    def __init__(self, tesseract_cmd: str = None) -> None:
+        import pytesseract
+        self._pytesseract = pytesseract
+        if tesseract_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+        logger.info("Initialized pytesseract OCR backend")
+
+    @staticmethod
+    def _config(region_type: str) -> str:
+        config = f"--psm {REGION_PSM.get(region_type, 7)}"
+        whitelist = REGION_WHITELISTS.get(region_type)
+        if whitelist:
+            config += f" -c tessedit_char_whitelist={whitelist.replace(' ', '')} -c preserve_interword_spaces=1"
+        return config
+
+    def recognize_batch(self, images: Sequence, region_types: Sequence[str] = None) -> List[str]:
+        region_types = list(region_types or ["name"] * len(images))
+        if len(images) == 1:
+            return [self._pytesseract.image_to_string(images[0], config=self._config(region_types[0])).strip()]
+
+        from PIL import Image
+        # Regions with different whitelists can't share one tesseract call
+        whitelists = {REGION_WHITELISTS.get(region_type) for region_type in region_types}
+        config = "--psm 6"
+        if len(whitelists) == 1 and None not in whitelists:
+            config = self._config(region_types[0]).replace("--psm 7", "--psm 6")
+
+        images = [image.convert("L") for image in images]
+        width = max(image.width for image in images)
+        height = sum(image.height for image in images) + self._GAP * (len(images) - 1)
+        sheet = Image.new("L", (width, height), color=255)
+        bands = []
+        top = 0
+        for image in images:
+            sheet.paste(image, (0, top))
+            bands.append((top, top + image.height))
+            top += image.height + self._GAP
+
+        data = self._pytesseract.image_to_data(sheet, config=config, output_type=self._pytesseract.Output.DICT)
+        words = [[] for _ in images]
+        for text, word_top, word_height, left in zip(data["text"], data["top"], data["height"], data["left"]):
+            if not text or not text.strip():
+                continue
+            centre = word_top + word_height / 2
+            for index, (band_top, band_bottom) in enumerate(bands):
+                if band_top <= centre <= band_bottom:
+                    words[index].append((word_top // max(1, word_height), left, text))
+                    break
+        return [" ".join(text for _, _, text in sorted(region_words)) for region_words in words]
+
+
+def create_backend(preferred: str = "auto", **kwargs) -> Optional[OCRBackend]:
+    """
+    Create an OCR backend.
+    :param preferred: 'tesserocr', 'pytesseract' or 'auto' (persistent engine first)
+    :return: The backend, or None if no OCR engine is installed
+    """
+    order = ["tesserocr", "pytesseract"] if preferred == "auto" else [preferred]
+    for name in order:
+        try:
+            if name == "tesserocr":
+                return TesserocrBackend(**{k: v for k, v in kwargs.items() if k in ("lang", "tessdata_path")})
+            if name == "pytesseract":
+                return PytesseractBackend(**{k: v for k, v in kwargs.items() if k in ("tesseract_cmd",)})
+        except ImportError:
+            logger.info(f"OCR backend {name} not available")
+        except Exception as e:
+            logger.error(f"Error initializing OCR backend {name}: {e}")
+    logger.error("No OCR backend available")
+    return None
+
+
+def benchmark(backend: OCRBackend, image_dir: str, regions: Sequence[tuple] = None,
+              region_types: Sequence[str] = None, repeats: int = 3) -> dict:
+    """
+    Time a backend on stored screenshots.
+    :param image_dir: Directory of .png/.jpg captures
+    :param regions: Boxes (x1, y1, x2, y2) cropped from each screenshot; whole image if None
+    :param region_types: Region type per box (defaults to 'name')
+    :param repeats: Passes over the image set
+    :return: Timing summary (seconds) for per-region calls and batched calls
+    """
+    from PIL import Image
+    paths = sorted(glob.glob(os.path.join(image_dir, "*.png")) + glob.glob(os.path.join(image_dir, "*.jpg")))
+    captures = []
+    for path in paths:
+        with Image.open(path) as screenshot:
+            screenshot.load()
+            captures.append([screenshot.crop(box) for box in regions] if regions else [screenshot.copy()])
+    if not captures:
+        raise FileNotFoundError(f"No screenshots found in {image_dir}")
+    types = list(region_types or ["name"] * len(captures[0]))
+
+    single = time.perf_counter()
+    for _ in range(repeats):
+        for crops in captures:
+            for crop, region_type in zip(crops, types):
+                backend.recognize(crop, region_type)
+    single = time.perf_counter() - single
+
+    batched = time.perf_counter()
+    for _ in range(repeats):
+        for crops in captures:
+            backend.recognize_batch(crops, types)
+    batched = time.perf_counter() - batched
+
+    calls = repeats * len(captures)
+    result = {
+        "backend": backend.name,
+        "captures": len(captures),
+        "regions_per_capture": len(types),
+        "per_region_s": single / calls,
+        "batched_s": batched / calls,
+    }
+    logger.info(f"OCR benchmark: {result}")
+    return result
+
+
+if __name__ == "__main__":
+    import sys
+    import json
+    logging.basicConfig(level=logging.INFO)
+    directory = sys.argv[1] if len(sys.argv) > 1 else "."
+    for backend_name in ("tesserocr", "pytesseract"):
+        ocr_backend = create_backend(backend_name)
+        if ocr_backend:
+            print(json.dumps(benchmark(ocr_backend, directory), indent=2))
+            ocr_backend.close()
@@ -1,9 +1,15 @@
-from pssapi import entities as _entities
+from __future__ import annotations
 import json as _json
 import logging
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pssapi import entities as _entities
+
+from src import log_config as _log_config
 
 # Get logger for this module
 logger = logging.getLogger('pss_companion.room')
+room_logger = _log_config.RateLimitedLogger(logger, every=50)
 
 class Room:
     """
@@ -30,7 +36,7 @@ class Room:
                 try:
                     if _design.get('room_design_id', 'False') == 'False':
                         logger.warning(f"Room design not found for room: {_room.id}")
-                    logger.debug(f"Initializing room: {_room.id} with design: {_design.get('room_design_id', 'unknown')}")
+                    room_logger.debug("init", "Initializing room: %s with design: %s", _room.id, _design.get('room_design_id', 'unknown'))
                     roomIsUpgrading = _room.room_status == "Upgrading"
                     roomIsPowered = _design.get('max_system_power', 0) > 0 or _design.get('max_power_generated', 0) > 0
                     roomShortname = _design.get('room_short_name', None).split(':')[0] if _design.get('room_short_name', None) else None
@@ -38,7 +44,7 @@ class Room:
                     roomPower = _design.get('max_power_generated', 0) if _design.get('max_power_generated', 0) != 0 else -1*_design.get('max_system_power', 0)
                     roomArmorAbl = _design.get('capacity', 0) if _design.get('room_type') == "Wall" else 0
                     if _design.get('room_type') == "Wall" and roomArmorAbl == 0:
-                        logger.warning(f"Wall with no armor ability: {_design}")
+                        logger.warning("Wall with no armor ability: %s", _design.get('room_design_id', 'unknown'))
 
                     roomIsEssential = _design.get("RoomType", None) in _essensal_rooms
                     self.room = {
@@ -63,7 +69,6 @@ class Room:
                         "room_armor": 0,
                         "room_armor_abl": roomArmorAbl
                     }
-                    logger.debug(f"Room {roomShortname} ({_room.id}) initialized successfully")
                 except Exception as e:
                     logger.error(f"Error initializing room: {str(e)}")
                     self.room = None
@@ -129,14 +134,13 @@ class Room:
 
     def setArmor(self, _armorRoom: 'Room'):
         try:
-            room_name = self.room.get('room_short_name', 'None')
-            room_armor = self.room['room_armor']
             armor_ability = _armorRoom.room['room_armor_abl']
-            new_armor = room_armor + armor_ability
-            armor_room_id = _armorRoom.room['room_id']
-            
-            logger.debug(f"Setting armor for room {room_name} to {room_armor} + {armor_ability} = {new_armor} from {armor_room_id}")
-            self.room["room_armor"] += _armorRoom.room["room_armor_abl"]
+            if _log_config.debug_enabled(logger):
+                room_armor = self.room['room_armor']
+                room_logger.debug("set_armor", "Setting armor for room %s to %s + %s = %s from %s",
+                                  self.room.get('room_short_name', 'None'), room_armor, armor_ability,
+                                  room_armor + armor_ability, _armorRoom.room['room_id'])
+            self.room["room_armor"] += armor_ability
         except Exception as e:
             logger.error(f"Error setting armor: {e}")
 
@@ -1,46 +1,248 @@
 import logging
 import traceback
 import asyncio
+import ast
 import json as _json
+from typing import Optional
 
 from src import dslParser as _dslParser
 from src import room as _room
 from src import ship as _ship
 from src import user as _user
 from src import config as _config
+from src import log_config as _log_config
+from src import evalCache as _evalCache
+from src import navigation as _navigation
 
 # Get logger for this module
 logger = logging.getLogger('pss_companion.ruleEngine')
+room_logger = _log_config.RateLimitedLogger(logger, every=100)
 
 class apiInterface:
     pass
-    
+
+_EVAL_GLOBALS = {"__builtins__": {}}
+
+# Room attributes whose equality tests are used to dispatch rules to rooms
+_GUARD_ATTRS = ('type', 'short_name')
+
+def _guard_of(node: ast.AST) -> Optional[tuple]:
+    """(attribute, value) if node is a room.type == "X" / room.short_name == "X" test, else None"""
+    if (isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], ast.Eq)
+            and isinstance(node.left, ast.Attribute) and isinstance(node.left.value, ast.Name)
+            and node.left.value.id == 'room' and node.left.attr in _GUARD_ATTRS
+            and isinstance(node.comparators[0], ast.Constant) and isinstance(node.comparators[0].value, str)):
+        return node.left.attr, node.comparators[0].value
+    return None
+
+def _split_condition(condition: str, name: str) -> tuple:
+    """Split a condition into an optional dispatch guard and the compiled terms of its conjunction"""
+    body = ast.parse(condition.strip(), mode='eval').body
+    parts = body.values if isinstance(body, ast.BoolOp) and isinstance(body.op, ast.And) else [body]
+    guard = None
+    terms = []
+    for part in parts:
+        if guard is None:
+            guard = _guard_of(part)
+            if guard:
+                continue
+        terms.append((ast.unparse(part), compile(ast.Expression(part), f"<rule {name}>", 'eval')))
+    return guard, tuple(terms)
+
+def _uses_name(condition: str, name: str) -> bool:
+    return any(isinstance(node, ast.Name) and node.id == name for node in ast.walk(ast.parse(condition.strip(), mode='eval')))
+
+class CompiledRule:
+    """
+    A DSL rule prepared once for evaluation: the condition is translated to Python,
+    split into a dispatch guard and compiled conjunction terms, and the outcome
+    (value, message) is extracted from its actions.
+    Immutable after construction, so one compiled rule set can be shared by any
+    number of concurrent evaluations.
+    """
+    __slots__ = ('name', 'group', 'order', 'condition', 'guard', 'terms', 'outcome', 'returns', 'uses_nav')
+
+    def __init__(self, rule, order: int = 0) -> None:
+        self.name = rule.name
+        self.group = getattr(rule, 'group', None)
+        self.order = order
+        # Replace JavaScript operators with Python operators; the ship armor value is
+        # passed in as a local instead of being pasted into the condition text
+        condition = rule.condition.replace('&&', ' and ').replace('||', ' or ')
+        self.condition = condition.replace('self.ship_armor_value', 'ship_armor_value')
+        self.guard, self.terms = _split_condition(self.condition, self.name)
+        # Rules referring to nav (the layout's NavigationGraph) need the graph built first
+        self.uses_nav = _uses_name(self.condition, 'nav')
+        self.outcome, self.returns = self._extract_outcome(rule)
+
+    @staticmethod
+    def _extract_outcome(rule) -> tuple:
+        """(value, message) produced when the rule triggers, and whether it ends evaluation of the room"""
+        actions = getattr(rule, 'actions', None)
+        if not actions:
+            logger.warning(f"Rule {rule.name} has no actions defined")
+            return None, False
+
+        if len(actions) < 2:
+            logger.warning(f"Rule {rule.name} has insufficient actions: {actions}")
+            action_value = 0
+            action_message = "Incomplete rule"
+            if len(actions[0]) >= 2:
+                action_value = actions[0][1]
+                action_message = "Penalty" if actions[0][0] == "penalty" else "Reward"
+            return (action_value, action_message), True
+
+        action1 = actions[0]
+        action2 = actions[1]
+        if not isinstance(action1, (list, tuple)) or len(action1) < 2:
+            logger.warning(f"Invalid action1 format: {action1}")
+            action1 = ("unknown", 0)
+        if not isinstance(action2, (list, tuple)) or len(action2) < 2:
+            logger.warning(f"Invalid action2 format: {action2}")
+            action2 = ("unknown", "No message")
+
+        if action1[0] == "penalty":
+            return (action1[1], action2[1]), True
+        return (action2[1], action1[1]), True
+
+def compile_rules(rules: list) -> tuple:
+    """Compile parsed DSL rules, skipping (and logging) any whose condition is not valid Python"""
+    compiled = []
+    for rule in rules:
+        try:
+            compiled.append(CompiledRule(rule, order=len(compiled)))
+        except SyntaxError as e:
+            logger.error(f"Error compiling rule '{rule.name}' condition '{rule.condition}': {e}")
+    return tuple(compiled)
+
+class RulePlan:
+    """
+    Execution plan for a compiled rule set.
+    - Rules guarded by a room.type / room.short_name equality test are only tried on matching rooms
+    - Rules are still tried in file order, so first-match results and groups are unchanged
+    """
+
+    def __init__(self, rules: tuple) -> None:
+        """
+        :param rules: Compiled rules (each rule's order is its index)
+        """
+        self.rules = rules
+        self._guarded = {}
+        self._unguarded = []
+        self.uses_nav = any(rule.uses_nav for rule in rules)
+        for rule in rules:
+            if rule.guard:
+                self._guarded.setdefault(rule.guard, []).append(rule)
+            else:
+                self._unguarded.append(rule)
+        self._candidates = {}
+
+    def candidates(self, room: _room.Room) -> tuple:
+        """Rules that can trigger for this room, in file order"""
+        key = (getattr(room, 'type', None), getattr(room, 'short_name', None))
+        rules = self._candidates.get(key)
+        if rules is None:
+            rules = self._unguarded + self._guarded.get(('type', key[0]), []) + self._guarded.get(('short_name', key[1]), [])
+            rules = self._candidates[key] = tuple(sorted(rules, key=lambda rule: rule.order))
+        return rules
+
+    @staticmethod
+    def matches(rule: CompiledRule, eval_locals: dict) -> bool:
+        """Whether the rule's terms all hold (its guard is implied by candidates())"""
+        for _, code in rule.terms:
+            if not eval(code, _EVAL_GLOBALS, eval_locals):
+                return False
+        return True
+
+class EvaluationResult:
+    """Outcome of scoring one layout."""
+    __slots__ = ('score', 'room_evaluations', 'lift_evaluations', 'issues', 'np_multiplier')
+
+    def __init__(self, score: float = 0.0, room_evaluations: list = None, lift_evaluations: list = None,
+                 issues: list = None, np_multiplier: float = 1.0) -> None:
+        self.score = score
+        self.room_evaluations = room_evaluations or []
+        self.lift_evaluations = lift_evaluations or []
+        self.issues = issues or []
+        self.np_multiplier = np_multiplier
+
+    @property
+    def evaluations(self) -> list:
+        return self.room_evaluations + self.lift_evaluations
+
+    def __iter__(self):
+        # Unpacks like the evaluate_all_rooms tuple: score, evaluations, issues
+        return iter((self.score, self.evaluations, self.issues))
+
+    def to_list(self) -> list:
+        return [self.score, self.room_evaluations, self.lift_evaluations, self.issues, self.np_multiplier]
+
+    @classmethod
+    def from_list(cls, data: list) -> 'EvaluationResult':
+        if len(data) == 4:
+            # Entries cached before rooms and lifts were stored separately
+            score, evaluations, issues, np_multiplier = data
+            return cls(score, evaluations, [], issues, np_multiplier)
+        return cls(*data)
+
+    def __repr__(self) -> str:
+        return f"EvaluationResult(score={self.score}, issues={len(self.issues)}, np_multiplier={self.np_multiplier:.2f})"
+
 class RuleEngine:
+    """
+    Scores ship layouts against DSL rules.
+
+    evaluate() is stateless: it reads only the compiled rule set and the layout it is
+    given, so one engine can serve the overlay, daemons and batch workers concurrently.
+    By default a room reports the first rule that triggers; with collect_all=True it
+    reports every triggered rule, except that only the first of each GROUP is kept.
+    The user-bound API (create/init_ruleEngine/evaluate_all_rooms) is kept for run.py.
+    """
 
-    def __init__(self) -> None:
-        self.rules = None
+    def __init__(self, rules: list = None, rules_hash: str = None, cache: _evalCache.EvaluationCache = None) -> None:
+        self.rules = rules
+        self.compiled_rules = compile_rules(rules) if rules else ()
+        self.plan = RulePlan(self.compiled_rules)
         self.user = None
         self.rooms = None
         self.lifts = None
         self.ship_armor_value = None
         self.np_multiplier = 1.0
+        self.rules_hash = rules_hash
+        self.cache = cache
 
+    @classmethod
+    def from_file(cls, rules_file: str, cache: _evalCache.EvaluationCache = None) -> 'RuleEngine':
+        """Create an engine for a rules file without binding it to a user"""
+        instance = cls(cache=cache)
+        instance.load_rules(rules_file)
+        return instance
+
+    def load_rules(self, rules_file: str) -> None:
+        """Parse and compile a rules file, replacing the current rule set"""
+        rules = _dslParser.parse_dsl_file(rules_file)
+        logger.debug(f"Loaded {len(rules)} rules from DSL file")
+        compiled = compile_rules(rules)
+        guarded = sum(1 for rule in compiled if rule.guard)
+        logger.debug(f"Compiled {len(compiled)} rules, {guarded} dispatched by room type/name")
+        # Swap the plan and its hash together so cache keys always match the rules used
+        self.rules, self.compiled_rules = rules, compiled
+        self.plan, self.rules_hash = RulePlan(compiled), _evalCache.hash_rules_file(rules_file)
 
     @classmethod
-    async def create(cls, api_interface: apiInterface, rules_file: str, user_file: str = None, user: _user.User = None):
+    async def create(cls, api_interface: apiInterface, rules_file: str, user_file: str = None, user: _user.User = None,
+                     cache: _evalCache.EvaluationCache = None):
         """Factory method to create and initialize a RuleEngine object asynchronously"""
         # Create instance with minimal init
-        instance = cls()
+        instance = cls(cache=cache)
         await instance.init_ruleEngine(api_interface, rules_file, user_file, user)
         return instance
 
     async def init_ruleEngine(self, api_interface: apiInterface, rules_file: str, user_file: str = None, user: _user.User = None) -> None:
         try:
             logger.info(f"Initializing Rule Engine with rules file: {rules_file}")
-            self.rules = _dslParser.parse_dsl_file(rules_file)
-            logger.debug(f"Loaded {len(self.rules)} rules from DSL file")
+            self.load_rules(rules_file)
 
-            
             if user_file:
                 logger.info(f"Loading user data from file: {user_file}")
                 self.user = await _user.User.create(api_interface)
@@ -61,107 +263,80 @@ class RuleEngine:
             logger.error(f"Error initializing Rule Engine: {e}")
             raise
 
-    def evaluate_room(self, room: _room.Room) -> tuple[str, str, int]:
-        """Evaluate room against rules and return results"""
+    def _evaluate_room(self, room: _room.Room, ship_armor_value: float, essential_rooms: frozenset,
+                       plan: RulePlan = None, collect_all: bool = False,
+                       nav: _navigation.NavigationGraph = None) -> tuple[list, float]:
+        """Evaluate one room; returns ([[name, value, message], ...], change to the NP multiplier)"""
         try:
             if not room or not hasattr(room, 'room') or not room.room:
                 logger.warning(f"Skipping invalid room in evaluation")
-                return ["Unknown", 0, "Invalid Room"]
+                return [["Unknown", 0, "Invalid Room"]], 0.0
                 
             room_name = room.short_name if hasattr(room, 'short_name') else "Unknown"
-            logger.debug(f"Evaluating rules for room: {room_name}")
-            
-            for rule in self.rules:
+            debug = _log_config.debug_enabled(logger)
+            if debug:
+                room_logger.debug("room", "Evaluating rules for room: %s", room_name)
+
+            plan = self.plan if plan is None else plan
+            essential = room.type in essential_rooms
+            np_delta = 0.0
+            results = []
+            fired_groups = set()
+            eval_locals = {"room": room, "ship_armor_value": ship_armor_value, "nav": nav}
+            for rule in plan.candidates(room):
+                if rule.group is not None and rule.group in fired_groups:
+                    continue
                 try:
-                    # Convert condition to valid Python syntax
-                    condition = rule.condition
-                    # Replace JavaScript operators with Python operators
-                    condition = condition.replace('&&', ' and ')
-                    condition = condition.replace('||', ' or ')
-                    
-                    # Handle self.ship_armor_value references
-                    if 'self.ship_armor_value' in condition:
-                        condition = condition.replace('self.ship_armor_value', str(self.ship_armor_value))
-                    
-                    # Create a safe locals dictionary for evaluation
-                    eval_locals = {"room": room}
-                    
-                    # Safely evaluate the condition
-                    logger.debug(f"Evaluating condition for {room_name}: {condition}")
-                    result = eval(condition, {"__builtins__": {}}, eval_locals)
-                    
-                    if result:
-                        logger.info(f"Rule '{rule.name}' triggered for room {room_name}")
-
-                        # Run acttions basses on essensal rooms
-                        if room.type in _config.get_essential_rooms():
-                            logger.info(f"Room {room_name} is essential")
-                            self.np_multiplier += .01
-                        
-                        # Extract rule actions safely
-                        try:
-                            # Make sure we have enough actions
-                            if not hasattr(rule, 'actions') or not rule.actions:
-                                logger.warning(f"Rule {rule.name} has no actions defined")
-                                continue
-                                
-                            if len(rule.actions) < 2:
-                                logger.warning(f"Rule {rule.name} has insufficient actions: {rule.actions}")
-                                # Return what we can
-                                action_value = 0
-                                action_message = "Incomplete rule"
-                                
-                                if len(rule.actions) == 1:
-                                    if len(rule.actions[0]) >= 2:
-                                        if rule.actions[0][0] == "penalty":
-                                            action_value = rule.actions[0][1]
-                                            action_message = "Penalty"
-                                        else:
-                                            action_value = rule.actions[0][1]
-                                            action_message = "Reward"
-                                
-                                return [room_name, action_value, action_message]
-                            
-                            # We have at least 2 actions, check their format
-                            action1 = rule.actions[0]
-                            action2 = rule.actions[1]
-                            
-                            if not isinstance(action1, (list, tuple)) or len(action1) < 2:
-                                logger.warning(f"Invalid action1 format: {action1}")
-                                action1 = ("unknown", 0)
-                                
-                            if not isinstance(action2, (list, tuple)) or len(action2) < 2:
-                                logger.warning(f"Invalid action2 format: {action2}")
-                                action2 = ("unknown", "No message")
-                            
-                            # Now safely extract the values
-                            if action1[0] == "penalty":
-                                return [room_name, action1[1], action2[1]]
-                            else:
-                                return [room_name, action2[1], action1[1]]
-                                
-                        except Exception as e:
-                            logger.error(f"Error extracting rule results: {e}")
-                            import traceback
-                            logger.debug(traceback.format_exc())
-                            return [room_name, 0, f"Error: {str(e)}"]                        
+                    if debug:
+                        room_logger.debug(rule.name, "Evaluating condition for %s: %s", room_name, rule.condition)
+                    triggered = plan.matches(rule, eval_locals)
                 except Exception as e:
-                    logger.error(f"Error evaluating rule condition '{condition}': {str(e)}")
-                    import traceback
+                    logger.error(f"Error evaluating rule condition '{rule.condition}': {str(e)}")
                     logger.debug(traceback.format_exc())
                     continue
-            if room.type in _config.get_essential_rooms():
-                logger.info(f"Room {room_name} is essential, reducing NP multiplier")
-                self.np_multiplier -= .01
-            return [room_name, 0, "No Rule Triggered"]
-                    
-            
+
+                if triggered:
+                    logger.info("Rule '%s' triggered for room %s", rule.name, room_name)
+
+                    # Run acttions basses on essensal rooms; when collecting every rule, an
+                    # essential room still moves the multiplier once, as in first-match mode
+                    if essential and not (collect_all and np_delta):
+                        logger.debug("Room %s is essential", room_name)
+                        np_delta += .01
+
+                    if rule.returns:
+                        results.append([room_name, rule.outcome[0], rule.outcome[1]])
+                        if not collect_all:
+                            break
+                        if rule.group is not None:
+                            fired_groups.add(rule.group)
+
+            if not results:
+                if essential:
+                    logger.debug("Room %s is essential, reducing NP multiplier", room_name)
+                    np_delta -= .01
+                results.append([room_name, 0, "No Rule Triggered"])
+            return results, np_delta
+
         except Exception as e:
             logger.error(f"Error in evaluate_room: {e}")
-            import traceback
             logger.debug(traceback.format_exc())
-            return ["Error", 0, str(e)]
-        
+            return [["Error", 0, str(e)]], 0.0
+
+    def evaluate_room(self, room: _room.Room, ship_armor_value: float = None) -> tuple[str, str, int]:
+        """Evaluate room against rules and return the first triggered result (does not change the engine's state)"""
+        if ship_armor_value is None:
+            ship_armor_value = self.ship_armor_value
+        return self._evaluate_room(room, ship_armor_value, _config.get_essential_rooms(),
+                                   nav=self._navigation(self.plan, self.rooms))[0][0]
+
+    def evaluate_room_all(self, room: _room.Room, ship_armor_value: float = None) -> list:
+        """Evaluate room against rules and return every triggered result (first of each group)"""
+        if ship_armor_value is None:
+            ship_armor_value = self.ship_armor_value
+        return self._evaluate_room(room, ship_armor_value, _config.get_essential_rooms(), collect_all=True,
+                                   nav=self._navigation(self.plan, self.rooms))[0]
+
     def evaluate_lift(self, lift: _ship.lift) -> tuple[str, int, str]:
         """Evaluate a lift object against lift-specific rules"""
         try:
@@ -169,7 +344,11 @@ class RuleEngine:
                 logger.warning("Skipping invalid lift in evaluation")
                 return ["Unknown", 0, "Invalid Lift"]
                 
-            lift_id = f"Lift-{id(lift)}"  # Create a unique identifier for this lift
+            # Identify the lift by its first room's position, which stays the same for the
+            # same layout (results for a layout may come from the evaluation cache)
+            first = lift.rooms[0] if lift.rooms else None
+            lift_id = f"Lift-{first.x},{first.y}" if first is not None else "Lift"
+
             logger.debug(f"Evaluating rules for lift with {lift.langth} rooms")
             
             # For the LFT_LENGTH rule
@@ -186,14 +365,13 @@ class RuleEngine:
             logger.debug(traceback.format_exc())
             return ["Error", 0, str(e)]
 
-    def evaluate_lifts(self) -> tuple[float, list[tuple[str, int, str]]]:
-        """Evaluate all lifts and return results"""
+    def _evaluate_lifts(self, lifts: list) -> tuple[float, list[tuple[str, int, str]]]:
         logger.info("Starting evaluation of all lifts")
         evaluations = []
         issues = []
 
         try:
-            for lift in self.lifts:
+            for lift in lifts:
                 result = self.evaluate_lift(lift)
                 evaluations.append(result)
                 if result[1] != 0:
@@ -208,48 +386,134 @@ class RuleEngine:
             logger.error(f"Error in evaluate_lifts: {e}")
             return 0.0, [], []
 
-    def evaluate_all_rooms(self) -> tuple[float, list[tuple[str, int, str]]]:
+    def evaluate_lifts(self) -> tuple[float, list[tuple[str, int, str]]]:
+        """Evaluate all lifts and return results"""
+        return self._evaluate_lifts(self.lifts or [])
+
+    @staticmethod
+    def _navigation(plan: RulePlan, rooms: list) -> Optional[_navigation.NavigationGraph]:
+        """Cached navigation graph of the layout, or None when no rule uses nav"""
+        if not plan.uses_nav or not rooms:
+            return None
+        try:
+            return _navigation.get_graph(room for room in rooms if room)
+        except Exception as e:
+            logger.error(f"Error building navigation graph: {e}")
+            return None
+
+    def layout_fingerprint(self, rooms: list = None) -> str:
+        """Fingerprint of the rooms being evaluated (see Ship.layout_fingerprint)"""
+        return _ship.Ship.layout_fingerprint([room.to_dict() for room in (self.rooms if rooms is None else rooms)])
+
+    def evaluate(self, ship: _ship.Ship = None, rooms: list = None, lifts: list = None,
+                 ship_armor_value: float = None, collect_all: bool = False) -> EvaluationResult:
+        """
+        Score a layout without touching the engine's state (safe to call concurrently).
+        :param ship: Ship to score; supplies rooms, lifts and armor value unless they are given explicitly
+        :param rooms: Room objects to score
+        :param lifts: Lift objects to score
+        :param ship_armor_value: Armor value per armor block for the ship
+        :param collect_all: Report every triggered rule per room instead of the first
+        :return: EvaluationResult (a cached one when this layout was already scored with these rules)
+        """
+        if ship is not None:
+            rooms = ship.shipRooms if rooms is None else rooms
+            lifts = ship.Lifts if lifts is None else lifts
+            ship_armor_value = ship.shipArmorValue if ship_armor_value is None else ship_armor_value
+        rooms = rooms or []
+        lifts = lifts or []
+
+        # Read the shared state once so a concurrent load_rules() or config reload can't mix rule sets
+        plan, rules_hash, cache = self.plan, self.rules_hash, self.cache
+        settings = _config.get_snapshot()
+        fingerprint = None
+        if cache is not None and rules_hash is not None:
+            rules_hash = self._result_key(rules_hash, settings, collect_all)
+            try:
+                # Lifts are scored too, so a rooms-only evaluation doesn't share a key with a full one
+                fingerprint = f"{self.layout_fingerprint(rooms)}+{len(lifts)}"
+            except Exception as e:
+                logger.error(f"Error fingerprinting layout, evaluating without cache: {e}")
+            if fingerprint:
+                cached = cache.get(fingerprint, rules_hash, ship_armor_value)
+                if cached is not None:
+                    result = EvaluationResult.from_list(cached)
+                    logger.info(f"Evaluation cache hit for layout {fingerprint[:12]}. Final score: {result.score} / 100")
+                    return result
+
+        result = self._evaluate_layout(plan, rooms, lifts, ship_armor_value, collect_all, settings.essential_rooms)
+        if fingerprint and result.evaluations:
+            cache.put(fingerprint, rules_hash, ship_armor_value, result.to_list())
+        return result
+
+    @staticmethod
+    def _result_key(rules_hash: str, settings: _config.ConfigSnapshot, collect_all: bool) -> str:
+        # Results depend on the rules, the config (essential rooms) and the evaluation mode
+        return f"{rules_hash}:{settings.digest}" + (":all" if collect_all else "")
+
+    def result_key(self, collect_all: bool = False) -> Optional[str]:
+        """
+        What evaluate() results depend on besides the layout: the rules file, the config and the
+        mode. Results stored elsewhere are stale once this changes (None if the rules weren't loaded from a file).
+        """
+        if self.rules_hash is None:
+            return None
+        return self._result_key(self.rules_hash, _config.get_snapshot(), collect_all)
+
+    def evaluate_all_rooms(self, collect_all: bool = False) -> tuple[float, list[tuple[str, int, str]]]:
+        """Evaluate the bound user's rooms and lifts (see evaluate())"""
+        result = self.evaluate(rooms=self.rooms, lifts=self.lifts, ship_armor_value=self.ship_armor_value,
+                               collect_all=collect_all)
+        self.np_multiplier = result.np_multiplier
+        return result.score, result.evaluations, result.issues
+
+    def _evaluate_layout(self, plan: RulePlan, rooms: list, lifts: list, ship_armor_value: float,
+                         collect_all: bool = False, essential_rooms: frozenset = None) -> EvaluationResult:
         logger.info("Starting evaluation of all rooms and lifts")
         score = 100.0
+        np_multiplier = 1.0
         room_evaluations = []
-        lift_evaluations = []
         issues = []
+        if essential_rooms is None:
+            essential_rooms = _config.get_essential_rooms()
         
         try:
+            nav = self._navigation(plan, rooms)
+
             # Evaluate regular rooms
-            for room in self.rooms:
+            for room in rooms:
                 if room.type in ["Wall", "Corridor", "Lift"]:
-                    logger.debug(f"Skipping room {room.id} of type {room.type}")
+                    room_logger.debug("skip", "Skipping room %s of type %s", room.id, room.type)
                     continue
                     
-                result = self.evaluate_room(room)
-                room_evaluations.append(result)
-                if result[1] != 0:
-                    issues.append(result)
+                results, np_delta = self._evaluate_room(room, ship_armor_value, essential_rooms, plan, collect_all, nav)
+                np_multiplier += np_delta
+                for result in results:
+                    room_evaluations.append(result)
+                    if result[1] != 0:
+                        issues.append(result)
             
             # Evaluate lifts
-            lift_score, lift_evals, lift_issues = self.evaluate_lifts()
-            lift_evaluations.extend(lift_evals)
+            lift_score, lift_evaluations, lift_issues = self._evaluate_lifts(lifts)
             issues.extend(lift_issues)
-            
-            # Combine all evaluations
-            all_evaluations = room_evaluations + lift_evaluations
 
             # Apply NP multiplier to appropriate room evaluations
-            logger.info(f"Applying NP multiplier: {self.np_multiplier}")
+            logger.info(f"Applying NP multiplier: {np_multiplier}")
             for evaluation in room_evaluations:
                 if evaluation[2] == 'Non-powered rooms should not have armor':
                     logger.debug(f"Applying NP multiplier to room {evaluation[0]}")
-                    evaluation[1] *= self.np_multiplier
+                    evaluation[1] *= np_multiplier
             
             # Calculate final score
-            total_penalty = sum(eval_item[1] for eval_item in all_evaluations)
+            total_penalty = sum(eval_item[1] for eval_item in room_evaluations + lift_evaluations)
             score += total_penalty
             
-            logger.debug(f"Detailed evaluations: {all_evaluations}")
+            result = EvaluationResult(score, room_evaluations, lift_evaluations, issues, np_multiplier)
+            logger.debug("Detailed evaluations: %s", result.evaluations)
             logger.info(f"Evaluation complete. Final score: {score} / 100")
-            return score, all_evaluations, issues
+            return result
             
         except Exception as e:
             logger.error(f"Error in evaluate_all_rooms: {e}")
-            return 0.0, [], []
+            return EvaluationResult()
+
@@ -0,0 +1,150 @@
+import logging
+import os
+import json
+import socket
+from typing import Any, Optional, Union
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.scoringClient')
+
+# Requests and responses are single-line JSON objects:
+#   {"id": 1, "method": "score", "params": {"user_name": "..."}}
+#   {"id": 1, "result": {...}}  or  {"id": 1, "error": "..."}
+# Over TCP, which any local user can reach, requests also carry "token": the contents of the
+# daemon's token file, which is created for each run and readable only by its owner.
+DEFAULT_PORT = 47615
+
+Address = Union[str, tuple]
+
+def default_address(data_dir: str) -> Address:
+    """Unix socket in the data directory where supported, otherwise a localhost TCP port."""
+    if hasattr(socket, 'AF_UNIX') and os.name != 'nt':
+        return os.path.join(data_dir, 'scoring.sock')
+    return ('127.0.0.1', DEFAULT_PORT)
+
+def default_data_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data')
+
+def token_path(data_dir: str) -> str:
+    return os.path.join(data_dir, 'scoring.token')
+
+def read_token(path: str) -> Optional[str]:
+    """The daemon's TCP token, or None if there is no token file."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+class DaemonError(Exception):
+    """Raised by ScoringClient when the daemon reports an error."""
+
+class ScoringClient:
+    """Blocking client for the scoring daemon (used by the overlay and the CLI)."""
+
+    def __init__(self, address: Address = None, timeout: float = 30.0, token_file: str = None) -> None:
+        self.address = address or default_address(default_data_dir())
+        self.timeout = timeout
+        self.token_file = token_file or token_path(default_data_dir())
+        self._sock = None
+        self._file = None
+        self._next_id = 0
+
+    @classmethod
+    def connect(cls, address: Address = None, timeout: float = 30.0, token_file: str = None) -> Optional['ScoringClient']:
+        """A connected client, or None if no daemon is listening."""
+        client = cls(address, timeout, token_file)
+        try:
+            client._open()
+            return client
+        except OSError:
+            return None
+
+    def _open(self) -> None:
+        if isinstance(self.address, str):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.address)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._file = sock.makefile('rb')
+
+    def close(self) -> None:
+        if self._sock:
+            self._file.close()
+            self._sock.close()
+            self._sock = None
+            self._file = None
+
+    def call(self, method: str, **params) -> Any:
+        """
+        Send one request and wait for its result; reconnects once if the daemon restarted.
+        Any other socket error (e.g. a timeout) closes the connection, so a late reply can't
+        be read as the answer to the next request.
+        """
+        self._next_id += 1
+        request = {"id": self._next_id, "method": method, "params": params}
+        if not isinstance(self.address, str):
+            # Read per call, since a restarted daemon writes a new token
+            request["token"] = read_token(self.token_file)
+        payload = json.dumps(request).encode('utf-8') + b"\n"
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._open()
+                self._sock.sendall(payload)
+                line = self._file.readline()
+                if not line:
+                    raise ConnectionError("Daemon closed the connection")
+                break
+            except ConnectionError:
+                self.close()
+                if attempt:
+                    raise
+            except OSError:
+                self.close()
+                raise
+        try:
+            response = json.loads(line)
+        except ValueError:
+            self.close()
+            raise
+        if response.get("id") != request["id"]:
+            self.close()
+            raise DaemonError(f"Response id {response.get('id')} does not match request id {request['id']}")
+        if "error" in response:
+            raise DaemonError(response["error"])
+        return response.get("result")
+
+    def score(self, user_name: str = None, user_id: int = None, collect_all: bool = False) -> dict:
+        return self.call("score", user_name=user_name, user_id=user_id, collect_all=collect_all)
+
+    def lookup(self, name: str, limit: int = 5, resolve: bool = True) -> dict:
+        return self.call("lookup", name=name, limit=limit, resolve=resolve)
+
+    def similar(self, user_name: str, k: int = 10, min_similarity: float = 0.0, collect_all: bool = False) -> dict:
+        return self.call("similar", user_name=user_name, k=k, min_similarity=min_similarity, collect_all=collect_all)
+
+    def simulate(self, user_name: str, opponent_name: str, simulations: int = 2000) -> dict:
+        return self.call("simulate", user_name=user_name, opponent_name=opponent_name, simulations=simulations)
+
+    def watch(self, user_name: str, user_id: int = None) -> dict:
+        return self.call("watch", user_name=user_name, user_id=user_id)
+
+    def unwatch(self, user_name: str = None, user_id: int = None) -> dict:
+        return self.call("unwatch", user_name=user_name, user_id=user_id)
+
+    def predict(self, features: dict) -> dict:
+        return self.call("predict", features=features)
+
+    def status(self) -> dict:
+        return self.call("status")
+
+    def shutdown(self) -> None:
+        self.call("shutdown")
+        self.close()
@@ -0,0 +1,421 @@
+import logging
+import asyncio as _asyncio
+import os
+import sys
+import json
+import time
+import hmac
+import secrets
+import functools
+import traceback
+
+from src import apiCache as _apiCache
+from src import apiScheduler as _apiScheduler
+from src import designs as _designs
+from src import user as _user
+from src import ruleEngine as _ruleEngine
+from src import evalCache as _evalCache
+from src import nameIndex as _nameIndex
+from src import layoutIndex as _layoutIndex
+from src import config as _config
+from src import scoringClient as _scoringClient
+from src import collector as _collector
+from src import fileManager as _fileManager
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.scoringDaemon')
+
+_MAX_LINE = 1 << 20
+
+def _default_rules_file() -> str:
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'ROOM_RULES.dsl')
+
+class ScoringService:
+    """
+    Warm state shared by every request: API session, designs, compiled rules,
+    evaluation cache, name index and (optionally) the Agent model.
+    With collect set, a SnapshotCollector polls the watched players in the background and
+    feeds new layouts into the daemon's LayoutIndex.
+    """
+
+    def __init__(self, data_dir: str, rules_file: str, design_dir: str = None, model_path: str = None,
+                 collect: bool = False) -> None:
+        self.data_dir = data_dir
+        self.rules_file = rules_file
+        self.design_dir = design_dir
+        self.model_path = model_path
+        self.api_interface = None
+        self.room_designs = None
+        self.ship_designs = None
+        self.engine = None
+        self.name_index = None
+        self.layout_index = None
+        self.agent = None
+        self.simulator = None
+        self.collect = collect
+        self.collector = None
+        self._collector_task = None
+        self.started = None
+        self.requests = 0
+
+    async def start(self) -> None:
+        started = time.perf_counter()
+        self.api_interface = _apiCache.CachedApiInterface(
+            cache_path=os.path.join(self.data_dir, 'api_cache.db'),
+            client_factory=_apiScheduler.scheduled_factory(_apiScheduler.RequestScheduler()))
+        await self.api_interface.init_pss_api_client()
+        await self.load_designs()
+
+        self.engine = _ruleEngine.RuleEngine.from_file(
+            self.rules_file,
+            cache=_evalCache.EvaluationCache(path=os.path.join(self.data_dir, 'eval_cache.json.gz'), autosave_every=50))
+
+        self.name_index = _nameIndex.NameIndex.load(os.path.join(self.data_dir, 'name_index.gz'))
+        self.name_index.add_from_usr_data(os.path.join(self.data_dir, 'usr_data'))
+        for match_file in _nameIndex.default_match_files(self.data_dir):
+            self.name_index.add_from_match_file(match_file)
+        self.layout_index = _layoutIndex.LayoutIndex.load(os.path.join(self.data_dir, 'layout_index.gz'))
+        self.layout_index.add_from_usr_data(os.path.join(self.data_dir, 'usr_data'))
+
+        if self.model_path and os.path.exists(self.model_path):
+            # Imported here so the daemon starts without pandas/sklearn when no model is configured
+            from src import agent as _agent
+            self.agent = _agent.Agent()
+            if not self.agent.load_model(self.model_path):
+                self.agent = None
+
+        if self.collect:
+            self.collector = _collector.SnapshotCollector(
+                self.api_interface, self.room_designs, self.ship_designs,
+                _fileManager.FileManager(base_dir=self.data_dir), layout_index=self.layout_index)
+            self._collector_task = _asyncio.ensure_future(self.collector.run())
+
+        _config.start_watching()
+        self.started = time.time()
+        logger.info(f"Scoring service ready in {time.perf_counter() - started:.2f}s")
+
+    async def load_designs(self) -> None:
+        """Fetch designs from the API, falling back to the JSON backups in design_dir."""
+        try:
+            designs = await _designs.get_all_designs(self.api_interface)
+            self.room_designs = designs["room_designs"]
+            self.ship_designs = designs["ship_designs"]
+            logger.info("Designs fetched")
+        except Exception as e:
+            if not self.design_dir:
+                raise
+            logger.error(f"Designs not found: {e}; loading from {self.design_dir}")
+            with open(os.path.join(self.design_dir, 'room_designs.json'), 'r') as f:
+                self.room_designs = json.load(f)
+            with open(os.path.join(self.design_dir, 'ship_designs.json'), 'r') as f:
+                self.ship_designs = json.load(f)
+
+    async def stop_collector(self) -> None:
+        if self._collector_task is None:
+            return
+        self.collector.stop()
+        try:
+            await self._collector_task
+        except Exception as e:
+            logger.error(f"Snapshot collector failed: {e}")
+        self._collector_task = None
+
+    def shutdown(self) -> None:
+        _config.stop_watching()
+        if self.engine:
+            if self.engine.cache is not None:
+                self.engine.cache.save()
+        if self.name_index:
+            self.name_index.save(os.path.join(self.data_dir, 'name_index.gz'))
+        if self.layout_index:
+            self.layout_index.save(os.path.join(self.data_dir, 'layout_index.gz'))
+
+    @staticmethod
+    async def _run_blocking(func, *args, **kwargs):
+        """Run CPU-bound work (rule evaluation, gzip reads, simulation) off the event loop."""
+        return await _asyncio.get_running_loop().run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+    async def _find_user(self, user_name: str = None, user_id: int = None):
+        """API user by name; user_id picks between players returned by the same search."""
+        if not user_name:
+            raise ValueError("user_name is required")
+        found = await self.api_interface.get_users_by_name([user_name])
+        self.name_index.add_users(found)
+        if user_id is not None:
+            api_user = next((u for u in found if u.id == int(user_id)), None)
+        else:
+            api_user = next((u for u in found if u.name == user_name), None) or next(iter(found), None)
+        if api_user is None:
+            raise LookupError(f"User {user_name} not found")
+        return api_user
+
+    async def score(self, user_name: str = None, user_id: int = None, collect_all: bool = False) -> dict:
+        """Fetch a player's ship and score it with the warm rule engine."""
+        with _apiScheduler.interactive():
+            api_user = await self._find_user(user_name, user_id)
+            user = await _user.User.create(self.api_interface, api_user, self.room_designs, self.ship_designs)
+        result = await self._run_blocking(self.engine.evaluate, ship=user.ship, collect_all=collect_all)
+        return {
+            "user_id": user.user_id,
+            "user_name": user.user_name,
+            "fingerprint": user.ship.fingerprint,
+            "score": result.score,
+            "np_multiplier": result.np_multiplier,
+            "evaluations": result.evaluations,
+            "issues": result.issues,
+        }
+
+    async def similar(self, user_name: str, k: int = 10, min_similarity: float = 0.0, collect_all: bool = False) -> dict:
+        """Tracked layouts most similar to a player's current ship, with their rule scores (scored as score() does)."""
+        with _apiScheduler.interactive():
+            api_user = await self._find_user(user_name)
+            user = await _user.User.create(self.api_interface, api_user, self.room_designs, self.ship_designs)
+        matches = await self._run_blocking(self.layout_index.query, user.ship, k=k, exclude_user=user.user_id,
+                                           min_similarity=min_similarity)
+        await self._run_blocking(self.layout_index.score, matches, self.engine, collect_all=collect_all)
+        return {"user_name": user.user_name, "matches": [match.to_dict() for match in matches]}
+
+    async def simulate(self, user_name: str, opponent_name: str, simulations: int = 2000) -> dict:
+        """Monte Carlo duel estimate of user_name's ship against opponent_name's."""
+        with _apiScheduler.interactive():
+            users = []
+            for name in (user_name, opponent_name):
+                api_user = await self._find_user(name)
+                users.append(await _user.User.create(self.api_interface, api_user, self.room_designs, self.ship_designs))
+        if self.simulator is None:
+            # Imported on first use so the daemon starts without numpy
+            from src import battleSim as _battleSim
+            self.simulator = _battleSim.BattleSimulator(self.room_designs, self.ship_designs)
+        estimate = await self._run_blocking(self.simulator.estimate, users[0].ship, users[1].ship, simulations=simulations)
+        return {"user_name": users[0].user_name, "opponent_name": users[1].user_name, **estimate.to_dict()}
+
+    async def lookup(self, name: str, limit: int = 5, resolve: bool = True) -> dict:
+        """Match OCR text against the name index (with an API search fallback when resolve is set)."""
+        matches = self.name_index.lookup(name, limit=limit)
+        best = self.name_index.best(name)
+        if best is None and resolve:
+            with _apiScheduler.interactive():
+                best = await self.name_index.resolve(name, self.api_interface)
+            if best:
+                matches = self.name_index.lookup(name, limit=limit)
+        as_dict = lambda m: {"user_id": m.user_id, "user_name": m.user_name, "distance": m.distance, "confidence": m.confidence}
+        return {"best": as_dict(best) if best else None, "matches": [as_dict(m) for m in matches]}
+
+    async def watch(self, user_name: str, user_id: int = None) -> dict:
+        """Add a player to the snapshot collector's watch list."""
+        if self.collector is None:
+            raise RuntimeError("Snapshot collector not running (start the daemon with --collect)")
+        with _apiScheduler.interactive():
+            api_user = await self._find_user(user_name, user_id)
+        entry = self.collector.add_user(api_user.id, api_user.name)
+        return entry.to_dict()
+
+    async def unwatch(self, user_name: str = None, user_id: int = None) -> dict:
+        """Remove a player from the watch list, by id or by (exact) name."""
+        if self.collector is None:
+            raise RuntimeError("Snapshot collector not running (start the daemon with --collect)")
+        if user_id is None:
+            user_id = next((entry.user_id for entry in self.collector.watch.values() if entry.user_name == user_name), None)
+        else:
+            user_id = int(user_id)
+        removed = user_id in self.collector.watch
+        if removed:
+            self.collector.remove_user(user_id)
+            self.collector.save_state()
+        return {"user_id": user_id, "removed": removed}
+
+    async def predict(self, features: dict) -> dict:
+        if self.agent is None:
+            raise RuntimeError("No Agent model loaded")
+        prediction, probability = self.agent.predict(features)
+        if hasattr(prediction, 'item'):
+            prediction = prediction.item()
+        return {"prediction": prediction, "probability": float(probability)}
+
+    async def status(self) -> dict:
+        cache = self.engine.cache if self.engine else None
+        return {
+            "uptime": time.time() - self.started if self.started else 0.0,
+            "requests": self.requests,
+            "rules": len(self.engine.compiled_rules) if self.engine else 0,
+            "names": len(self.name_index) if self.name_index else 0,
+            "layouts": len(self.layout_index) if self.layout_index else 0,
+            "model": self.agent is not None,
+            "watched": len(self.collector.watch) if self.collector else None,
+            "eval_cache": {"entries": len(cache), "hits": cache.hits, "misses": cache.misses} if cache is not None else None,
+        }
+
+class ScoringDaemon:
+    """
+    Serves a ScoringService over a Unix socket (mode 0600) or localhost TCP.
+    Over TCP every request must carry the token written to the token file for this run.
+    """
+    METHODS = ("score", "lookup", "similar", "predict", "simulate", "watch", "unwatch", "status")
+
+    def __init__(self, service: ScoringService, address: _scoringClient.Address) -> None:
+        self.service = service
+        self.address = address
+        self._server = None
+        self._stop = None
+        self._token = None
+        self.token_file = _scoringClient.token_path(service.data_dir)
+
+    async def _dispatch(self, request: dict) -> dict:
+        response = {"id": request.get("id")}
+        method = request.get("method")
+        try:
+            if method == "shutdown":
+                self._stop.set()
+                response["result"] = True
+            elif method in self.METHODS:
+                self.service.requests += 1
+                response["result"] = await getattr(self.service, method)(**(request.get("params") or {}))
+            else:
+                response["error"] = f"Unknown method: {method}"
+        except Exception as e:
+            logger.error(f"Error handling {method}: {e}")
+            logger.debug(traceback.format_exc())
+            response["error"] = f"{type(e).__name__}: {e}"
+        return response
+
+    async def _handle(self, reader: _asyncio.StreamReader, writer: _asyncio.StreamWriter) -> None:
+        try:
+            while not reader.at_eof():
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    response = {"id": None, "error": "Invalid JSON"}
+                else:
+                    if not self._authorized(request):
+                        logger.warning("Rejected a request without a valid token")
+                        writer.write(json.dumps({"id": request.get("id"), "error": "Unauthorized"}).encode('utf-8') + b"\n")
+                        await writer.drain()
+                        break
+                    response = await self._dispatch(request)
+                writer.write(json.dumps(response, default=str).encode('utf-8') + b"\n")
+                await writer.drain()
+        except (ConnectionError, _asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _authorized(self, request) -> bool:
+        if self._token is None:
+            return True
+        token = request.get("token") if isinstance(request, dict) else None
+        return isinstance(token, str) and hmac.compare_digest(token, self._token)
+
+    def _write_token(self) -> None:
+        """Create a fresh token file that only the current user can read."""
+        self._token = secrets.token_hex(32)
+        if os.path.exists(self.token_file):
+            os.unlink(self.token_file)
+        fd = os.open(self.token_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self._token)
+
+    async def serve(self) -> None:
+        """Start the service, then serve until a shutdown request (or cancellation)."""
+        self._stop = _asyncio.Event()
+        await self.service.start()
+        if isinstance(self.address, str):
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            self._server = await _asyncio.start_unix_server(self._handle, path=self.address, limit=_MAX_LINE)
+            os.chmod(self.address, 0o600)
+        else:
+            self._write_token()
+            self._server = await _asyncio.start_server(self._handle, host=self.address[0], port=self.address[1], limit=_MAX_LINE)
+        logger.info(f"Scoring daemon listening on {self.address}")
+        try:
+            async with self._server:
+                await self._stop.wait()
+        finally:
+            await self.service.stop_collector()
+            self.service.shutdown()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+            if self._token is not None and os.path.exists(self.token_file):
+                os.unlink(self.token_file)
+            logger.info("Scoring daemon stopped")
+
+def main(argv: list = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="PSS Companion scoring daemon")
+    parser.add_argument("--data-dir", default=_scoringClient.default_data_dir())
+    parser.add_argument("--address", help="Unix socket path or host:port")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Run the daemon")
+    serve.add_argument("--rules", default=_default_rules_file())
+    serve.add_argument("--designs", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Design backups'))
+    serve.add_argument("--model")
+    serve.add_argument("--collect", action="store_true", help="Poll watched players' ships in the background")
+    score = sub.add_parser("score", help="Score a player's ship")
+    score.add_argument("user_name")
+    score.add_argument("--all", action="store_true", help="Report every triggered rule per room (first of each group)")
+    similar = sub.add_parser("similar", help="Find tracked layouts similar to a player's ship")
+    similar.add_argument("user_name")
+    similar.add_argument("-k", type=int, default=10)
+    simulate = sub.add_parser("simulate", help="Estimate a duel between two players' ships")
+    simulate.add_argument("user_name")
+    simulate.add_argument("opponent_name")
+    simulate.add_argument("--simulations", type=int, default=2000)
+    lookup = sub.add_parser("lookup", help="Resolve (OCR'd) player name")
+    lookup.add_argument("name")
+    watch = sub.add_parser("watch", help="Snapshot a player's ship whenever its layout changes (needs serve --collect)")
+    watch.add_argument("user_name")
+    unwatch = sub.add_parser("unwatch", help="Stop snapshotting a player's ship")
+    unwatch.add_argument("user_name")
+    sub.add_parser("status")
+    sub.add_parser("shutdown")
+    args = parser.parse_args(argv)
+
+    address = _scoringClient.default_address(args.data_dir)
+    if args.address:
+        host, _, port = args.address.rpartition(':')
+        address = (host or '127.0.0.1', int(port)) if port.isdigit() else args.address
+
+    if args.command == "serve":
+        from src import log_config as _log_config
+        _log_config.setup_logging(log_level=logging.INFO)
+        service = ScoringService(args.data_dir, args.rules, design_dir=args.designs, model_path=args.model,
+                                 collect=args.collect)
+        _asyncio.run(ScoringDaemon(service, address).serve())
+        return 0
+
+    client = _scoringClient.ScoringClient.connect(address, token_file=_scoringClient.token_path(args.data_dir))
+    if client is None:
+        print(f"No scoring daemon listening on {address}", file=sys.stderr)
+        return 1
+    try:
+        if args.command == "score":
+            result = client.score(user_name=args.user_name, collect_all=args.all)
+        elif args.command == "similar":
+            result = client.similar(args.user_name, k=args.k)
+        elif args.command == "simulate":
+            result = client.simulate(args.user_name, args.opponent_name, simulations=args.simulations)
+        elif args.command == "lookup":
+            result = client.lookup(args.name)
+        elif args.command == "watch":
+            result = client.watch(args.user_name)
+        elif args.command == "unwatch":
+            result = client.unwatch(args.user_name)
+        elif args.command == "status":
+            result = client.status()
+        else:
+            client.shutdown()
+            return 0
+        print(json.dumps(result, indent=2))
+        return 0
+    except _scoringClient.DaemonError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
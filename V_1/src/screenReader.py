@@ -1,39 +1,62 @@
-import tkinter as tk
-from tkinter import ttk
-from PIL import ImageGrab, Image, ImageEnhance
-import pytesseract
-import ctypes
 import logging
+import os
+import sys
+import threading
 
-# Enable DPI awareness for accurate screen scaling
-ctypes.windll.shcore.SetProcessDpiAwareness(2)
-# Set the Tesseract executable path if needed
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+from src import nameIndex as _nameIndex
+from src import ocrBackends as _ocrBackends
+from src import captureBackends as _captureBackends
+from src import scoringClient as _scoringClient
+from src.lazyImport import lazy_import
+
+# GUI and imaging libraries load on first use, so importing this module stays cheap
+tk = lazy_import('tkinter')
+Image = lazy_import('PIL.Image')
+ImageEnhance = lazy_import('PIL.ImageEnhance')
+
+# Tesseract executable used by the pytesseract backend on Windows
+TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
 # Get logger for this module
 logger = logging.getLogger('pss_companion.screenReader')
 
 
+def enable_dpi_awareness():
+    """Enable DPI awareness for accurate screen scaling (Windows only)"""
+    if sys.platform != 'win32':
+        return
+    try:
+        import ctypes
+        ctypes.windll.shcore.SetProcessDpiAwareness(2)
+    except Exception as e:
+        logger.warning(f"Could not enable DPI awareness: {e}")
+
+
 class OCRProcessor:
     """Handles OCR processing for screen regions"""
-    def __init__(self, engine=None):
+    def __init__(self, engine=None, backend="auto", capture=None):
         """
         Initialize the OCR processor
-        :param engine: Optional OCR engine to use (if None, will try to initialize one)
+        :param engine: Optional OCRBackend to use (if None, will try to initialize one)
+        :param backend: Backend to create when engine is None: 'auto', 'tesserocr' or 'pytesseract'
+        :param capture: Optional CaptureBackend (if None, uses mss or PIL.ImageGrab)
         """
         self.engine = engine
+        self.capture = capture
         try:
+            if not self.capture:
+                self.capture = _captureBackends.create_capture_backend()
             if not self.engine:
-                # Try to import and initialize pytesseract
-                try:
-                    import pytesseract
-                    from PIL import ImageGrab
-                    self.engine = pytesseract
-                    self._grab_image = ImageGrab.grab
-                    logger.info("Initialized OCR processor with pytesseract")
-                except ImportError:
-                    logger.error("Failed to import pytesseract or PIL. OCR functionality will be limited.")
-                    self.engine = None
+                # Prefer a persistent in-process engine over spawning tesseract per call
+                tesseract_cmd = TESSERACT_CMD if sys.platform == 'win32' else None
+                self.engine = _ocrBackends.create_backend(backend, tesseract_cmd=tesseract_cmd)
+                if self.engine:
+                    logger.info(f"Initialized OCR processor with {self.engine.name}")
+                else:
+                    logger.error("No OCR engine available. OCR functionality will be limited.")
+        except ImportError:
+            logger.error("Failed to import PIL. OCR functionality will be limited.")
+            self.engine = None
         except Exception as e:
             logger.error(f"Error initializing OCR processor: {e}")
             self.engine = None
@@ -51,10 +74,11 @@ class OCRProcessor:
             logging.error(f'Error in preprocess_image(self,: {e}')
             raise
 
-    def perform_ocr(self, region):
+    def perform_ocr(self, region, region_type="name"):
         """
         Perform OCR on a screen region
         :param region: Tuple (x1, y1, x2, y2) defining the screen region
+        :param region_type: Region type used to pick the character whitelist (see ocrBackends.REGION_WHITELISTS)
         :return: Extracted text
         """
         if not self.engine:
@@ -63,15 +87,36 @@ class OCRProcessor:
             
         try:
             # Capture the screen region
-            image = self._grab_image(bbox=region)
+            image = self.capture.grab(region)
             # Perform OCR
-            text = self.engine.image_to_string(image)
-            logger.debug(f"OCR result from region {region}: {text.strip()}")
-            return text.strip()
+            text = self.engine.recognize(image, region_type)
+            logger.debug(f"OCR result from region {region}: {text}")
+            return text
         except Exception as e:
             logger.error(f"Error performing OCR: {e}")
             return f"OCR error: {str(e)}"
 
+    def perform_ocr_batch(self, regions, region_types=None):
+        """
+        Perform OCR on several screen regions in one engine request
+        :param regions: List of (x1, y1, x2, y2) screen regions
+        :param region_types: Region type per region (defaults to 'name')
+        :return: List of extracted texts
+        """
+        if not self.engine:
+            logger.warning("No OCR engine available")
+            return ["OCR not available"] * len(regions)
+
+        try:
+            # All regions come from a single frame
+            images = self.capture.grab_regions(regions)
+            texts = self.engine.recognize_batch(images, region_types)
+            logger.debug(f"Batched OCR results for {len(regions)} regions: {texts}")
+            return texts
+        except Exception as e:
+            logger.error(f"Error performing batched OCR: {e}")
+            return [f"OCR error: {str(e)}"] * len(regions)
+
 
 class MatchDetector:
     """Periodically checks a region (e.g. the match-making area) for updates via OCR."""
@@ -121,7 +166,7 @@ class MatchDetector:
                 return
                 
             try:
-                result = self.ocr_processor.perform_ocr(self.region)
+                result = self.ocr_processor.perform_ocr(self.region, "status")
                 logger.debug(f"Auto-match OCR Result: {result}")
                 
                 # Optionally, call the callback with the OCR result if it meets certain conditions
@@ -140,10 +185,12 @@ class MatchDetector:
 
 class OverlayGUI:
     """Handles the overlay GUI including region selection and manual match capture."""
-    def __init__(self, root, ocr_processor, num_regions=3):
+    def __init__(self, root, ocr_processor, num_regions=3, name_index=None, scoring_client=None):
         try:
             self.root = root
             self.ocr_processor = ocr_processor
+            self.name_index = name_index
+            self.scoring_client = scoring_client
             self.num_regions = num_regions
             self.regions = []
             self.overlay_shapes = []
@@ -260,20 +307,41 @@ class OverlayGUI:
             logging.error(f'Error in finish_drawing(self):: {e}')
             raise
 
-    def perform_ocr_on_regions(self, regions):
-        """Perform OCR on the provided regions."""
+    def perform_ocr_on_regions(self, regions, region_types=None):
+        """Perform OCR on the provided regions in a single batch."""
         try:
-            results = []
-            for i, region in enumerate(regions):
-                print(f"Performing OCR on region {i+1}: {region}")
-                text = self.ocr_processor.perform_ocr(region)
+            print(f"Performing OCR on {len(regions)} regions: {regions}")
+            results = self.ocr_processor.perform_ocr_batch(regions, region_types)
+            for i, text in enumerate(results):
                 print(f"OCR result for region {i+1}: {text}")
-                results.append(text)
             return results
         except Exception as e:
             logging.error(f'Error in perform_ocr_on_regions(self,: {e}')
             raise
 
+    def resolve_name(self, ocr_text):
+        """Map noisy OCR text to a known player name using the scoring daemon or the local name index."""
+        try:
+            if self.scoring_client and ocr_text:
+                try:
+                    best = self.scoring_client.lookup(ocr_text)["best"]
+                    return best["user_name"] if best else ocr_text
+                except Exception as e:
+                    logger.warning(f"Scoring daemon lookup failed, using local name index: {e}")
+                    self.scoring_client = None
+                    if self.name_index is None:
+                        self.name_index = OverlayApp.load_name_index()
+            if not self.name_index or not ocr_text:
+                return ocr_text
+            match = self.name_index.best(ocr_text)
+            if match:
+                logger.debug(f"Resolved OCR text '{ocr_text}' to {match}")
+                return match.user_name
+            return ocr_text
+        except Exception as e:
+            logging.error(f'Error in resolve_name(self,: {e}')
+            return ocr_text
+
     def capture_match(self):
         """Manually capture a match by OCR on the first two regions."""
         try:
@@ -281,15 +349,48 @@ class OverlayGUI:
                 print("Not enough regions selected for match capture.")
                 return
             # Use the first two regions for user names
-            ocr_results = self.perform_ocr_on_regions(self.regions[:2])
+            ocr_results = self.perform_ocr_on_regions(self.regions[:2], ["name", "name"])
+            ocr_results = [self.resolve_name(text) for text in ocr_results]
+            self.show_battle_estimate(ocr_results)
             self.show_capture_popup(ocr_results)
         except Exception as e:
             logging.error(f'Error in capture_match(self):: {e}')
             raise
 
+    def show_battle_estimate(self, names):
+        """
+        Print the daemon's simulated duel estimate for the two captured players, if a daemon is running.
+        The request runs on a worker thread with its own connection (the GUI's client stays free for
+        name lookups) and the result is printed from the Tk thread via after().
+        """
+        if not self.scoring_client or len(names) < 2 or not all(names):
+            return
+        address, token_file = self.scoring_client.address, self.scoring_client.token_file
+
+        def request():
+            client = _scoringClient.ScoringClient.connect(address, token_file=token_file)
+            if client is None:
+                self.root.after(0, logger.warning, "Battle estimate failed: scoring daemon not reachable")
+                return
+            try:
+                estimate = client.simulate(names[0], names[1])
+                self.root.after(0, self._print_battle_estimate, names, estimate)
+            except Exception as e:
+                self.root.after(0, logger.warning, f"Battle estimate failed: {e}")
+            finally:
+                client.close()
+
+        threading.Thread(target=request, name="battle-estimate", daemon=True).start()
+
+    @staticmethod
+    def _print_battle_estimate(names, estimate):
+        print(f"Battle estimate {names[0]} vs {names[1]}: win {estimate['win_probability']:.0%}, "
+              f"loss {estimate['loss_probability']:.0%}, time to kill {estimate['time_to_kill']}s")
+
     def show_capture_popup(self, ocr_results):
         """Display a popup to confirm match details."""
         try:
+            from tkinter import ttk
             popup = tk.Toplevel(self.root)
             popup.title("Capture Match")
             popup.geometry("400x300")
@@ -362,7 +463,7 @@ class OverlayGUI:
                 self.match_checkbutton.config(text="Match Making (Waiting)")
             else:
                 # Match detected: update button to show match found
-                self.match_checkbutton.config(text=f"Match Found: {ocr_result}")
+                self.match_checkbutton.config(text=f"Match Found: {self.resolve_name(ocr_result)}")
                 # Optionally, you might stop auto detection once a match is found:
                 self.match_detector.stop()
         except Exception as e:
@@ -382,16 +483,36 @@ class OverlayApp:
     """Main application that ties together the GUI and OCR functionality."""
     def __init__(self):
         try:
+            enable_dpi_awareness()
             self.root = tk.Tk()
             self.ocr_processor = OCRProcessor()
+            # With a scoring daemon running, name lookups go to its warm index instead of loading one here
+            self.scoring_client = _scoringClient.ScoringClient.connect(timeout=5.0)
+            self.name_index = None if self.scoring_client else self.load_name_index()
             # Create GUI and pass the OCR processor; auto-match will be set up later after regions are drawn
-            self.gui = OverlayGUI(self.root, self.ocr_processor)
+            self.gui = OverlayGUI(self.root, self.ocr_processor, name_index=self.name_index,
+                                  scoring_client=self.scoring_client)
             # Optionally add a menu or button to trigger region selection:
             self.add_control_panel()
         except Exception as e:
             logging.error(f'Error in __init__(self):: {e}')
             raise
 
+    @staticmethod
+    def load_name_index():
+        """Build the offline player-name index from the saved index, usr_data and the match files."""
+        try:
+            data_dir = _scoringClient.default_data_dir()
+            name_index = _nameIndex.NameIndex.load(os.path.join(data_dir, 'name_index.gz'))
+            name_index.add_from_usr_data(os.path.join(data_dir, 'usr_data'))
+            for match_file in _nameIndex.default_match_files(data_dir):
+                name_index.add_from_match_file(match_file)
+            logger.info(f"Loaded name index with {len(name_index)} names")
+            return name_index
+        except Exception as e:
+            logger.error(f"Error loading name index: {e}")
+            return None
+
     def add_control_panel(self):
         try:
             control_panel = tk.Frame(self.root, bg='darkgray')
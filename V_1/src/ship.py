@@ -1,14 +1,21 @@
+from __future__ import annotations
 from datetime import datetime as _datetime
-from pssapi import entities as _entities
+import hashlib as _hashlib
 import json as _json
 import logging
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pssapi import entities as _entities
 
 from src import room as _Room
 from src import fileManager as _fileManager
 from src import config as _config
+from src import log_config as _log_config
+from src import hullGrid as _hullGrid
 
 # Get logger for this module
 logger = logging.getLogger('pss_companion.ship')
+room_logger = _log_config.RateLimitedLogger(logger, every=50)
 
 class lift:
     def __init__(self, _rooms: list[_Room.Room]) -> None:
@@ -59,88 +66,59 @@ class Ship:
                     self.Lifts = []
                     logger.info(f"Processing {len(_ship.rooms)} rooms")
                     
+                    debug = _log_config.debug_enabled(logger)
+                    essensal_rooms = _config.get_essential_rooms()
                     for room in _ship.rooms:
                         try:
                             design = None
                             if room.room_design_id is not None:
                                 # Try as string key first
-                                logger.debug(f"Looking up design with string key: {room.room_design_id}")
                                 design_id_str = str(room.room_design_id)
                                 if design_id_str in _room_designs:
-                                    logger.debug(f"Found design with string key: {design_id_str}")
                                     design = _room_designs[design_id_str]
-                                    logger.debug(f"Design: {design}")
+                                    if debug:
+                                        room_logger.debug("design", "Found design with string key: %s (%s)", design_id_str, design.get('room_name'))
                                 # As a fallback, try direct lookup
                                 elif room.room_design_id in _room_designs:
                                     design = _room_designs[room.room_design_id]
-                                    logger.debug(f"Found design with direct key: {room.room_design_id}")
+                                    if debug:
+                                        logger.debug("Found design with direct key: %s", room.room_design_id)
                                 # Try nested lookup if designs are in "Designs" subkey
                                 elif "Designs" in _room_designs and design_id_str in _room_designs["Designs"]:
                                     design = _room_designs["Designs"][design_id_str]
-                                    logger.debug(f"Found design with nested key: {design_id_str}")
+                                    if debug:
+                                        logger.debug("Found design with nested key: %s", design_id_str)
 
                             if design is None:
-                                logger.warning(f"Design not found for Room Design ID: {room.room_design_id}")
+                                logger.warning("Design not found for Room Design ID: %s", room.room_design_id)
                             else:
-                                logger.debug(f"Initializing Room with ID: {room.id}, Design ID: {room.room_design_id}")
-
-                                essensal_rooms = _config.get_essential_rooms()
-
                                 self.shipRooms.append(_Room.Room(_essensal_rooms=essensal_rooms, _room=room, _design=design))
                                 if self.shipRooms[-1].getType() == "Wall":
                                     self.ArmorRooms.append(self.shipRooms[-1])
-                                    logger.debug(f"Added armor room with ID: {room.id}")
+                                    if debug:
+                                        room_logger.debug("armor", "Added armor room with ID: %s", room.id)
                                 if self.shipRooms[-1].getType() == "Lift":
                                     self.LiftRooms.append(self.shipRooms[-1])
-                                    logger.debug(f"Added lift room with ID: {room.id}")
+                                    if debug:
+                                        room_logger.debug("lift", "Added lift room with ID: %s", room.id)
                         except Exception as e:
                             logger.error(f"Error processing room {room.id}: {e}")
                     
                     logger.info(f"Ship Level: {_ship_design.get('ship_level', None)}")
                     self.shipArmorValue = _config.get_armor_value(_ship.ship_level)
                     logger.info(f"Ship armor value per block: {self.shipArmorValue}")
+                    self.hull = _hullGrid.get_hull(_ship_design)
 
                     logger.info(f"Setting armor for adjacent rooms. Armor rooms: {len(self.ArmorRooms)}")
                     for armor in self.ArmorRooms:
                         adjacent_rooms = self.getAjacentRooms(armor)
-                        logger.debug(f"Armor room {armor.id} has {len(adjacent_rooms)} adjacent rooms")
+                        if debug:
+                            room_logger.debug("adjacent", "Armor room %s has %d adjacent rooms", armor.id, len(adjacent_rooms))
                         for room in adjacent_rooms:
                             room.setArmor(armor)
 
 
-                    # Group lift rooms into vertical lift objects
-                    try:
-                        logger.info(f"Compiling {len(self.LiftRooms)} lifts into lift objects")
-                        
-                        # Group lift rooms by their X position
-                        lifts_by_x = {}
-                        for room in self.LiftRooms:
-                            # Get room position from the room object
-                            room_x = room.x
-                            room_y = room.y
-                            
-                            # Group by X coordinate (horizontal position)
-                            if room_x not in lifts_by_x:
-                                lifts_by_x[room_x] = []
-                            lifts_by_x[room_x].append(room)
-                            logger.debug(f"Adding lift room {room.id} at position ({room_x}, {room_y}) to group")
-                        
-                        # Create lift objects for each vertical column of lifts
-                        self.Lifts = []
-                        for x_pos, rooms in lifts_by_x.items():
-                            # Sort rooms by Y position (top to bottom)
-                            rooms.sort(key=lambda r: r.y)
-                            
-                            # Create a new lift object with these vertically aligned rooms
-                            self.Lifts.append(lift(rooms))
-                            logger.debug(f"Created lift at x={x_pos} with {len(rooms)} rooms: {[r.id for r in rooms]}")
-                        
-                        logger.info(f"Created {len(self.Lifts)} lift objects")
-                    except Exception as e:
-                        logger.error(f"Error creating lift objects: {e}")
-                        import traceback
-                        logger.debug(traceback.format_exc())
-                    
+                    self.Lifts = self.group_lifts(self.LiftRooms)
 
                     self.ship = {
                         #"""PER DATE"""#
@@ -160,24 +138,88 @@ class Ship:
                     raise
             else:
                 self.shipRooms = []
+                self.hull = None
                 self.ship = None
                 logger.warning("Ship initialization failed - missing required parameters")
         except Exception as e:
             logging.error(f'Error in __init__(self,: {e}')
             raise
 
+    @staticmethod
+    def group_lifts(lift_rooms: list[_Room.Room]) -> list[lift]:
+        """Group lift rooms into vertical lift objects, one per column, rooms sorted top to bottom"""
+        try:
+            logger.info(f"Compiling {len(lift_rooms)} lifts into lift objects")
+            debug = _log_config.debug_enabled(logger)
+
+            # Group lift rooms by their X position
+            lifts_by_x = {}
+            for room in lift_rooms:
+                lifts_by_x.setdefault(room.x, []).append(room)
+                if debug:
+                    logger.debug("Adding lift room %s at position (%s, %s) to group", room.id, room.x, room.y)
+
+            # Create lift objects for each vertical column of lifts
+            lifts = []
+            for x_pos, rooms in lifts_by_x.items():
+                rooms.sort(key=lambda r: r.y)
+                lifts.append(lift(rooms))
+                if debug:
+                    logger.debug("Created lift at x=%s with %d rooms: %s", x_pos, len(rooms), [r.id for r in rooms])
+
+            logger.info(f"Created {len(lifts)} lift objects")
+            return lifts
+        except Exception as e:
+            logger.error(f"Error creating lift objects: {e}")
+            import traceback
+            logger.debug(traceback.format_exc())
+            return []
+
     def getAjacentRooms(self, _room: _Room.Room) -> list[_Room.Room]:
         try:
             ajacentRooms = []
+            debug = _log_config.debug_enabled(logger)
             for room in self.shipRooms:
                 if room.isAjacent(_room):
                     ajacentRooms.append(room)
-                    logger.debug(f"Room {room.short_name} ({room.id}) is adjacent to {_room.short_name} ({_room.id})")
+                    if debug:
+                        room_logger.debug("is_adjacent", "Room %s (%s) is adjacent to %s (%s)", room.short_name, room.id, _room.short_name, _room.id)
             return ajacentRooms
         except Exception as e:
             logger.error(f"Error finding adjacent rooms: {e}")
             return []
 
+    def free_cells(self, edges_only: bool = False) -> list[tuple[int, int]]:
+        """
+        (x, y) of hull cells no room covers; edges_only keeps those on the outer edge of the hull.
+        Raises ValueError if the hull is unknown (no design mask, or from_dict() without ship_designs).
+        """
+        if self.hull is None:
+            raise ValueError("Hull unknown: the ship has no design mask (pass ship_designs to from_dict)")
+        bits = self.hull.free_edges(self.shipRooms) if edges_only else self.hull.free(self.shipRooms)
+        return self.hull.coordinates(bits)
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        Stable hash of the ship layout: room design ids, coordinates and armor.
+        Two snapshots with the same fingerprint score identically under the same rules.
+        """
+        try:
+            return self.layout_fingerprint([room.to_dict() for room in self.shipRooms])
+        except Exception as e:
+            logging.error(f'Error in fingerprint(self): {e}')
+            raise
+
+    @staticmethod
+    def layout_fingerprint(room_dicts: list[dict]) -> str:
+        """Fingerprint a list of room dicts (as stored in ship_rooms) without building Room objects."""
+        parts = sorted(
+            (room["room_design_id"], room["room_cords"][0], room["room_cords"][1], room.get("room_armor", 0))
+            for room in room_dicts if room
+        )
+        return _hashlib.sha1(";".join("%s,%s,%s,%s" % part for part in parts).encode("ascii")).hexdigest()
+
     def to_dict(self) -> dict:
         try:
             return self.ship
@@ -185,10 +227,23 @@ class Ship:
             logging.error(f'Error in to_dict(self): {e}')
             raise
 
-    def from_dict(self, _ship: dict) -> None:
+    def from_dict(self, _ship: dict, ship_designs: dict = None) -> None:
+        """
+        Load a ship dict as stored in usr_data, rebuilding its lifts and armor value. With ship_designs
+        (keyed by design id, as from designs.get_all_designs) the hull is rebuilt from the ship's ship_design_id.
+        """
         try:
             self.ship = _ship
             self.shipRooms = []
+            self.ArmorRooms = []
+            self.LiftRooms = []
+            self.shipArmorValue = _ship.get("ship_armor_value")
+            self.hull = None
+            if ship_designs:
+                design = ship_designs.get(str(_ship.get("ship_design_id")))
+                if design is None:
+                    logger.warning(f"Ship design {_ship.get('ship_design_id')} not found, hull unknown")
+                self.hull = _hullGrid.get_hull(design)
             logger.info(f"Loading ship from dict with {len(_ship.get('ship_rooms', []))} rooms")
             
             for room_dict in _ship.get("ship_rooms", []):
@@ -196,8 +251,13 @@ class Ship:
                     room = _Room.Room()
                     room.from_dict(room_dict)
                     self.shipRooms.append(room)
+                    if room.getType() == "Wall":
+                        self.ArmorRooms.append(room)
+                    elif room.getType() == "Lift":
+                        self.LiftRooms.append(room)
                 except Exception as e:
                     logger.error(f"Error loading room from dict: {e}")
+            self.Lifts = self.group_lifts(self.LiftRooms)
         except Exception as e:
             logger.error(f"Error loading ship from dict: {e}")
             raise
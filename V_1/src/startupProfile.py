@@ -0,0 +1,127 @@
+import logging
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+from typing import Dict, List, Optional
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.startupProfile')
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Dependencies that only specific features need
+HEAVY_MODULES = ("pandas", "sklearn", "numpy", "tkinter", "PIL", "pytesseract", "tesserocr", "mss", "pssapi", "aiohttp")
+
+# Import-time budget per entry point. budget_ms is the import time added on top of a bare
+# interpreter (measured with -X importtime); forbidden modules must not be imported at all,
+# which catches regressions independently of machine speed.
+ENTRY_POINTS = {
+    "run": {"module": "run", "budget_ms": 250,
+            "forbidden": ["pandas", "sklearn", "numpy", "tkinter", "PIL", "pytesseract", "tesserocr", "mss", "pssapi"]},
+    "overlay": {"module": "src.screenReader", "budget_ms": 100,
+                "forbidden": ["pandas", "sklearn", "numpy", "tkinter", "pytesseract", "tesserocr", "mss", "pssapi"]},
+    "scoring_client": {"module": "src.scoringClient", "budget_ms": 50,
+                       "forbidden": list(HEAVY_MODULES)},
+    "matches": {"module": "matches", "budget_ms": 50,
+                "forbidden": list(HEAVY_MODULES)},
+    "agent": {"module": "src.agent", "budget_ms": 50,
+              "forbidden": list(HEAVY_MODULES)},
+}
+
+def profile_import(module: str, python: str = None) -> Dict[str, dict]:
+    """
+    Import module in a fresh interpreter with -X importtime, run from an empty temporary
+    directory so anything written relative to the working directory at import time is discarded.
+    :return: {module name: {"self_us", "cumulative_us", "depth"}} for every module imported
+    """
+    code = f"import {module}" if module else "pass"
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [_ROOT, os.environ.get("PYTHONPATH")])))
+    with tempfile.TemporaryDirectory(prefix="startup_profile_") as cwd:
+        proc = subprocess.run([python or sys.executable, "-X", "importtime", "-c", code],
+                              cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed: {proc.stderr.strip().splitlines()[-1:]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        stripped = name.lstrip()
+        modules[stripped] = {
+            "self_us": int(parts[0]),
+            "cumulative_us": int(parts[1]),
+            "depth": (len(name) - len(stripped)) // 2,
+        }
+    return modules
+
+def measure(entry: str, python: str = None, repeats: int = 3, baseline: Dict[str, dict] = None) -> dict:
+    """Profile one entry point (best of repeats) and report its import cost over a bare interpreter."""
+    spec = ENTRY_POINTS[entry]
+    baseline = baseline if baseline is not None else profile_import(None, python)
+    best = None
+    for _ in range(max(1, repeats)):
+        started = time.perf_counter()
+        modules = profile_import(spec["module"], python)
+        wall = time.perf_counter() - started
+        added = {name: info for name, info in modules.items() if name not in baseline}
+        total_ms = sum(info["self_us"] for info in added.values()) / 1000
+        if best is None or total_ms < best["import_ms"]:
+            best = {"entry": entry, "module": spec["module"], "import_ms": total_ms, "wall_ms": wall * 1000,
+                    "modules": added}
+    heavy = sorted({name.split('.')[0] for name in best["modules"] if name.split('.')[0] in HEAVY_MODULES})
+    best["heavy"] = heavy
+    best["forbidden"] = [name for name in heavy if name in spec["forbidden"]]
+    best["budget_ms"] = spec["budget_ms"]
+    best["over_budget"] = best["import_ms"] > spec["budget_ms"]
+    best["top"] = sorted(((info["cumulative_us"] / 1000, name) for name, info in best["modules"].items()
+                          if info["depth"] == 1), reverse=True)[:10]
+    return best
+
+def check(entries: List[str] = None, python: str = None, repeats: int = 3, budgets: Dict[str, float] = None) -> List[dict]:
+    """Measure entry points, applying any budget overrides (ms). Returns the measurements."""
+    for entry, budget in (budgets or {}).items():
+        if entry in ENTRY_POINTS:
+            ENTRY_POINTS[entry]["budget_ms"] = budget
+    baseline = profile_import(None, python)
+    return [measure(entry, python, repeats, baseline) for entry in (entries or list(ENTRY_POINTS))]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Import-time profile and budget check for entry points")
+    parser.add_argument("entries", nargs="*", help=f"Entry points to check (default: all of {', '.join(ENTRY_POINTS)})")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget-file", help="JSON object of entry point -> budget in ms")
+    parser.add_argument("--json", action="store_true", help="Print measurements as JSON")
+    args = parser.parse_args(argv)
+
+    budgets = None
+    if args.budget_file:
+        with open(args.budget_file, 'r', encoding='utf-8') as f:
+            budgets = json.load(f)
+
+    failed = False
+    results = check(args.entries, repeats=args.repeats, budgets=budgets)
+    for result in results:
+        ok = not result["over_budget"] and not result["forbidden"]
+        failed = failed or not ok
+        if args.json:
+            continue
+        print(f"{'OK  ' if ok else 'FAIL'} {result['entry']:<15} {result['import_ms']:7.1f} ms "
+              f"(budget {result['budget_ms']} ms, {len(result['modules'])} modules)")
+        if result["forbidden"]:
+            print(f"     imports {', '.join(result['forbidden'])} at startup")
+        for cumulative_ms, name in result["top"][:5]:
+            print(f"     {cumulative_ms:7.1f} ms  {name}")
+    if args.json:
+        print(json.dumps([{k: v for k, v in r.items() if k != "modules"} for r in results], indent=2))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,523 @@
+import logging
+import os
+import json
+import glob
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator
+
+# Get logger for this module
+logger = logging.getLogger('pss_companion.storage')
+
+# Collections understood by StorageBackend.upload / download
+COLLECTIONS = ('users', 'snapshots', 'matches', 'designs')
+
+class StorageBackend(ABC):
+    """
+    Interface for persisting users, dated ship snapshots, matches and designs.
+    User dicts use the same layout as User.to_dict():
+        {"user_id": int, "user_name": str, "dated_data": [{"date", "highest_trophy", "user_ship"}, ...]}
+    Match dicts use the layout of Match.to_dict(), with an optional "date".
+    """
+
+    def save_user(self, user: Dict[str, Any]) -> None:
+        """Store a user and append any snapshots not already stored."""
+        self.save_users([user])
+
+    @abstractmethod
+    def save_users(self, users: List[Dict[str, Any]]) -> None:
+        """Store users and append any snapshots not already stored."""
+
+    @abstractmethod
+    def load_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """A user dict with its full history, or None."""
+
+    @abstractmethod
+    def list_user_ids(self) -> List[int]:
+        """Ids of every stored user."""
+
+    def latest_snapshot(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Most recent dated_data entry for a user, or None."""
+        user = self.load_user(user_id)
+        if not user or not user.get("dated_data"):
+            return None
+        return max(user["dated_data"], key=lambda entry: entry["date"])
+
+    def snapshots_between(self, user_id: int, start: datetime = None, end: datetime = None) -> List[Dict[str, Any]]:
+        """dated_data entries for a user with start <= date <= end, oldest first."""
+        user = self.load_user(user_id)
+        if not user:
+            return []
+        start_str = start.isoformat() if start else None
+        end_str = end.isoformat() if end else None
+        return sorted(
+            (entry for entry in user.get("dated_data", [])
+             if (start_str is None or entry["date"] >= start_str) and (end_str is None or entry["date"] <= end_str)),
+            key=lambda entry: entry["date"],
+        )
+
+    @abstractmethod
+    def save_matches(self, matches: List[Dict[str, Any]]) -> None:
+        """Store match dicts; matches already stored (same users, outcome and date) are skipped."""
+
+    @abstractmethod
+    def load_matches(self, user_id: int = None) -> List[Dict[str, Any]]:
+        """All match dicts, or those user_id played in."""
+
+    @abstractmethod
+    def save_designs(self, kind: str, designs: Dict[str, Any]) -> None:
+        """Replace the stored designs of a kind ('room', 'ship', ...)."""
+
+    @abstractmethod
+    def load_designs(self, kind: str) -> Dict[str, Any]:
+        """Designs of a kind keyed by design id (empty if none are stored)."""
+
+    @abstractmethod
+    def design_kinds(self) -> List[str]:
+        """Kinds of designs stored."""
+
+    def close(self) -> None:
+        pass
+
+    def upload(self, data: Any, collection: str) -> bool:
+        """
+        Generic write used by FileManager.upload_to_db.
+
+        Args:
+            data: A user dict or list of user dicts ('users'/'snapshots'), a list of match dicts
+                  ('matches') or {"kind": str, "designs": dict} ('designs')
+            collection: One of COLLECTIONS
+        """
+        if collection in ('users', 'snapshots'):
+            self.save_users(data if isinstance(data, list) else [data])
+        elif collection == 'matches':
+            self.save_matches(data if isinstance(data, list) else [data])
+        elif collection == 'designs':
+            self.save_designs(data["kind"], data["designs"])
+        else:
+            raise ValueError(f"Unknown collection: {collection}")
+        return True
+
+    def download(self, query: Dict, collection: str) -> Any:
+        """
+        Generic read used by FileManager.download_from_db.
+
+        Args:
+            query: users: {"user_id"}; snapshots: {"user_id", "latest": bool} or {"user_id", "start", "end"};
+                   matches: {"user_id"} (optional); designs: {"kind"}
+            collection: One of COLLECTIONS
+        """
+        query = query or {}
+        if collection == 'users':
+            if "user_id" in query:
+                return self.load_user(query["user_id"])
+            return self.list_user_ids()
+        if collection == 'snapshots':
+            if query.get("latest"):
+                return self.latest_snapshot(query["user_id"])
+            return self.snapshots_between(query["user_id"], query.get("start"), query.get("end"))
+        if collection == 'matches':
+            return self.load_matches(query.get("user_id"))
+        if collection == 'designs':
+            return self.load_designs(query["kind"])
+        raise ValueError(f"Unknown collection: {collection}")
+
+
+def _match_key(match: Dict[str, Any]) -> tuple:
+    return (match.get("user1_id"), match.get("user2_id"), match.get("outcome"), match.get("date"))
+
+def new_matches(stored: List[Dict[str, Any]], matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    The matches not already in stored. Matches are compared by users, outcome and date and
+    counted, so saving the same list twice adds nothing while genuine repeats (e.g. undated
+    rematches with the same result) are kept.
+    """
+    counts = {}
+    for match in stored:
+        key = _match_key(match)
+        counts[key] = counts.get(key, 0) + 1
+    result = []
+    for match in matches:
+        key = _match_key(match)
+        if counts.get(key):
+            counts[key] -= 1
+        else:
+            result.append(match)
+    return result
+
+
+class FileStorageBackend(StorageBackend):
+    """
+    The existing on-disk layout, accessed through a FileManager:
+    - usr_data/{user_name}_{user_id}.gz   gzip JSON user history
+    - match_data/match_data.gz            gzip JSON {"matches": [...]}
+    - designs/{kind}_designs.json         JSON design dicts
+    """
+
+    def __init__(self, file_manager) -> None:
+        self.file_manager = file_manager
+
+    def _user_path(self, user_id: int) -> Optional[str]:
+        matches = glob.glob(os.path.join(self.file_manager.base_dir, 'usr_data', f"*_{user_id}.gz"))
+        return matches[0] if matches else None
+
+    def save_users(self, users: List[Dict[str, Any]]) -> None:
+        for user in users:
+            existing = self._user_path(user["user_id"])
+            filepath = existing or f"usr_data/{user['user_name']}_{user['user_id']}.gz"
+            previous = self.file_manager.load_gzip_json(filepath=filepath) if existing else None
+            if previous:
+                known_dates = {entry["date"] for entry in previous.get("dated_data", [])}
+                previous["dated_data"].extend(entry for entry in user.get("dated_data", []) if entry["date"] not in known_dates)
+                previous["user_name"] = user.get("user_name", previous.get("user_name"))
+            else:
+                previous = user
+            self.file_manager.save_gzip_json(data=previous, filepath=filepath)
+
+    def load_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        filepath = self._user_path(user_id)
+        return self.file_manager.load_gzip_json(filepath=filepath) if filepath else None
+
+    def list_user_ids(self) -> List[int]:
+        user_ids = []
+        for filepath in glob.glob(os.path.join(self.file_manager.base_dir, 'usr_data', "*.gz")):
+            try:
+                user_ids.append(int(os.path.basename(filepath)[:-3].rsplit('_', 1)[1]))
+            except (IndexError, ValueError):
+                logger.warning(f"Skipping unrecognised user file: {filepath}")
+        return user_ids
+
+    def save_matches(self, matches: List[Dict[str, Any]]) -> None:
+        filepath = 'match_data/match_data.gz'
+        data = self.file_manager.load_gzip_json(filepath=filepath, default=None) or {"matches": []}
+        data["matches"].extend(new_matches(data["matches"], matches))
+        self.file_manager.save_gzip_json(data=data, filepath=filepath)
+
+    def load_matches(self, user_id: int = None) -> List[Dict[str, Any]]:
+        data = self.file_manager.load_gzip_json(filepath='match_data/match_data.gz', default=None) or {"matches": []}
+        if user_id is None:
+            return data["matches"]
+        return [match for match in data["matches"] if user_id in (match.get("user1_id"), match.get("user2_id"))]
+
+    def save_designs(self, kind: str, designs: Dict[str, Any]) -> None:
+        self.file_manager.save_json(data=designs, filepath=f"designs/{kind}_designs.json")
+
+    def load_designs(self, kind: str) -> Dict[str, Any]:
+        return self.file_manager.load_json(filepath=f"designs/{kind}_designs.json", default={})
+
+    def design_kinds(self) -> List[str]:
+        return sorted(os.path.basename(filepath)[:-len("_designs.json")]
+                      for filepath in glob.glob(os.path.join(self.file_manager.base_dir, 'designs', "*_designs.json")))
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id    INTEGER PRIMARY KEY,
+    user_name  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_name ON users(user_name);
+
+CREATE TABLE IF NOT EXISTS snapshots (
+    id              INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id         INTEGER NOT NULL REFERENCES users(user_id),
+    date            TEXT NOT NULL,
+    highest_trophy  INTEGER,
+    ship_design_id  INTEGER,
+    user_ship       TEXT,
+    UNIQUE(user_id, date)
+);
+CREATE INDEX IF NOT EXISTS idx_snapshots_user_date ON snapshots(user_id, date);
+
+CREATE TABLE IF NOT EXISTS matches (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    user1_id    INTEGER,
+    user1_name  TEXT,
+    user2_id    INTEGER,
+    user2_name  TEXT,
+    outcome     INTEGER,
+    date        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_matches_user1 ON matches(user1_id);
+CREATE INDEX IF NOT EXISTS idx_matches_key ON matches(user1_id, user2_id, outcome, date);
+CREATE INDEX IF NOT EXISTS idx_matches_user2 ON matches(user2_id);
+
+CREATE TABLE IF NOT EXISTS designs (
+    kind       TEXT NOT NULL,
+    design_id  TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    PRIMARY KEY(kind, design_id)
+);
+"""
+
+class SQLiteStorageBackend(StorageBackend):
+    """
+    Indexed SQLite storage for users, snapshots, matches and designs.
+    - Writes are batched with executemany inside a single transaction
+    - Use `with backend.transaction():` to group several saves into one commit
+    - Latest-snapshot and date-range queries use the (user_id, date) index
+    """
+
+    def __init__(self, db_path: str) -> None:
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        logger.info(f"SQLite storage opened at {db_path}")
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Group writes into one transaction; nested calls join the outer one."""
+        with self._lock:
+            self._depth += 1
+            try:
+                yield self._conn
+                if self._depth == 1:
+                    self._conn.commit()
+            except Exception:
+                if self._depth == 1:
+                    self._conn.rollback()
+                raise
+            finally:
+                self._depth -= 1
+
+    def save_users(self, users: List[Dict[str, Any]]) -> None:
+        user_rows = []
+        snapshot_rows = []
+        for user in users:
+            user_rows.append((user["user_id"], user.get("user_name")))
+            for entry in user.get("dated_data", []):
+                ship = entry.get("user_ship") or {}
+                snapshot_rows.append((
+                    user["user_id"], entry["date"], entry.get("highest_trophy"),
+                    ship.get("ship_design_id"), json.dumps(ship),
+                ))
+        with self.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO users (user_id, user_name) VALUES (?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET user_name = excluded.user_name",
+                user_rows,
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO snapshots (user_id, date, highest_trophy, ship_design_id, user_ship) "
+                "VALUES (?, ?, ?, ?, ?)",
+                snapshot_rows,
+            )
+        logger.debug(f"Saved {len(user_rows)} users with {len(snapshot_rows)} snapshots")
+
+    @staticmethod
+    def _snapshot_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        return {
+            "date": row["date"],
+            "highest_trophy": row["highest_trophy"],
+            "user_ship": json.loads(row["user_ship"]) if row["user_ship"] else None,
+        }
+
+    def load_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            user = self._conn.execute("SELECT user_id, user_name FROM users WHERE user_id = ?", (user_id,)).fetchone()
+            if not user:
+                return None
+            rows = self._conn.execute(
+                "SELECT date, highest_trophy, user_ship FROM snapshots WHERE user_id = ? ORDER BY date", (user_id,)
+            ).fetchall()
+        return {
+            "user_id": user["user_id"],
+            "user_name": user["user_name"],
+            "dated_data": [self._snapshot_from_row(row) for row in rows],
+        }
+
+    def find_users_by_name(self, user_name: str) -> List[Dict[str, Any]]:
+        """Users with an exact name match (id and name only)."""
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, user_name FROM users WHERE user_name = ?", (user_name,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def list_user_ids(self) -> List[int]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT user_id FROM users ORDER BY user_id")]
+
+    def latest_snapshot(self, user_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT date, highest_trophy, user_ship FROM snapshots WHERE user_id = ? ORDER BY date DESC LIMIT 1",
+                (user_id,),
+            ).fetchone()
+        return self._snapshot_from_row(row) if row else None
+
+    def latest_snapshots(self, user_ids: List[int] = None) -> Dict[int, Dict[str, Any]]:
+        """Latest snapshot for each user (all users if user_ids is None) in one query."""
+        query = (
+            "SELECT s.user_id, s.date, s.highest_trophy, s.user_ship FROM snapshots s "
+            "JOIN (SELECT user_id, MAX(date) AS date FROM snapshots GROUP BY user_id) latest "
+            "ON s.user_id = latest.user_id AND s.date = latest.date"
+        )
+        params = []
+        if user_ids is not None:
+            query += f" WHERE s.user_id IN ({','.join('?' * len(user_ids))})"
+            params = list(user_ids)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return {row["user_id"]: self._snapshot_from_row(row) for row in rows}
+
+    def snapshots_between(self, user_id: int, start: datetime = None, end: datetime = None) -> List[Dict[str, Any]]:
+        query = "SELECT date, highest_trophy, user_ship FROM snapshots WHERE user_id = ?"
+        params = [user_id]
+        if start:
+            query += " AND date >= ?"
+            params.append(start.isoformat())
+        if end:
+            query += " AND date <= ?"
+            params.append(end.isoformat())
+        query += " ORDER BY date"
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [self._snapshot_from_row(row) for row in rows]
+
+    def save_matches(self, matches: List[Dict[str, Any]]) -> None:
+        with self.transaction() as conn:
+            # Compare against the stored matches between the same players only
+            pairs = {(match.get("user1_id"), match.get("user2_id")) for match in matches}
+            stored = []
+            for user1_id, user2_id in pairs:
+                stored.extend(dict(row) for row in conn.execute(
+                    "SELECT user1_id, user2_id, outcome, date FROM matches WHERE user1_id IS ? AND user2_id IS ?",
+                    (user1_id, user2_id)))
+            rows = [
+                (match.get("user1_id"), match.get("user1_name"), match.get("user2_id"), match.get("user2_name"),
+                 match.get("outcome"), match.get("date"))
+                for match in new_matches(stored, matches)
+            ]
+            conn.executemany(
+                "INSERT INTO matches (user1_id, user1_name, user2_id, user2_name, outcome, date) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def load_matches(self, user_id: int = None) -> List[Dict[str, Any]]:
+        query = "SELECT user1_id, user1_name, user2_id, user2_name, outcome, date FROM matches"
+        params = []
+        if user_id is not None:
+            query += " WHERE user1_id = ? UNION ALL " + query + " WHERE user2_id = ? AND user1_id != ?"
+            params = [user_id, user_id, user_id]
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        matches = []
+        for row in rows:
+            match = dict(row)
+            if match["date"] is None:
+                del match["date"]
+            matches.append(match)
+        return matches
+
+    def save_designs(self, kind: str, designs: Dict[str, Any]) -> None:
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM designs WHERE kind = ?", (kind,))
+            conn.executemany(
+                "INSERT INTO designs (kind, design_id, data) VALUES (?, ?, ?)",
+                [(kind, str(design_id), json.dumps(design)) for design_id, design in designs.items()],
+            )
+
+    def load_designs(self, kind: str) -> Dict[str, Any]:
+        with self._lock:
+            rows = self._conn.execute("SELECT design_id, data FROM designs WHERE kind = ?", (kind,)).fetchall()
+        return {row["design_id"]: json.loads(row["data"]) for row in rows}
+
+    def design_kinds(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT kind FROM designs ORDER BY kind")]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
+
+
+def migrate(source: StorageBackend, dest: StorageBackend, batch_size: int = 500) -> int:
+    """
+    Copy every user (with history), all matches and all designs from one backend to another.
+    Safe to run again: snapshots and matches already in dest are skipped and designs replaced.
+
+    Args:
+        source: Backend to read from (e.g. FileStorageBackend)
+        dest: Backend to write to (e.g. SQLiteStorageBackend)
+        batch_size: Number of users written per transaction
+
+    Returns:
+        Number of users copied
+    """
+    count = 0
+    batch = []
+    for user_id in source.list_user_ids():
+        user = source.load_user(user_id)
+        if user:
+            batch.append(user)
+        if len(batch) >= batch_size:
+            dest.save_users(batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        dest.save_users(batch)
+        count += len(batch)
+    matches = source.load_matches()
+    if matches:
+        dest.save_matches(matches)
+    kinds = source.design_kinds()
+    for kind in kinds:
+        dest.save_designs(kind, source.load_designs(kind))
+    logger.info(f"Migrated {count} users, {len(matches)} matches and {len(kinds)} design kinds")
+    return count
+
+def create_backend(file_manager) -> StorageBackend:
+    """
+    Storage backend selected in custom_data.json:
+        "storage_backend": "file" (default) or "sqlite"
+        "sqlite_path": database path, relative to the FileManager base directory (default pss.db)
+    The gzip/JSON files stay the copy the app reads. With "sqlite", new snapshots, matches and
+    designs are also written to the database (FileManager.mirror_to_db); run `python -m src.storage`
+    once to copy the history recorded before that.
+    """
+    from src import config as _config
+    name = str(_config.get_setting("storage_backend", "file") or "file").lower()
+    if name == "sqlite":
+        db_path = _config.get_setting("sqlite_path", "pss.db")
+        if not os.path.isabs(db_path):
+            db_path = os.path.join(file_manager.base_dir, db_path)
+        try:
+            return SQLiteStorageBackend(db_path)
+        except Exception as e:
+            logger.error(f"Error opening SQLite storage at {db_path}, using files instead: {e}")
+    elif name != "file":
+        logger.warning(f"Unknown storage backend '{name}', using files")
+    return FileStorageBackend(file_manager)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    parser = argparse.ArgumentParser(description="Copy the file-based data into a SQLite database")
+    parser.add_argument("--base-dir", default=os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'data'),
+                        help="Data directory of the file backend")
+    parser.add_argument("--db", help="SQLite database (default: pss.db in the data directory)")
+    args = parser.parse_args(argv)
+
+    from src import fileManager as _fileManager
+    file_manager = _fileManager.FileManager(base_dir=args.base_dir, auto_cleanup=False)
+    dest = SQLiteStorageBackend(args.db or os.path.join(args.base_dir, 'pss.db'))
+    try:
+        print(f"Migrated {migrate(FileStorageBackend(file_manager), dest)} users")
+    finally:
+        dest.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,19 @@
+from __future__ import annotations
 import asyncio as _asyncio
 import json as _json
 import os as _os
 import gzip as _gzip
 import logging
 from datetime import datetime as _datetime, timedelta as _timedelta
-from pssapi import entities as _entities
+from typing import TYPE_CHECKING
+if TYPE_CHECKING:
+    from pssapi import entities as _entities
 
 from src import ship as _Ship
 from src import room as _Room
 from src import apiInterface as _apiInterface
 from src import fileManager as _fileManager
+from src import log_config as _log_config
 
 # Get logger for this module
 logger = logging.getLogger('pss_companion.user')
@@ -143,7 +147,7 @@ class User:
                     if previous_data:
                         logger.info("Successfully loaded previous data")
                         logger.info("Checking if data should be appended")
-                        logger.debug(f"Previous data: {previous_data}")
+                        logger.debug("Previous data: %s", _log_config.lazy(lambda: f"{len(previous_data['dated_data'])} dated entries for user {previous_data.get('user_id')}"))
                         previous_dates = [data["date"] for data in previous_data["dated_data"]]
                         most_recent_date = max(previous_dates)
                         most_recent_datetime = _datetime.fromisoformat(most_recent_date)
@@ -154,7 +158,8 @@ class User:
                             return
                     elif previous_data is None:
                         logger.info("No previous data found: Creating new data structure")
-                        previous_data = self.to_dict()
+                        # to_dict() already holds the current entry; start from a copy without it
+                        previous_data = dict(self.to_dict(), dated_data=[])
                     else:
                         raise ValueError("Error loading previous data")
                     
@@ -162,6 +167,7 @@ class User:
                     logger.info("Appended new data to existing file")
 
                     logger.info(f"Saving user data to {_fileManager.save_gzip_json(data=previous_data, filepath=file_path)}")
+                    _fileManager.mirror_to_db({"user_id": self.user_id, "user_name": self.user_name, "dated_data": [new_data]}, 'snapshots')
             else:
                 raise ValueError("No file manager provided")         
         except Exception as e:
@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+from xml.etree import ElementTree
+
+import pytest
+
+from src import apiCache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Reads the given keys from a cache file in a new interpreter, as a restarted app would
+_READ_KEYS = """
+import json, sys
+from src import apiCache
+cache = apiCache.ResponseCache(sys.argv[1])
+missing = object()
+values = {}
+for key in sys.argv[2:]:
+    value = cache.get(key, missing)
+    values[key] = "<missing>" if value is missing else value
+print(json.dumps(values))
+"""
+
+def read_in_fresh_process(path, *keys):
+    result = subprocess.run([sys.executable, "-c", _READ_KEYS, path, *keys], cwd=ROOT,
+                            env=dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get("PYTHONPATH")]))),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def parsed_user(xml):
+    """A pssapi User built the way pssapi builds one from a response"""
+    entities = pytest.importorskip("pssapi.entities")
+
+    def info(node):
+        result = node.attrib
+        for child in node:
+            result.setdefault(child.tag, []).append(info(child))
+        return result
+
+    node = ElementTree.fromstring(xml)
+    user = entities.User(info(node))
+    user.node = node
+    return user
+
+def test_plain_values_survive_a_restart(tmp_path):
+    path = str(tmp_path / "api_cache.db")
+    cache = apiCache.ResponseCache(path)
+    cache.set("token:device", "access-token", 60)
+    cache.set("search_users:nobody", [], 60)
+    cache.close()
+
+    values = read_in_fresh_process(path, "token:device", "search_users:nobody")
+    assert values == {"token:device": "access-token", "search_users:nobody": []}
+
+def test_entities_are_not_restored_without_their_fields(tmp_path):
+    user = parsed_user('<User Id="5" Name="C3R3S1" HighestTrophy="4000" />')
+    assert (user.id, user.name, user.highest_trophy) == (5, "C3R3S1", 4000)
+    assert apiCache.encode_value([user]) is None
+
+    path = str(tmp_path / "api_cache.db")
+    cache = apiCache.ResponseCache(path)
+    cache.set("search_users:C3R3S1", [], 60)
+    cache.set("search_users:C3R3S1", [user], 60)
+    assert cache.get("search_users:C3R3S1")[0].name == "C3R3S1"
+    cache.close()
+
+    # A restarted app asks the API again instead of getting a User with no id or name
+    assert read_in_fresh_process(path, "search_users:C3R3S1") == {"search_users:C3R3S1": "<missing>"}
+
+def test_entities_persisted_by_earlier_versions_are_dropped(tmp_path):
+    path = str(tmp_path / "api_cache.db")
+    cache = apiCache.ResponseCache(path)
+    cache._conn.execute("INSERT INTO responses (key, expires_at, value) VALUES (?, ?, ?)",
+                        ("search_users:C3R3S1", 2 ** 40, json.dumps({"list": [{"entity": "User", "xml": "<User />"}]})))
+    cache._conn.commit()
+    assert cache.get("search_users:C3R3S1", "<missing>") == "<missing>"
+    cache.close()
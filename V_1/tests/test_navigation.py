@@ -0,0 +1,25 @@
+from src import navigation
+
+def layout(first_id):
+    """Bedroom, storage and shield side by side on one deck, with room ids from first_id"""
+    rooms = [("Bedroom", 0, 2), ("Storage", 2, 3), ("Shield", 5, 2)]
+    return [{"room_id": first_id + index, "room_design_id": 100 + index, "room_type": room_type,
+             "room_cords": [x, 0], "room_size": [width, 1]}
+            for index, (room_type, x, width) in enumerate(rooms)]
+
+def test_distances_along_a_deck():
+    graph = navigation.NavigationGraph(layout(1))
+    assert graph.distance(1, 3) == 4
+    assert graph.from_bedroom(3) == 4
+    assert graph.from_android(3) == navigation.UNREACHABLE
+
+def test_ships_with_the_same_geometry_get_their_own_graph():
+    cache = navigation.NavigationCache()
+    ship_a, ship_b = layout(1), layout(11)
+    assert navigation.get_graph(ship_a, cache).from_bedroom(ship_a[2]) == 4
+    assert navigation.get_graph(ship_b, cache).from_bedroom(ship_b[2]) == 4
+    assert cache.misses == 2
+
+    # The same layout again is served from the cache
+    assert navigation.get_graph(layout(11), cache).from_bedroom(13) == 4
+    assert cache.hits == 1